@@ -0,0 +1,186 @@
+"""Cold-start benchmark: time from process start to the first successful ``/chat``.
+
+Starts the fake OpenAI server and the MCP server once, then launches the API
+server ``--runs`` times per configuration. For each launch it records when the
+server first answers (``ready_ms``), when the first ``/chat`` succeeds
+(``first_chat_ms``) and the latency of that first and of a second ``/chat``.
+``--ref`` also measures an older revision, checked out into a temporary git
+worktree, so a change can be compared with what came before it.
+
+``--importtime`` prints the slowest imports of ``api_server`` instead
+(``python -X importtime``).
+
+Example::
+
+    python -m benchmarks.cold_start --runs 5 --ref HEAD~1 \\
+        --config default --config prewarm:PREWARM=startup
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import httpx
+
+from .common import REPO_ROOT, free_port, run_server, wait_ready, write_json
+from .load_test import BENCH_MCP_KEY, _git_revision
+
+
+def parse_config(spec: str) -> Tuple[str, Dict[str, str]]:
+    """Parse ``NAME[:KEY=VALUE,...]`` into a name and API server environment."""
+    name, _, pairs = spec.partition(":")
+    env = {}
+    for pair in filter(None, pairs.split(",")):
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--config expects NAME:KEY=VALUE,..., got {spec!r}")
+        env[key] = value
+    return name, env
+
+
+@contextmanager
+def worktree(ref: str) -> Iterator[str]:
+    """Check out ``ref`` into a temporary git worktree for the block's duration."""
+    path = tempfile.mkdtemp(prefix="cold-start-")
+    subprocess.run(["git", "worktree", "add", "--detach", path, ref], cwd=REPO_ROOT, check=True,
+                   capture_output=True)
+    try:
+        yield path
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", path], cwd=REPO_ROOT, capture_output=True)
+
+
+def measure_launch(env: Dict[str, str], cwd: str, message: str, timeout: float) -> Dict[str, float]:
+    """Start one API server and time it until the first successful ``/chat``."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    ready = None
+    with run_server("fastapi_openai_mcp.api_server:app", port, env, cwd=cwd):
+        deadline = started + timeout
+        with httpx.Client(timeout=timeout) as client:
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    response = client.post(f"{url}/chat", json={"message": message})
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                if ready is None:
+                    ready = t0 - started
+                if response.status_code == 200:
+                    first_chat = time.perf_counter() - started
+                    first_latency = time.perf_counter() - t0
+                    break
+                time.sleep(0.005)
+            else:
+                raise RuntimeError(f"/chat did not succeed within {timeout}s")
+            t0 = time.perf_counter()
+            client.post(f"{url}/chat", json={"message": message}).raise_for_status()
+            second_latency = time.perf_counter() - t0
+    return {
+        "ready_ms": round(1000 * (ready or 0.0), 1),
+        "first_chat_ms": round(1000 * first_chat, 1),
+        "first_latency_ms": round(1000 * first_latency, 1),
+        "second_latency_ms": round(1000 * second_latency, 1),
+    }
+
+
+def summarize_runs(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+
+
+def import_profile(limit: int) -> Dict[str, Any]:
+    """Return the slowest modules imported by ``api_server`` (cumulative microseconds)."""
+    env = {**os.environ, "MCP_API_KEY": BENCH_MCP_KEY}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import fastapi_openai_mcp.api_server"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        entries.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    total = next((e["cumulative_us"] for e in entries if e["module"] == "fastapi_openai_mcp.api_server"), 0)
+    entries.sort(key=lambda entry: entry["cumulative_us"], reverse=True)
+    return {"total_ms": round(total / 1000, 1), "slowest": entries[:limit]}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    configs = [parse_config(spec) for spec in args.config or ["default"]]
+    openai_port, mcp_port = free_port(), free_port()
+    base_env = {
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "MCP_API_KEY": BENCH_MCP_KEY,
+        "MCP_SERVER_URL": f"http://127.0.0.1:{mcp_port}",
+        "FAKE_OPENAI_LATENCY": str(args.openai_latency),
+        "FAKE_OPENAI_JITTER": "0",
+    }
+    trees = [("current", REPO_ROOT)]
+    results: Dict[str, Any] = {}
+
+    with run_server("benchmarks.fake_openai:app", openai_port, base_env), \
+            run_server("fastapi_openai_mcp.mcp_server:app", mcp_port, {"MCP_API_KEY": BENCH_MCP_KEY}):
+        wait_ready(f"http://127.0.0.1:{openai_port}/stats")
+        wait_ready(f"http://127.0.0.1:{mcp_port}/metrics")
+        with worktree(args.ref) if args.ref else _no_worktree() as ref_path:
+            if ref_path:
+                trees.insert(0, (args.ref, ref_path))
+            for tree, path in trees:
+                for name, env in configs:
+                    runs = [
+                        measure_launch({**base_env, **env}, path, args.message, args.timeout)
+                        for _ in range(args.runs)
+                    ]
+                    results[f"{tree}/{name}"] = {"env": env, "median": summarize_runs(runs), "runs": runs}
+
+    return {
+        "benchmark": "cold_start",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "config": {"runs": args.runs, "ref": args.ref, "openai_latency": args.openai_latency},
+        "results": results,
+    }
+
+
+@contextmanager
+def _no_worktree() -> Iterator[str | None]:
+    yield None
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="launches per configuration")
+    parser.add_argument("--config", action="append", metavar="NAME[:KEY=VALUE,...]",
+                        help="API server configuration to measure (repeatable)")
+    parser.add_argument("--ref", help="also measure this git revision, e.g. HEAD~1")
+    parser.add_argument("--message", default="What is the current server time?")
+    parser.add_argument("--openai-latency", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--importtime", action="store_true", help="print the slowest imports and exit")
+    parser.add_argument("--limit", type=int, default=15, help="modules listed by --importtime")
+    parser.add_argument("--output", default="bench-cold-start.json")
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        print(json.dumps(import_profile(args.limit), indent=2))
+        return 0
+
+    report = run(args)
+    write_json(args.output, report)
+    print(json.dumps({name: result["median"] for name, result in report["results"].items()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Shared helpers for the benchmark scripts: server processes, load driving, stats."""
+
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0, headers: Dict[str, str] | None = None) -> float:
+    """Poll ``url`` until it answers (any status); return seconds waited."""
+    started = time.perf_counter()
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        try:
+            httpx.get(url, headers=headers, timeout=1.0)
+            return time.perf_counter() - started
+        except httpx.TransportError:
+            time.sleep(0.02)
+    raise RuntimeError(f"Server at {url} did not become ready within {timeout}s")
+
+
+@contextmanager
+def run_server(
+    app: str,
+    port: int,
+    env: Dict[str, str] | None = None,
+    extra_args: Sequence[str] = (),
+    command: Sequence[str] | None = None,
+    cwd: str = REPO_ROOT,
+    stderr: Any = None,
+) -> Iterator[subprocess.Popen]:
+    """Run ``uvicorn <app>`` (or ``command``) in a subprocess for the block's duration.
+
+    ``stderr`` is passed to ``subprocess.Popen``, e.g. a file to keep server logs in.
+    """
+    full_env = {**os.environ, "LOG_LEVEL": "warning", **(env or {})}
+    args = list(command) if command else [
+        sys.executable, "-m", "uvicorn", app,
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log", *extra_args,
+    ]
+    proc = subprocess.Popen(args, env=full_env, cwd=cwd, stderr=stderr)
+    try:
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies: Sequence[float]) -> Dict[str, float]:
+    """Return mean/p50/p95/p99/max of ``latencies`` (seconds) in milliseconds."""
+    if not latencies:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3),
+        "p50_ms": round(1000 * percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 99), 3),
+        "max_ms": round(1000 * max(latencies), 3),
+    }
+
+
+async def drive_load(
+    method: str,
+    url: str,
+    concurrency: int,
+    requests: int,
+    duration: float | None = None,
+    json_body: Any = None,
+    headers: Dict[str, str] | None = None,
+) -> Dict[str, Any]:
+    """Send ``requests`` requests (or run for ``duration`` seconds) at ``concurrency``."""
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    errors = 0
+    sent = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        deadline = started + duration if duration else None
+
+        async def worker() -> None:
+            nonlocal sent, errors
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif sent >= requests:
+                    return
+                sent += 1
+                t0 = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=json_body, headers=headers)
+                    code = str(response.status_code)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    code = "error"
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+                status_codes[code] = status_codes.get(code, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": status_codes,
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": summarize_latencies(latencies),
+    }
+
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)$")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """Parse Prometheus text into ``{(name, sorted label pairs): value}``."""
+    samples: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        pairs = tuple(sorted(_LABEL.findall(labels or "")))
+        samples[(name, pairs)] = float("inf") if value == "+Inf" else float(value)
+    return samples
+
+
+def histogram_summary(
+    before: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float],
+    after: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float],
+    name: str,
+    label: str,
+) -> Dict[str, Dict[str, float]]:
+    """Summarize a histogram's growth between two scrapes, grouped by ``label``.
+
+    Percentiles are estimated by linear interpolation within buckets.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for (sample, pairs), value in after.items():
+        labels = dict(pairs)
+        if label not in labels:
+            continue
+        delta = value - before.get((sample, pairs), 0.0)
+        group = groups.setdefault(labels[label], {"buckets": [], "sum": 0.0, "count": 0.0})
+        if sample == f"{name}_bucket":
+            le = labels["le"]
+            group["buckets"].append((float("inf") if le == "+Inf" else float(le), delta))
+        elif sample == f"{name}_sum":
+            group["sum"] = delta
+        elif sample == f"{name}_count":
+            group["count"] = delta
+
+    summary: Dict[str, Dict[str, float]] = {}
+    for key, group in sorted(groups.items()):
+        count = group["count"]
+        if not count:
+            continue
+        buckets = sorted(group["buckets"])
+        result = {"count": int(count), "mean_ms": round(1000 * group["sum"] / count, 3)}
+        for pct in (50, 95, 99):
+            result[f"p{pct}_ms"] = round(1000 * _bucket_quantile(buckets, count, pct / 100.0), 3)
+        summary[key] = result
+    return summary
+
+
+def _bucket_quantile(buckets: List[Tuple[float, float]], count: float, q: float) -> float:
+    rank = q * count
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            if cumulative == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (cumulative - lower_count)
+        lower_bound, lower_count = bound, cumulative
+    return lower_bound
+
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path, "w") as handle:
+        json.dump(data, handle, indent=2, sort_keys=True)
+        handle.write("\n")
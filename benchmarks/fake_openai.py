@@ -0,0 +1,219 @@
+"""Local OpenAI-compatible stand-in for load tests.
+
+Implements ``POST /v1/chat/completions`` (plain and ``stream=True``) with a
+configurable latency. When tools are offered and the last user message matches
+``FAKE_OPENAI_TOOL_PATTERN``, the first completion requests every offered tool
+whose name matches ``FAKE_OPENAI_TOOLS``; once tool results are in the
+conversation, the answer echoes them. Prompt caching is imitated by reporting
+the system message and tools as ``cached_tokens`` once the same prefix bytes
+have been seen before. With ``FAKE_OPENAI_RATE_LIMIT`` set, completions are
+limited to that many per ``FAKE_OPENAI_RATE_WINDOW`` seconds: every response
+carries OpenAI's ``x-ratelimit-*-requests`` headers and requests over the
+limit get ``429`` with ``retry-after-ms``.
+
+Run with ``uvicorn benchmarks.fake_openai:app --port 8002`` and point the API
+server at it with ``OPENAI_BASE_URL=http://localhost:8002/v1``.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Base latency per completion in seconds, plus uniform jitter and per-token cost
+FAKE_OPENAI_LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY", "0.05"))
+FAKE_OPENAI_JITTER = float(os.getenv("FAKE_OPENAI_JITTER", "0.01"))
+FAKE_OPENAI_TOKEN_LATENCY = float(os.getenv("FAKE_OPENAI_TOKEN_LATENCY", "0.0"))
+FAKE_OPENAI_TOOL_PATTERN = re.compile(os.getenv("FAKE_OPENAI_TOOL_PATTERN", r"\btime\b"), re.I)
+FAKE_OPENAI_TOOLS = re.compile(os.getenv("FAKE_OPENAI_TOOLS", r"^get_server_time$"))
+# Completions allowed per fixed window (0 for no limit)
+FAKE_OPENAI_RATE_LIMIT = int(os.getenv("FAKE_OPENAI_RATE_LIMIT", "0"))
+FAKE_OPENAI_RATE_WINDOW = float(os.getenv("FAKE_OPENAI_RATE_WINDOW", "1.0"))
+
+app = FastAPI()
+
+stats: Dict[str, int] = {
+    "requests": 0, "tool_call_responses": 0, "streams": 0, "prefix_cache_hits": 0, "model_lists": 0,
+    "rate_limited": 0,
+}
+seen_prefixes: Set[str] = set()
+rate_window = {"started": 0.0, "used": 0}
+
+
+def _rate_limit() -> Dict[str, str]:
+    """Count a request against the current window and return the rate-limit headers."""
+    if FAKE_OPENAI_RATE_LIMIT <= 0:
+        return {}
+    now = time.monotonic()
+    if now - rate_window["started"] >= FAKE_OPENAI_RATE_WINDOW:
+        rate_window.update(started=now, used=0)
+    rate_window["used"] += 1
+    reset_ms = max(1, math.ceil(1000 * (rate_window["started"] + FAKE_OPENAI_RATE_WINDOW - now)))
+    headers = {
+        "x-ratelimit-limit-requests": str(FAKE_OPENAI_RATE_LIMIT),
+        "x-ratelimit-remaining-requests": str(max(0, FAKE_OPENAI_RATE_LIMIT - rate_window["used"])),
+        "x-ratelimit-reset-requests": f"{reset_ms}ms",
+    }
+    if rate_window["used"] > FAKE_OPENAI_RATE_LIMIT:
+        headers["retry-after-ms"] = str(reset_ms)
+    return headers
+
+
+def _count_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(str(message.get("content") or "").split()) for message in messages) + 4 * len(messages)
+
+
+def _cached_tokens(body: Dict[str, Any]) -> int:
+    """Return the prefix tokens a provider prompt cache would have served."""
+    messages = body.get("messages", [])
+    system = [m for m in messages[:1] if m.get("role") == "system"]
+    prefix = json.dumps([body.get("tools"), system], separators=(",", ":"))
+    if prefix not in seen_prefixes:
+        seen_prefixes.add(prefix)
+        return 0
+    stats["prefix_cache_hits"] += 1
+    return _count_tokens(system) + len(json.dumps(body.get("tools") or [])) // 4
+
+
+def _plan(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Decide the fake model's reply: a content string or a list of tool calls."""
+    messages = body.get("messages", [])
+    tool_results = [m for m in messages if m.get("role") == "tool"]
+    if tool_results:
+        return {"content": "Here is what I found: " + " ".join(str(m.get("content")) for m in tool_results)}
+
+    user_messages = [m for m in messages if m.get("role") == "user"]
+    last = str(user_messages[-1].get("content", "")) if user_messages else ""
+    offered = [t["function"]["name"] for t in body.get("tools") or []]
+    wanted = [name for name in offered if FAKE_OPENAI_TOOLS.search(name)]
+    if wanted and FAKE_OPENAI_TOOL_PATTERN.search(last):
+        return {
+            "tool_calls": [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": "{}"},
+                }
+                for name in wanted
+            ]
+        }
+    return {"content": f"You said: {last}"}
+
+
+async def _delay(tokens: int) -> None:
+    await asyncio.sleep(
+        max(0.0, FAKE_OPENAI_LATENCY + random.uniform(-FAKE_OPENAI_JITTER, FAKE_OPENAI_JITTER))
+        + tokens * FAKE_OPENAI_TOKEN_LATENCY
+    )
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Any:
+    body = await request.json()
+    limit_headers = _rate_limit()
+    if "retry-after-ms" in limit_headers:
+        stats["rate_limited"] += 1
+        error = {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}
+        return JSONResponse({"error": error}, status_code=429, headers=limit_headers)
+    stats["requests"] += 1
+    plan = _plan(body)
+    if "tool_calls" in plan:
+        stats["tool_call_responses"] += 1
+    prompt_tokens = _count_tokens(body.get("messages", [])) + len(json.dumps(body.get("tools") or [])) // 4
+    completion_tokens = len(str(plan.get("content") or "").split()) or 8
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": min(prompt_tokens, _cached_tokens(body))},
+    }
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+
+    if body.get("stream"):
+        stats["streams"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(
+            _stream(plan, completion_id, created, model, usage if include_usage else None),
+            media_type="text/event-stream",
+            headers=limit_headers,
+        )
+
+    await _delay(completion_tokens)
+    message: Dict[str, Any] = {"role": "assistant", "content": plan.get("content")}
+    if "tool_calls" in plan:
+        message["tool_calls"] = plan["tool_calls"]
+    return JSONResponse(
+        {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if "tool_calls" in plan else "stop",
+                }
+            ],
+            "usage": usage,
+        },
+        headers=limit_headers,
+    )
+
+
+async def _stream(
+    plan: Dict[str, Any], completion_id: str, created: int, model: str, usage: Dict[str, Any] | None
+) -> AsyncIterator[str]:
+    def chunk(delta: Dict[str, Any], finish_reason: str | None = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await _delay(0)
+    if "tool_calls" in plan:
+        for index, call in enumerate(plan["tool_calls"]):
+            yield chunk({"role": "assistant", "tool_calls": [{"index": index, **call}]})
+        yield chunk({}, "tool_calls")
+    else:
+        for word in str(plan["content"]).split(" "):
+            if FAKE_OPENAI_TOKEN_LATENCY:
+                await asyncio.sleep(FAKE_OPENAI_TOKEN_LATENCY)
+            yield chunk({"content": word + " "})
+        yield chunk({}, "stop")
+    if usage is not None:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [],
+            "usage": usage,
+        }
+        yield f"data: {json.dumps(payload)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/v1/models")
+async def list_models() -> Dict[str, Any]:
+    stats["model_lists"] += 1
+    return {"object": "list", "data": [{"id": "fake", "object": "model", "created": 0, "owned_by": "fake"}]}
+
+
+@app.get("/stats")
+async def get_stats() -> Dict[str, int]:
+    return stats
@@ -0,0 +1,174 @@
+"""Offline load test for ``/chat`` against a fake OpenAI server and the real MCP server.
+
+Starts three local processes (fake OpenAI, ``mcp_server``, ``api_server``),
+drives ``POST /chat`` at a target concurrency and reports throughput, latency
+percentiles and the per-stage breakdown scraped from the API server's
+``/metrics``. Results are written as JSON; ``--compare`` checks them against
+an earlier run and exits non-zero on a regression.
+
+Example::
+
+    python -m benchmarks.load_test --concurrency 32 --requests 2000 \\
+        --output bench-results.json --compare bench-baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from .common import (
+    REPO_ROOT,
+    drive_load,
+    free_port,
+    histogram_summary,
+    parse_metrics,
+    run_server,
+    wait_ready,
+    write_json,
+)
+
+BENCH_MCP_KEY = "bench-key"
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--api-env expects KEY=VALUE, got {pair!r}")
+        env[key] = value
+    return env
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    openai_port, mcp_port, api_port = free_port(), free_port(), free_port()
+    fake_env = {
+        "FAKE_OPENAI_LATENCY": str(args.openai_latency),
+        "FAKE_OPENAI_JITTER": str(args.openai_jitter),
+        "FAKE_OPENAI_RATE_LIMIT": str(args.openai_rate_limit),
+        "FAKE_OPENAI_RATE_WINDOW": str(args.openai_rate_window),
+    }
+    mcp_env = {"MCP_API_KEY": BENCH_MCP_KEY}
+    api_env = {
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "MCP_API_KEY": BENCH_MCP_KEY,
+        "MCP_SERVER_URL": f"http://127.0.0.1:{mcp_port}",
+        **_parse_env(args.api_env),
+    }
+    api_url = f"http://127.0.0.1:{api_port}"
+
+    with run_server("benchmarks.fake_openai:app", openai_port, fake_env), \
+            run_server("fastapi_openai_mcp.mcp_server:app", mcp_port, mcp_env), \
+            run_server("fastapi_openai_mcp.api_server:app", api_port, api_env):
+        wait_ready(f"http://127.0.0.1:{openai_port}/stats")
+        wait_ready(f"http://127.0.0.1:{mcp_port}/metrics")
+        wait_ready(f"{api_url}/metrics")
+
+        body = {"message": args.message}
+        if args.warmup:
+            asyncio.run(drive_load("POST", f"{api_url}/chat", args.concurrency, args.warmup, json_body=body))
+        before = parse_metrics(httpx.get(f"{api_url}/metrics").text)
+        results = asyncio.run(
+            drive_load(
+                "POST", f"{api_url}/chat", args.concurrency, args.requests,
+                duration=args.duration, json_body=body,
+            )
+        )
+        after = parse_metrics(httpx.get(f"{api_url}/metrics").text)
+        upstream = httpx.get(f"http://127.0.0.1:{openai_port}/stats").json()
+        prompt_cache = httpx.get(f"{api_url}/stats/prompt_cache").json()
+
+    return {
+        "benchmark": "chat_load",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "message": args.message,
+            "openai_latency": args.openai_latency,
+            "openai_jitter": args.openai_jitter,
+            "openai_rate_limit": args.openai_rate_limit,
+            "openai_rate_window": args.openai_rate_window,
+            "api_env": _parse_env(args.api_env),
+        },
+        "results": results,
+        "stages": histogram_summary(before, after, "chat_stage_duration_seconds", "stage"),
+        "tools": histogram_summary(before, after, "tool_call_duration_seconds", "tool"),
+        "upstream": upstream,
+        "prompt_cache": prompt_cache,
+        # Tool calls and the round trips they took with MCP_TRANSPORT=jsonrpc
+        "mcp_rpc": {
+            kind: after.get((f"mcp_rpc_{kind}_total", ()), 0.0) - before.get((f"mcp_rpc_{kind}_total", ()), 0.0)
+            for kind in ("calls", "batches")
+        },
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of metrics that regressed by more than ``tolerance``."""
+    regressions = []
+    cur, base = current["results"], baseline["results"]
+    if base["rps"] and cur["rps"] < base["rps"] * (1 - tolerance):
+        regressions.append(f"rps {cur['rps']} < baseline {base['rps']}")
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if base["latency"][key] and cur["latency"][key] > base["latency"][key] * (1 + tolerance):
+            regressions.append(f"{key} {cur['latency'][key]} > baseline {base['latency'][key]}")
+    if cur["errors"] > base["errors"]:
+        regressions.append(f"errors {cur['errors']} > baseline {base['errors']}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=None, help="run for N seconds instead of --requests")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--message", default="What is the current server time?")
+    parser.add_argument("--openai-latency", type=float, default=0.05, help="fake completion latency (s)")
+    parser.add_argument("--openai-jitter", type=float, default=0.01)
+    parser.add_argument("--openai-rate-limit", type=int, default=0,
+                        help="fake completions allowed per --openai-rate-window (0: no limit)")
+    parser.add_argument("--openai-rate-window", type=float, default=1.0, help="fake rate-limit window (s)")
+    parser.add_argument("--api-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the API server (repeatable)")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    write_json(args.output, report)
+    print(json.dumps({"results": report["results"], "stages": report["stages"]}, indent=2))
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
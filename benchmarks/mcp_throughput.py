@@ -0,0 +1,143 @@
+"""MCP server throughput benchmark: requests per second on ``GET /server_time``.
+
+Starts the MCP server once per ``--config`` and drives ``/server_time`` at the
+given concurrency for ``--duration`` seconds after a short warm-up. Server
+logs are written to a temporary file rather than the terminal, and the number
+of log lines each configuration produced is reported next to its throughput,
+so logging and fast-path setups can be compared.
+
+``--in-process N`` instead calls the ASGI app directly N times, without
+sockets or a load generator, and reports the server-side cost per request of
+the regular ``/server_time`` route and of the ``MCP_FAST_PATH`` endpoint.
+
+Example::
+
+    python -m benchmarks.mcp_throughput --duration 10 \\
+        --config default:LOG_LEVEL=INFO \\
+        --config sampled:LOG_LEVEL=INFO,LOG_ASYNC=true,LOG_FORMAT=json,LOG_SAMPLE_RATES=/server_time=0.01
+    python -m benchmarks.mcp_throughput --config route --config fast:MCP_FAST_PATH=true
+    python -m benchmarks.mcp_throughput --in-process 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from .cold_start import parse_config
+from .common import drive_load, free_port, run_server, wait_ready, write_json
+from .load_test import BENCH_MCP_KEY, _git_revision
+
+
+def measure(env: Dict[str, str], args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one MCP server with ``env`` and measure ``/server_time`` throughput."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/server_time"
+    headers = {"X-Api-Key": BENCH_MCP_KEY}
+    with tempfile.TemporaryFile() as log_file:
+        with run_server("fastapi_openai_mcp.mcp_server:app", port, {"MCP_API_KEY": BENCH_MCP_KEY, **env},
+                        stderr=log_file):
+            wait_ready(f"http://127.0.0.1:{port}/metrics")
+            asyncio.run(drive_load("GET", url, args.concurrency, 0, duration=args.warmup, headers=headers))
+            result = asyncio.run(drive_load("GET", url, args.concurrency, 0, duration=args.duration,
+                                            headers=headers))
+        log_file.seek(0)
+        result["log_lines"] = sum(1 for _ in log_file)
+    return result
+
+
+async def _time_asgi(app: Any, requests: int) -> float:
+    """Return mean seconds per ``GET /server_time`` sent straight to ``app``."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/server_time", "raw_path": b"/server_time", "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8001),
+        "headers": [(b"host", b"127.0.0.1:8001"), (b"x-api-key", BENCH_MCP_KEY.encode())],
+    }
+    statuses = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    elapsed = time.perf_counter() - started
+    if set(statuses) != {200}:
+        raise RuntimeError(f"unexpected statuses {sorted(set(statuses))}")
+    return elapsed / requests
+
+
+def in_process(requests: int) -> Dict[str, Any]:
+    """Measure the regular route, then enable the fast path and measure again."""
+    os.environ["MCP_API_KEY"] = BENCH_MCP_KEY
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from fastapi_openai_mcp import mcp_server
+
+    results = {}
+    for name in ("route", "fast_path"):
+        if name == "fast_path":
+            mcp_server.enable_fast_path()
+        asyncio.run(_time_asgi(mcp_server.app, min(requests, 1000)))
+        seconds = asyncio.run(_time_asgi(mcp_server.app, requests))
+        results[name] = {"us_per_request": round(1e6 * seconds, 2), "max_rps": round(1 / seconds, 1)}
+    return {
+        "benchmark": "mcp_asgi_overhead",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "config": {"requests": requests, "log_level": os.environ["LOG_LEVEL"]},
+        "results": results,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    configs = [parse_config(spec) for spec in args.config or ["default"]]
+    results = {}
+    for name, env in configs:
+        results[name] = {"env": env, **measure(env, args)}
+    return {
+        "benchmark": "mcp_throughput",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "config": {"concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup},
+        "results": results,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", metavar="NAME[:KEY=VALUE,...]",
+                        help="MCP server configuration to measure (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per configuration")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--in-process", type=int, metavar="N", help="time N direct ASGI calls instead")
+    parser.add_argument("--output", default="bench-mcp-throughput.json")
+    args = parser.parse_args(argv)
+
+    if args.in_process:
+        report = in_process(args.in_process)
+        write_json(args.output, report)
+        print(json.dumps(report["results"], indent=2))
+        return 0
+
+    report = run(args)
+    write_json(args.output, report)
+    summary = {
+        name: {"rps": result["rps"], "p99_ms": result["latency"]["p99_ms"], "log_lines": result["log_lines"]}
+        for name, result in report["results"].items()
+    }
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
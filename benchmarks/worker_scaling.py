@@ -0,0 +1,139 @@
+"""Worker scaling benchmark: RPS as the number of server workers (and cores) grows.
+
+Starts the MCP or API server through ``fastapi_openai_mcp.serve`` once per
+``--workers`` value and drives it for ``--duration`` seconds from
+``--clients`` load-generator processes, so the client is not the bottleneck.
+With ``--pin`` the server is restricted to as many CPUs as it has workers
+(``taskset``), which shows how throughput grows as cores are added.
+
+The API server benchmark also starts the fake OpenAI server and an MCP server.
+
+Example::
+
+    python -m benchmarks.worker_scaling --service mcp --workers 1,2,4 --pin
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Dict, List
+
+from .common import drive_load, free_port, run_server, wait_ready, write_json
+from .load_test import BENCH_MCP_KEY, _git_revision
+
+
+def _client(method: str, url: str, concurrency: int, duration: float, body: Any, headers: Dict[str, str]) -> Dict[str, Any]:
+    return asyncio.run(drive_load(method, url, concurrency, 0, duration=duration, json_body=body, headers=headers))
+
+
+def drive_from_processes(
+    clients: int, method: str, url: str, concurrency: int, duration: float, body: Any, headers: Dict[str, str]
+) -> Dict[str, Any]:
+    """Run ``drive_load`` in ``clients`` processes at once and combine the results."""
+    with ProcessPoolExecutor(clients) as pool:
+        futures = [pool.submit(_client, method, url, concurrency, duration, body, headers) for _ in range(clients)]
+        results = [future.result() for future in futures]
+    return {
+        "requests": sum(r["requests"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "rps": round(sum(r["rps"] for r in results), 2),
+        # Percentiles cannot be merged exactly; report the worst client's
+        "p50_ms": max(r["latency"]["p50_ms"] for r in results),
+        "p99_ms": max(r["latency"]["p99_ms"] for r in results),
+    }
+
+
+def measure(workers: int, args: argparse.Namespace, upstream_env: Dict[str, str]) -> Dict[str, Any]:
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix="worker-scaling-")
+    command = [sys.executable, "-m", "fastapi_openai_mcp.serve", args.service, "--host", "127.0.0.1", "--port", str(port)]
+    if args.pin:
+        command = ["taskset", "-c", f"0-{workers - 1}", *command]
+    env = {
+        **upstream_env,
+        "MCP_API_KEY": BENCH_MCP_KEY,
+        "WEB_CONCURRENCY": str(workers),
+        "SHARED_STATE_DIR": state_dir,
+        "ACCESS_LOG": "false",
+        "LOG_LEVEL": "warning",
+    }
+    base = f"http://127.0.0.1:{port}"
+    if args.service == "mcp":
+        method, url, body, headers = "GET", f"{base}/server_time", None, {"X-Api-Key": BENCH_MCP_KEY}
+    else:
+        method, url, body, headers = "POST", f"{base}/chat", {"message": args.message}, {}
+    try:
+        with run_server("", port, env, command=command):
+            wait_ready(f"{base}/metrics")
+            drive_from_processes(args.clients, method, url, args.concurrency, args.warmup, body, headers)
+            return drive_from_processes(args.clients, method, url, args.concurrency, args.duration, body, headers)
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    worker_counts = [int(n) for n in args.workers.split(",")]
+    if args.pin and shutil.which("taskset") is None:
+        raise SystemExit("--pin needs the taskset command")
+    results: Dict[str, Any] = {}
+    with ExitStack() as stack:
+        upstream_env: Dict[str, str] = {}
+        if args.service == "api":
+            openai_port, mcp_port = free_port(), free_port()
+            upstream_env = {
+                "OPENAI_API_KEY": "sk-bench",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+                "MCP_SERVER_URL": f"http://127.0.0.1:{mcp_port}",
+            }
+            stack.enter_context(run_server("benchmarks.fake_openai:app", openai_port, {
+                "FAKE_OPENAI_LATENCY": str(args.openai_latency), "FAKE_OPENAI_JITTER": "0",
+            }))
+            stack.enter_context(run_server("fastapi_openai_mcp.mcp_server:app", mcp_port, {"MCP_API_KEY": BENCH_MCP_KEY}))
+            wait_ready(f"http://127.0.0.1:{openai_port}/stats")
+            wait_ready(f"http://127.0.0.1:{mcp_port}/metrics")
+        for workers in worker_counts:
+            results[str(workers)] = measure(workers, args, upstream_env)
+    return {
+        "benchmark": "worker_scaling",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "config": {
+            "service": args.service,
+            "workers": worker_counts,
+            "pin": args.pin,
+            "clients": args.clients,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "results": results,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=("mcp", "api"), default="mcp")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--pin", action="store_true", help="give the server one CPU per worker")
+    parser.add_argument("--clients", type=int, default=2, help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per client process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--message", default="What is the current server time?")
+    parser.add_argument("--openai-latency", type=float, default=0.05)
+    parser.add_argument("--output", default="bench-worker-scaling.json")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    write_json(args.output, report)
+    print(json.dumps(report["results"], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
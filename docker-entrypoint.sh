@@ -14,21 +14,22 @@ fi
 SERVICE="${SERVICE:-api}"
 LOG_LEVEL="${LOG_LEVEL:-info}"
 LOG_LEVEL_LC=$(printf "%s" "$LOG_LEVEL" | tr '[:upper:]' '[:lower:]')
+export LOG_LEVEL="$LOG_LEVEL_LC"
 
 case "$SERVICE" in
   api)
     PORT="${PORT:-8000}"
-    log "Starting API server on 0.0.0.0:${PORT} (LOG_LEVEL=${LOG_LEVEL_LC})"
+    log "Starting API server on 0.0.0.0:${PORT} (LOG_LEVEL=${LOG_LEVEL_LC}, WEB_CONCURRENCY=${WEB_CONCURRENCY:-1})"
     if [ -n "$MCP_SERVER_URL" ]; then log "MCP_SERVER_URL set"; else log "MCP_SERVER_URL NOT set"; fi
     if [ -n "$MCP_API_KEY" ]; then log "MCP_API_KEY set"; else log "MCP_API_KEY NOT set"; fi
     if [ -n "$OPENAI_API_KEY" ]; then log "OPENAI_API_KEY set"; else log "OPENAI_API_KEY NOT set"; fi
-    exec uvicorn fastapi_openai_mcp.api_server:app --host 0.0.0.0 --port "${PORT}" --log-level "${LOG_LEVEL_LC}"
+    exec python -m fastapi_openai_mcp.serve api --port "${PORT}"
     ;;
   mcp)
     PORT="${PORT:-8001}"
-    log "Starting MCP server on 0.0.0.0:${PORT} (LOG_LEVEL=${LOG_LEVEL_LC})"
+    log "Starting MCP server on 0.0.0.0:${PORT} (LOG_LEVEL=${LOG_LEVEL_LC}, WEB_CONCURRENCY=${WEB_CONCURRENCY:-1})"
     if [ -n "$MCP_API_KEY" ]; then log "MCP_API_KEY set"; else log "MCP_API_KEY NOT set"; fi
-    exec uvicorn fastapi_openai_mcp.mcp_server:app --host 0.0.0.0 --port "${PORT}" --log-level "${LOG_LEVEL_LC}"
+    exec python -m fastapi_openai_mcp.serve mcp --port "${PORT}"
     ;;
   *)
     log "Unknown SERVICE='${SERVICE}'. Expected 'api' or 'mcp'."
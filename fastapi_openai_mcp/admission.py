@@ -0,0 +1,129 @@
+"""Admission control: bounded in-flight work with a bounded, deadline-limited queue."""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admits at most ``max_in_flight`` requests; others wait in a FIFO queue.
+
+    A request is rejected immediately when ``max_queue`` requests are already
+    waiting, and rejected after ``queue_timeout`` seconds if no slot freed up.
+    A ``max_in_flight`` of zero disables the limit.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        max_queue: int = 128,
+        queue_timeout: float = 2.0,
+        retry_after: float = 1.0,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.queued = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """Wait for an in-flight slot or raise :class:`Overloaded`."""
+        if self.max_in_flight <= 0:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded("queue full", self.retry_after)
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._record_wait(time.monotonic() - started)
+        if not waiter.done():
+            self._abandon(waiter)
+            self.rejected_timeout += 1
+            raise Overloaded("queue timeout", self.retry_after)
+        # The releasing request handed its slot over; in_flight is unchanged
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Free a slot, handing it directly to the oldest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _abandon(self, waiter: "asyncio.Future[None]") -> None:
+        if waiter.done() and not waiter.cancelled():
+            # A slot was handed over just as we gave up; pass it on
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _record_wait(self, seconds: float) -> None:
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold an in-flight slot for the duration of the ``async with`` block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.queued, 6) if self.queued else 0.0,
+        }
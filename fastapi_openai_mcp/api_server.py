@@ -1,49 +1,343 @@
 """API server interacting with OpenAI and an MCP service."""
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import hashlib
 import json
+import math
 import os
 import logging
-from typing import Dict
+import random
+from contextlib import AsyncExitStack, aclosing, contextmanager
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Set, Tuple
 
 import httpx
-import openai
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+
+from .admission import AdmissionController, Overloaded
+from .balancer import MCPReplicaSet
+from .cache import AnswerCache, ToolResultCache, cap_answer_ttl, create_answer_backend
+from .config import env_bool, env_float, env_int, env_list
+from .deadline import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    cancel_on_disconnect,
+    deadline_scope,
+    remaining,
+    request_timeout,
+    with_deadline,
+)
+from .jsonrpc import RPCChannelPool
+from .logs import LogContextMiddleware, configure_logging
+from .mcp_client import ResilientCaller
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    SharedMetrics,
+    counter_from_values,
+    gauge_from_values,
+)
+from .prefetch import Prefetcher, parse_rules
+from .routing import ModelRouter, parse_routing_rules
+from .scheduler import PRIORITIES, FairScheduler, client_from_headers, client_scope, current_client, parse_weights
+from .sessions import SessionStore, create_session_backend, estimate_tokens
+from .tools import ToolCatalog, ToolHandler, canonical_tools
+from .upstream import RateLimitPacer, build_openai_client, is_retryable
+
+if TYPE_CHECKING:
+    import openai
 
 load_dotenv()
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
 MCP_API_KEY: str | None = os.getenv("MCP_API_KEY")
 MCP_SERVER_URL: str | None = os.getenv("MCP_SERVER_URL")
 
 # Configure logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
+configure_logging(LOG_LEVEL)
 logger = logging.getLogger("fastapi_openai_mcp.api_server")
 
-openai_client = openai.AsyncOpenAI()
 
-# Model used for OpenAI tool calling
-OPENAI_MODEL = "gpt-4.1"
+# Paces OpenAI calls by the rate-limit headers of its responses
+openai_pacer = RateLimitPacer.from_env()
+
+# Retries of a failed completion (connection errors, 429 and 5xx)
+OPENAI_MAX_RETRIES = max(0, env_int("OPENAI_MAX_RETRIES", 2))
+
+
+def get_openai_client() -> "openai.AsyncOpenAI":
+    """Return the shared OpenAI client, importing the SDK and building it on first use.
+
+    The SDK is the largest import of this module, so it is kept off the
+    cold-start path; ``PREWARM`` builds it during startup instead.
+    """
+    client = globals().get("openai_client")
+    if client is None:
+        client = globals()["openai_client"] = build_openai_client(openai_pacer)
+    return client
+
+
+def __getattr__(name: str) -> Any:
+    # ``api_server.openai_client`` builds the client lazily like get_openai_client()
+    if name == "openai_client":
+        return get_openai_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# MCP replicas (MCP_SERVER_URL may list several), each with its own keep-alive
+# connection pool (opened at startup, closed at shutdown)
+mcp_pool = MCPReplicaSet.from_env(env_list("MCP_SERVER_URL"))
+
+# Retries, hedging and circuit breaking around every MCP tool call
+mcp_resilience = ResilientCaller.from_env()
+
+# How tool calls reach MCP: rest (one request per call) or jsonrpc (batched
+# calls over a few authenticated sessions on /mcp)
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "rest").lower()
+mcp_rpc = RPCChannelPool.from_env(
+    lambda *args, **kwargs: mcp_pool.request(*args, **kwargs), lambda: _mcp_headers()
+)
+
+# Default model for both completions; each stage can be routed separately
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1")
+
+# Tool-selection and final-answer models, routing rules and latency fallback
+model_router = ModelRouter(
+    tools_model=os.getenv("OPENAI_TOOLS_MODEL", OPENAI_MODEL),
+    answer_model=os.getenv("OPENAI_ANSWER_MODEL", OPENAI_MODEL),
+    rules=parse_routing_rules(env_list("MODEL_ROUTING_RULES", sep=";")),
+    fallback_model=os.getenv("OPENAI_FALLBACK_MODEL") or None,
+    p95_threshold=env_float("MODEL_FALLBACK_P95", 0.0),
+    min_samples=env_int("MODEL_FALLBACK_MIN_SAMPLES", 20),
+    cooldown=env_float("MODEL_FALLBACK_COOLDOWN", 30.0),
+    error_penalty=env_float("MODEL_FALLBACK_ERROR_PENALTY", 0.0) or None,
+)
+
+# Maximum number of tool calls from one model turn executed at the same time
+TOOL_CALL_CONCURRENCY = max(1, env_int("TOOL_CALL_CONCURRENCY", 8))
+
+# Connection pre-warming at startup: off, startup (before serving) or background
+PREWARM = os.getenv("PREWARM", "off").lower()
+startup_timings: Dict[str, Any] = {}
+
+# Upstream OpenAI concurrency shared fairly between clients (0 disables the limit)
+OPENAI_MAX_CONCURRENCY = env_int("OPENAI_MAX_CONCURRENCY", 0)
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Client-Id")
+
+# Per-request deadline: header value or default, capped; 0 disables the default
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+REQUEST_TIMEOUT = env_float("REQUEST_TIMEOUT", 60.0)
+REQUEST_TIMEOUT_MAX = env_float("REQUEST_TIMEOUT_MAX", 300.0)
+
+# Batch endpoint limits: messages answered at once, and messages per request
+BATCH_CONCURRENCY = max(1, env_int("BATCH_CONCURRENCY", 8))
+BATCH_MAX_ITEMS = env_int("BATCH_MAX_ITEMS", 10000)
 
 app = FastAPI()
 
+# Prometheus metrics served at /metrics
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+app.add_middleware(LogContextMiddleware)
+
+# With several workers (see serve.py) each one snapshots its metrics into
+# SHARED_STATE_DIR and /metrics returns the sum over workers
+SHARED_STATE_DIR = os.getenv("SHARED_STATE_DIR")
+shared_metrics = SharedMetrics(metrics, SHARED_STATE_DIR, "api") if SHARED_STATE_DIR else None
+
+CHAT_STAGE_SECONDS = metrics.histogram(
+    "chat_stage_duration_seconds",
+    "Latency of chat pipeline stages (openai_first, mcp_tools, openai_second, total)",
+    ("stage",),
+)
+TOOL_CALLS = metrics.counter("tool_calls_total", "Tool calls by tool and outcome", ("tool", "outcome"))
+TOOL_CALL_SECONDS = metrics.histogram(
+    "tool_call_duration_seconds", "Tool call latency including cache and retries", ("tool",)
+)
+ANSWERS = metrics.counter(
+    "chat_answers_total",
+    "Final answers by source (model or template) and tool (or none/tools)",
+    ("source", "tool"),
+)
+TEMPLATED_SHADOW = metrics.counter(
+    "templated_answer_shadow_total",
+    "Sampled templated answers whose model answer contains the tool result",
+    ("tool", "contains_result"),
+)
+SESSION_HISTORY_TOKENS = metrics.histogram(
+    "session_history_tokens",
+    "Estimated tokens of session history sent with a request",
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000),
+)
+OPENAI_TOKENS = metrics.counter(
+    "openai_tokens_total",
+    "OpenAI token usage reported in response.usage (prompt, cached, completion)",
+    ("stage", "type"),
+)
+CHAT_ABORTED = metrics.counter(
+    "chat_aborted_total", "Chat requests abandoned on deadline or client disconnect", ("reason",)
+)
+OPENAI_REQUESTS = metrics.counter(
+    "openai_requests_total", "OpenAI completions by stage and routed model", ("stage", "model")
+)
+OPENAI_RETRIES = metrics.counter(
+    "openai_retries_total", "OpenAI completions retried by create_completion", ("stage",)
+)
+OPENAI_QUEUE_SECONDS = metrics.histogram(
+    "openai_scheduler_wait_seconds", "Time OpenAI calls waited for an upstream slot", ("priority",)
+)
+PROMPT_CACHE_RATIO = metrics.histogram(
+    "openai_prompt_cache_ratio",
+    "Per-request share of prompt tokens served from the OpenAI prompt cache",
+    ("stage",),
+    buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+
+# Caps concurrent /chat work; excess requests queue briefly, then get 429
+admission = AdmissionController(
+    max_in_flight=env_int("ADMISSION_MAX_IN_FLIGHT", 64),
+    max_queue=env_int("ADMISSION_MAX_QUEUE", 128),
+    queue_timeout=env_float("ADMISSION_QUEUE_TIMEOUT", 2.0),
+    retry_after=env_float("ADMISSION_RETRY_AFTER", 1.0),
+)
+
+# Weighted fair queueing of OpenAI calls by client, interactive before batch
+openai_scheduler = FairScheduler(
+    max_concurrency=OPENAI_MAX_CONCURRENCY,
+    weights=parse_weights(env_list("SCHEDULER_WEIGHTS")),
+    default_weight=env_float("SCHEDULER_DEFAULT_WEIGHT", 1.0),
+    max_tenants=env_int("SCHEDULER_MAX_TENANTS", 1000),
+)
+
+
+@app.exception_handler(Overloaded)
+async def _on_overloaded(request: Request, exc: Overloaded) -> JSONResponse:
+    logger.warning(
+        "Shedding request", extra={"reason": exc.reason, "queue_depth": admission.queue_depth}
+    )
+    return JSONResponse(
+        status_code=429,
+        content={"detail": f"Server overloaded ({exc.reason})"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def _on_deadline_exceeded(request: Request, exc: Exception) -> JSONResponse:
+    logger.warning("Chat request timed out", extra={"error": str(exc)})
+    CHAT_ABORTED.inc("deadline")
+    return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+
+
+@app.exception_handler(ClientDisconnected)
+async def _on_client_disconnected(request: Request, exc: ClientDisconnected) -> JSONResponse:
+    logger.info("Client disconnected; cancelled in-flight work")
+    CHAT_ABORTED.inc("disconnect")
+    # Nobody is listening; 499 is the conventional "client closed request" status
+    return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+
+
 @app.on_event("startup")
 async def _on_startup() -> None:
     logger.info(
         "API server startup: OPENAI_API_KEY set=%s, MCP_API_KEY set=%s, MCP_SERVER_URL=%s",
-        bool(openai.api_key),
+        bool(OPENAI_API_KEY),
         bool(MCP_API_KEY),
         MCP_SERVER_URL,
     )
+    mcp_pool.open()
+    mcp_pool.start_health_checks()
+    if shared_metrics is not None:
+        shared_metrics.start()
+    tool_catalog.reset()
+    tool_cache.clear()
+    mcp_resilience.reset()
+    mcp_rpc.reset()
+    session_store.reset()
+    model_router.reset()
+    openai_scheduler.reset()
+    openai_pacer.reset()
+    if PREWARM == "startup":
+        await prewarm()
+    elif PREWARM == "background":
+        task = asyncio.ensure_future(prewarm())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def prewarm() -> None:
+    """Build the OpenAI client and open MCP and OpenAI connections ahead of traffic.
+
+    Each step is best effort: failures are logged and the first request
+    falls back to doing the work itself.
+    """
+
+    async def timed(name: str, work: Callable[[], Awaitable[Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            await work()
+            startup_timings[name] = round(time.perf_counter() - started, 4)
+        except Exception as e:
+            startup_timings[name] = f"error: {e}"
+            logger.warning("Pre-warming step failed", extra={"step": name, "error": str(e)})
+
+    async def warm_openai() -> None:
+        if not OPENAI_API_KEY:
+            return
+        await timed("openai_client", lambda: asyncio.to_thread(get_openai_client))
+        # Any authenticated request opens the TLS connection the first completion reuses
+        await timed("openai_connection", lambda: get_openai_client().models.list())
+
+    async def warm_mcp() -> None:
+        if not MCP_SERVER_URL or not MCP_API_KEY:
+            return
+        if MCP_TRANSPORT == "jsonrpc":
+            await timed("mcp_session", mcp_rpc.initialize)
+        if tool_catalog.enabled:
+            await timed("mcp_connection", tool_catalog.get_tools)
+        else:
+            await timed(
+                "mcp_connection",
+                lambda: mcp_pool.request("GET", "/tools", headers=_mcp_headers()),
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(warm_openai(), warm_mcp())
+    startup_timings["prewarm"] = round(time.perf_counter() - started, 4)
+    logger.info("Pre-warming finished", extra={"timings": dict(startup_timings)})
+
+
+@app.on_event("shutdown")
+async def _on_shutdown() -> None:
+    await mcp_pool.aclose()
+    if shared_metrics is not None:
+        await shared_metrics.stop()
 
 
 class ChatRequest(BaseModel):
     """Incoming chat request."""
 
     message: str
+    session_id: str | None = Field(default=None, min_length=1, max_length=128)
+
+
+class BatchChatRequest(BaseModel):
+    """Incoming batch of chat messages for offline workloads."""
 
+    messages: List[str]
+    concurrency: int | None = None
+
+
+SYSTEM_PROMPT = "You are a helpful assistant. When asked about the current time or server time, you MUST use the get_server_time tool to get the accurate time from the MCP server. When you receive the time from the MCP server, include the '[MCP Server Time]' prefix in your response to show that the time came from the MCP server."
 
 # Define the function/tool for OpenAI to use
 tools = [
@@ -57,67 +351,792 @@ tools = [
     }
 ]
 
+# Static request prefix, built once so every request starts with identical bytes
+# and OpenAI can serve it from its prompt cache
+SYSTEM_MESSAGE: Dict[str, Any] = {"role": "system", "content": SYSTEM_PROMPT}
+STATIC_TOOLS = canonical_tools(tools)
+
+# Optional prompt_cache_key sent with every completion to improve cache routing
+PROMPT_CACHE_OPTIONS: Dict[str, Any] = (
+    {"prompt_cache_key": os.environ["OPENAI_PROMPT_CACHE_KEY"]}
+    if os.getenv("OPENAI_PROMPT_CACHE_KEY")
+    else {}
+)
+
+# Prompt and cached prompt tokens per completion stage, for /stats/prompt_cache
+prompt_usage: Dict[str, Dict[str, int]] = {}
+
+
+def _mcp_headers() -> Dict[str, str]:
+    return {
+        # Send both headers to be compatible with Cloud Run (Authorization may be reserved)
+        "Authorization": f"Bearer {MCP_API_KEY}",
+        "X-Api-Key": MCP_API_KEY or "",
+    }
+
 
 async def call_mcp_server() -> str:
     """Call the MCP server to get the current time."""
     if not MCP_SERVER_URL or not MCP_API_KEY:
         raise ValueError("MCP configuration missing")
 
-    url = f"{MCP_SERVER_URL}/server_time"
-    headers = {
-        # Send both headers to be compatible with Cloud Run (Authorization may be reserved)
-        "Authorization": f"Bearer {MCP_API_KEY}",
-        "X-Api-Key": MCP_API_KEY,
-    }
-    logger.debug("Calling MCP server", extra={"url": url})
-    async with httpx.AsyncClient() as client:
+    if MCP_TRANSPORT == "jsonrpc":
+        return await mcp_rpc.call_tool("get_server_time", {})
+
+    headers = _mcp_headers()
+    logger.debug("Calling MCP server", extra={"path": "/server_time"})
+    try:
+        response = await mcp_pool.request("GET", "/server_time", headers=headers)
+        logger.info(
+            "MCP server responded", extra={"status_code": response.status_code}
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as http_err:
+        logger.error(
+            "MCP server HTTP error",
+            extra={
+                "status_code": getattr(http_err.response, "status_code", None),
+                "text": getattr(http_err.response, "text", None),
+            },
+        )
+        raise
+    data = response.json()
+    return data["server_time"]
+
+
+async def call_mcp_tool(name: str, arguments: Dict[str, Any]) -> str:
+    """Invoke a tool discovered from the MCP manifest by name."""
+    if not MCP_SERVER_URL or not MCP_API_KEY:
+        raise ValueError("MCP configuration missing")
+
+    if MCP_TRANSPORT == "jsonrpc":
+        return await mcp_rpc.call_tool(name, arguments)
+
+    response = await mcp_pool.request(
+        "POST", f"/tools/{name}", headers=_mcp_headers(), json=arguments
+    )
+    logger.info(
+        "MCP tool responded", extra={"tool": name, "status_code": response.status_code}
+    )
+    response.raise_for_status()
+    return response.json()["result"]
+
+
+async def _fetch_tool_manifest(
+    etag: str | None,
+) -> Tuple[int, str | None, Dict[str, Any] | None]:
+    if not MCP_SERVER_URL or not MCP_API_KEY:
+        raise ValueError("MCP configuration missing")
+
+    headers = _mcp_headers()
+    if etag:
+        headers["If-None-Match"] = etag
+    response = await mcp_pool.request("GET", "/tools", headers=headers)
+    if response.status_code == 304:
+        return 304, etag, None
+    response.raise_for_status()
+    return response.status_code, response.headers.get("etag"), response.json()
+
+
+async def _get_server_time_tool(arguments: Dict[str, Any]) -> str:
+    return await call_mcp_server()
+
+
+def _remote_tool_handler(name: str) -> ToolHandler:
+    async def handler(arguments: Dict[str, Any]) -> str:
+        return await call_mcp_tool(name, arguments)
+
+    return handler
+
+
+# Tool definitions and name->handler dispatch; optionally refreshed from MCP /tools
+tool_catalog = ToolCatalog(
+    static_tools=STATIC_TOOLS,
+    static_handlers={"get_server_time": _get_server_time_tool},
+    static_metadata={
+        "get_server_time": {
+            "cache_ttl": 0.5,
+            "idempotent": True,
+            "answer_template": "The current server time is {result}.",
+        }
+    },
+    fetch_manifest=_fetch_tool_manifest,
+    remote_handler=_remote_tool_handler,
+    ttl=env_float("MCP_TOOLS_TTL", 300.0),
+    enabled=env_bool("MCP_TOOL_DISCOVERY", False),
+)
+
+
+# Per-tool result cache with in-flight coalescing (TTL comes from tool metadata)
+tool_cache = ToolResultCache(
+    maxsize=env_int("TOOL_CACHE_MAX_ENTRIES", 1024),
+    enabled=env_bool("TOOL_CACHE_ENABLED", False),
+    max_seconds=REQUEST_TIMEOUT_MAX or None,
+)
+
+
+def _parse_tool_ttls(spec: List[str]) -> Dict[str, float]:
+    """Parse ``tool=seconds`` items, skipping (and logging) malformed ones."""
+    ttls: Dict[str, float] = {}
+    for item in spec:
+        name, _, ttl = item.partition("=")
         try:
-            response = await client.get(url, headers=headers)
-            logger.info(
-                "MCP server responded", extra={"status_code": response.status_code}
-            )
-            response.raise_for_status()
-        except httpx.HTTPStatusError as http_err:
-            logger.error(
-                "MCP server HTTP error",
-                extra={
-                    "status_code": getattr(http_err.response, "status_code", None),
-                    "text": getattr(http_err.response, "text", None),
-                },
-            )
-            raise
-        data = response.json()
-        return data["server_time"]
+            value = float(ttl)
+        except ValueError:
+            value = math.nan
+        if not name.strip() or not math.isfinite(value) or value < 0:
+            logger.warning("Ignoring invalid TOOL_CACHE_TTLS item", extra={"item": item})
+            continue
+        ttls[name.strip()] = value
+    return ttls
 
 
-@app.post("/chat")
-async def chat(req: ChatRequest) -> Dict[str, str]:
-    """Handle a chat request, delegating to OpenAI and the MCP service."""
+TOOL_CACHE_TTLS: Dict[str, float] = _parse_tool_ttls(env_list("TOOL_CACHE_TTLS"))
+
+
+def _tool_cache_ttl(name: str) -> float:
+    if name in TOOL_CACHE_TTLS:
+        return TOOL_CACHE_TTLS[name]
+    ttl = tool_catalog.metadata(name).get("cache_ttl", 0)
+    return float(ttl) if isinstance(ttl, (int, float)) else 0.0
+
+
+# Opt-in local answers for single calls to tools with an answer template
+TEMPLATED_ANSWERS = env_bool("TEMPLATED_ANSWERS", False)
+TOOL_ANSWER_TEMPLATES: Dict[str, str] = {
+    name.strip(): template
+    for name, _, template in (item.partition("=") for item in env_list("TOOL_ANSWER_TEMPLATES", sep=";"))
+    if template
+}
+# Fraction of templated answers also sent to the model for quality comparison
+TEMPLATED_SHADOW_RATE = env_float("TEMPLATED_SHADOW_RATE", 0.0)
+_background_tasks: Set["asyncio.Task[None]"] = set()
+
+# Opt-in speculative tool calls started in parallel with the first completion
+prefetcher = Prefetcher(
+    rules=parse_rules(env_list("PREFETCH_RULES", [r"get_server_time=\b(time|clock)\b"], sep=";")),
+    enabled=env_bool("SPECULATIVE_PREFETCH", False),
+)
+
+# Optional cache of final answers for identical messages, with in-flight dedup
+answer_cache = AnswerCache(
+    backend=create_answer_backend(
+        os.getenv("ANSWER_CACHE_BACKEND", "memory").lower(),
+        env_int("ANSWER_CACHE_MAX_ENTRIES", 1024),
+        os.getenv("ANSWER_CACHE_PATH"),
+    ),
+    ttl=env_float("ANSWER_CACHE_TTL", 60.0),
+    enabled=env_bool("ANSWER_CACHE_ENABLED", False),
+    max_seconds=REQUEST_TIMEOUT_MAX or None,
+)
+
+# Server-side conversation history for requests that carry a session_id
+session_store = SessionStore(
+    backend=create_session_backend(
+        os.getenv("SESSION_BACKEND", "memory").lower(),
+        env_int("SESSION_MAX_SESSIONS", 1000),
+        os.getenv("SESSION_PATH"),
+    ),
+    ttl=env_float("SESSION_TTL", 1800.0),
+    max_tokens=env_int("SESSION_MAX_TOKENS", 2000),
+    max_turns=env_int("SESSION_MAX_TURNS", 20),
+    max_tool_chars=env_int("SESSION_TOOL_RESULT_CHARS", 500),
+    keep_tool_turns=env_int("SESSION_KEEP_TOOL_TURNS", 1),
+    enabled=env_bool("SESSIONS_ENABLED", True),
+)
+
+
+def _parse_arguments(raw: Any) -> Dict[str, Any]:
+    if not isinstance(raw, str) or not raw.strip():
+        return {}
+    arguments = json.loads(raw)
+    if not isinstance(arguments, dict):
+        raise ValueError("tool arguments must be a JSON object")
+    return arguments
+
+
+async def invoke_tool(name: str, handler: ToolHandler, arguments: Dict[str, Any]) -> str:
+    """Call a tool handler through the result cache and the resilience layer."""
+    idempotent = bool(tool_catalog.metadata(name).get("idempotent", False))
+    return await tool_cache.get_or_call(
+        name,
+        arguments,
+        _tool_cache_ttl(name),
+        lambda: mcp_resilience.call(lambda: handler(arguments), idempotent=idempotent),
+    )
+
+
+class ToolMessage(dict):
+    """A ``tool`` message that also records whether the call failed.
+
+    The flag is an attribute rather than a key, so the message sent to the
+    model is unchanged.
+    """
+
+    def __init__(self, *args: Any, failed: bool = False, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.failed = failed
+
+
+async def execute_tool_call(
+    tool_call: Any, prefetched: Dict[str, "asyncio.Task[str]"] | None = None
+) -> ToolMessage:
+    """Execute one tool call and return the ``tool`` message for the conversation.
+
+    Failures are converted into an error message so that one failing call never
+    affects the other calls made in the same turn. A matching speculative
+    prefetch from ``prefetched`` is used instead of a new call. The returned
+    :class:`ToolMessage` has ``failed`` set when the call did not succeed.
+    """
+    function_name = tool_call.function.name
+    handler = tool_catalog.handler(function_name)
+
+    if handler is not None:
+        # Call the MCP server
+        started = time.perf_counter()
+        try:
+            arguments = _parse_arguments(tool_call.function.arguments)
+            task = prefetcher.claim(prefetched or {}, function_name, arguments)
+            if task is not None:
+                function_response = await task
+            else:
+                function_response = await invoke_tool(function_name, handler, arguments)
+            outcome = "success"
+        except Exception as e:
+            logger.exception("Error calling MCP server")
+            function_response = f"Error calling MCP server: {str(e)}"
+            outcome = "error"
+        TOOL_CALL_SECONDS.observe(function_name, value=time.perf_counter() - started)
+        TOOL_CALLS.inc(function_name, outcome)
+    else:
+        logger.warning("Model requested unknown tool", extra={"tool": function_name})
+        function_response = f"Error: unknown tool '{function_name}'"
+        outcome = "unknown"
+        # Names invented by the model are not used as labels
+        TOOL_CALLS.inc("unknown", "unknown")
+
+    return ToolMessage(
+        tool_call_id=tool_call.id,
+        role="tool",
+        name=function_name,
+        content=function_response,
+        failed=outcome != "success",
+    )
+
+
+async def run_tool_calls(
+    tool_calls: List[Any], prefetched: Dict[str, "asyncio.Task[str]"] | None = None
+) -> List[ToolMessage]:
+    """Execute tool calls concurrently, capped at ``TOOL_CALL_CONCURRENCY``.
+
+    The returned ``tool`` messages are in the same order as ``tool_calls``.
+    """
+    semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+
+    async def _bounded(tool_call: Any) -> ToolMessage:
+        async with semaphore:
+            return await execute_tool_call(tool_call, prefetched)
+
+    if len(tool_calls) == 1:
+        return [await execute_tool_call(tool_calls[0], prefetched)]
+    return list(await asyncio.gather(*(_bounded(call) for call in tool_calls)))
+
+
+def start_prefetch(message: str) -> Dict[str, "asyncio.Task[str]"]:
+    """Start speculative calls for the tools the message most likely needs."""
+
+    async def run(name: str) -> str:
+        handler = tool_catalog.handler(name)
+        if handler is None:
+            raise ValueError(f"unknown tool '{name}'")
+        return await invoke_tool(name, handler, {})
+
+    return prefetcher.start(message, run)
+
+
+@app.get("/stats/admission")
+async def admission_stats() -> Dict[str, Any]:
+    """Return in-flight, queue depth and queue wait statistics for /chat."""
+    return admission.stats()
+
+
+@app.get("/stats/scheduler")
+async def scheduler_stats() -> Dict[str, Any]:
+    """Return upstream slot usage and queue-time statistics per client."""
+    return openai_scheduler.stats()
+
+
+@app.get("/stats/openai_pacing")
+async def openai_pacing_stats() -> Dict[str, Any]:
+    """Return the OpenAI rate-limit budgets last reported and pacing counters."""
+    return openai_pacer.stats()
+
+
+@app.get("/stats/mcp_pool")
+async def mcp_pool_stats() -> Dict[str, Any]:
+    """Return statistics for the shared MCP connection pool."""
+    return mcp_pool.stats()
+
+
+@app.get("/stats/mcp_rpc")
+async def mcp_rpc_stats() -> Dict[str, Any]:
+    """Return JSON-RPC session and batching statistics for the MCP channels."""
+    return {"transport": MCP_TRANSPORT, **mcp_rpc.stats()}
+
+
+@app.get("/stats/mcp_resilience")
+async def mcp_resilience_stats() -> Dict[str, Any]:
+    """Return retry, hedging and circuit breaker counters for MCP calls."""
+    return mcp_resilience.stats()
+
+
+@app.get("/stats/prefetch")
+async def prefetch_stats() -> Dict[str, Any]:
+    """Return speculative prefetch hit rate and wasted calls."""
+    return prefetcher.stats()
+
+
+@app.get("/stats/tools")
+async def tool_catalog_stats() -> Dict[str, Any]:
+    """Return the tools currently offered to the model and manifest cache state."""
+    return tool_catalog.stats()
+
+
+@app.get("/stats/tool_cache")
+async def tool_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss and coalescing counters for the tool result cache."""
+    return tool_cache.stats()
+
+
+@app.get("/stats/sessions")
+async def session_stats() -> Dict[str, Any]:
+    """Return session store size and history trimming counters."""
+    return session_store.stats()
+
+
+@app.get("/stats/startup")
+async def startup_stats() -> Dict[str, Any]:
+    """Return module import time and pre-warming step timings."""
+    return {
+        "import_seconds": IMPORT_SECONDS,
+        "prewarm": PREWARM,
+        "timings": startup_timings,
+        "openai_client_ready": globals().get("openai_client") is not None,
+    }
 
-    if not openai.api_key:
+
+@app.get("/stats/models")
+async def model_routing_stats() -> Dict[str, Any]:
+    """Return routed model counts, recent p95 latencies and fallback state."""
+    return model_router.stats()
+
+
+@app.get("/stats/prompt_cache")
+async def prompt_cache_stats() -> Dict[str, Any]:
+    """Return prompt and cached prompt tokens per completion stage."""
+    stages = {
+        stage: {
+            **totals,
+            "hit_ratio": round(totals["cached_tokens"] / totals["prompt_tokens"], 4)
+            if totals["prompt_tokens"]
+            else 0.0,
+        }
+        for stage, totals in sorted(prompt_usage.items())
+    }
+    prompt_tokens = sum(totals["prompt_tokens"] for totals in prompt_usage.values())
+    cached_tokens = sum(totals["cached_tokens"] for totals in prompt_usage.values())
+    return {
+        "prefix_fingerprint": prompt_prefix_fingerprint(),
+        "prompt_cache_key": PROMPT_CACHE_OPTIONS.get("prompt_cache_key"),
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "hit_ratio": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+        "stages": stages,
+    }
+
+
+@app.get("/stats/answer_cache")
+async def answer_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss and deduplication counters for the answer cache."""
+    return answer_cache.stats()
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Record the duration of a chat pipeline stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHAT_STAGE_SECONDS.observe(stage, value=time.perf_counter() - started)
+
+
+def record_usage(stage: str, response: Any) -> None:
+    """Add the token counts from an OpenAI response to the usage counters.
+
+    ``usage.prompt_tokens_details.cached_tokens`` is tracked per stage, with
+    the share of each prompt served from the provider's prompt cache.
+    """
+    usage = getattr(response, "usage", None)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if isinstance(value, int):
+            OPENAI_TOKENS.inc(stage, kind.split("_")[0], amount=value)
+
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    if not isinstance(prompt_tokens, int) or prompt_tokens <= 0:
+        return
+    cached = cached_tokens if isinstance(cached_tokens, int) else 0
+    OPENAI_TOKENS.inc(stage, "cached", amount=cached)
+    PROMPT_CACHE_RATIO.observe(stage, value=cached / prompt_tokens)
+    totals = prompt_usage.setdefault(stage, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+    totals["requests"] += 1
+    totals["prompt_tokens"] += prompt_tokens
+    totals["cached_tokens"] += cached
+    logger.debug(
+        "OpenAI prompt usage",
+        extra={"stage": stage, "prompt_tokens": prompt_tokens, "cached_tokens": cached},
+    )
+
+
+def prompt_prefix_fingerprint() -> str:
+    """Return a short hash of the static prefix: system prompt and tool manifest."""
+    raw = "\x00".join((SYSTEM_PROMPT, tool_catalog.fingerprint))
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def _collect_component_metrics() -> List[Any]:
+    pool = mcp_pool.stats()
+    admission_state = admission.stats()
+    resilience = mcp_resilience.stats()
+    breaker = resilience["circuit_breaker"]
+    pacing = openai_pacer.stats()
+    rpc = mcp_rpc.stats()
+    return [
+        gauge_from_values(
+            "chat_admission_in_flight", "Chat requests holding an admission slot",
+            {(): admission_state["in_flight"]},
+        ),
+        gauge_from_values(
+            "chat_admission_queue_depth", "Chat requests waiting for an admission slot",
+            {(): admission_state["queue_depth"]},
+        ),
+        counter_from_values(
+            "chat_admission_rejected_total", "Chat requests shed by admission control",
+            {
+                ("queue_full",): admission_state["rejected_queue_full"],
+                ("timeout",): admission_state["rejected_timeout"],
+            },
+            ("reason",),
+        ),
+        gauge_from_values(
+            "openai_scheduler_in_flight", "OpenAI calls holding an upstream slot",
+            {(): openai_scheduler.in_flight},
+        ),
+        gauge_from_values(
+            "openai_scheduler_queue_depth", "OpenAI calls waiting for an upstream slot",
+            {(): openai_scheduler.queue_depth},
+        ),
+        gauge_from_values(
+            "openai_ratelimit_remaining", "OpenAI rate-limit budget left in the window, by kind",
+            {
+                (kind,): pacing[kind]["remaining"]
+                for kind in ("requests", "tokens")
+                if pacing[kind]["remaining"] is not None
+            },
+            ("kind",),
+        ),
+        counter_from_values(
+            "openai_rate_limited_total", "OpenAI responses with status 429",
+            {(): pacing["rate_limited"]},
+        ),
+        counter_from_values(
+            "openai_paced_total", "OpenAI calls held back by rate-limit pacing",
+            {(): pacing["paced"]},
+        ),
+        gauge_from_values(
+            "mcp_pool_connections", "Connections in the MCP pool by state",
+            {("active",): pool["active_connections"], ("idle",): pool["idle_connections"]},
+            ("state",),
+        ),
+        gauge_from_values(
+            "mcp_requests_in_flight", "MCP requests in flight", {(): pool["in_flight"]}
+        ),
+        gauge_from_values(
+            "mcp_replica_healthy", "1 while an MCP replica is in rotation",
+            {(replica["url"],): int(replica["healthy"]) for replica in pool["replicas"]},
+            ("replica",),
+        ),
+        gauge_from_values(
+            "mcp_circuit_breaker_open", "1 when the MCP circuit breaker is not closed",
+            {(): 0 if breaker["state"] == "closed" else 1},
+        ),
+        counter_from_values(
+            "mcp_circuit_breaker_transitions_total", "MCP circuit breaker state transitions",
+            {(key,): value for key, value in breaker["transitions"].items()},
+            ("transition",),
+        ),
+        counter_from_values(
+            "mcp_retries_total", "MCP call retries and hedges",
+            {("retry",): resilience["retries"], ("hedge",): resilience["hedged"]},
+            ("kind",),
+        ),
+        counter_from_values(
+            "mcp_rpc_batches_total", "JSON-RPC batches sent to MCP", {(): rpc["batches"]}
+        ),
+        counter_from_values(
+            "mcp_rpc_calls_total", "JSON-RPC calls sent to MCP in batches", {(): rpc["calls"]}
+        ),
+        counter_from_values(
+            "mcp_rpc_sessions_total", "JSON-RPC sessions opened with MCP", {(): rpc["initializations"]}
+        ),
+        gauge_from_values(
+            "openai_model_degraded", "1 while a model's requests go to the fallback model",
+            {(model,): 1 for model in model_router.degraded()},
+            ("model",),
+        ),
+        counter_from_values(
+            "tool_prefetch_total", "Speculative tool prefetches by result",
+            {
+                ("started",): prefetcher.started,
+                ("hit",): prefetcher.hits,
+                ("wasted",): prefetcher.wasted,
+                ("miss",): prefetcher.misses,
+            },
+            ("result",),
+        ),
+    ]
+
+
+metrics.add_collector(_collect_component_metrics)
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Expose metrics in the Prometheus text format."""
+    body = shared_metrics.render() if shared_metrics is not None else metrics.render()
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
+
+
+def _check_configuration() -> None:
+    if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
     if not MCP_API_KEY or not MCP_SERVER_URL:
         raise HTTPException(status_code=500, detail="MCP configuration missing")
 
-    logger.info(
-        "Handling chat request", extra={"message_preview": req.message[:80]}
-    )
 
-    # First API call: Ask the model with tool definitions
-    messages = [
-        {
-            "role": "system",
-            "content": "You are a helpful assistant. When asked about the current time or server time, you MUST use the get_server_time tool to get the accurate time from the MCP server. When you receive the time from the MCP server, include the '[MCP Server Time]' prefix in your response to show that the time came from the MCP server.",
-        },
-        {"role": "user", "content": req.message},
+def build_messages(message: str, history: List[Dict[str, Any]] | None = None) -> List[Dict[str, Any]]:
+    """Return the initial conversation for a user message, after any session history."""
+    return [
+        SYSTEM_MESSAGE,
+        *(history or []),
+        {"role": "user", "content": message},
     ]
 
-    response = await openai_client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=messages,
-        tools=tools,
-        tool_choice="auto",
-    )
+
+def _check_sessions_enabled() -> None:
+    if not session_store.enabled:
+        raise HTTPException(status_code=400, detail="Sessions are disabled")
+
+
+async def _check_session(session_id: str | None) -> None:
+    """Reject session IDs that this server did not issue or that expired."""
+    if session_id is None:
+        return
+    _check_sessions_enabled()
+    if not await session_store.exists(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+
+
+def _user_content(messages: List[Dict[str, Any]]) -> str:
+    """Return the latest user message of a conversation."""
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content") or "")
+    return ""
+
+
+async def create_completion(stage: str, model: str, **kwargs: Any) -> Any:
+    """Call the OpenAI chat completions API and report its latency to the router.
+
+    The call first waits for an upstream slot from the fair scheduler and
+    then for the rate-limit pacer; the time left before the request deadline
+    after that is passed as the timeout. Retryable failures are retried up to
+    ``OPENAI_MAX_RETRIES`` times, each retry paced again, so after a 429 all
+    calls wait out the same backoff. Timeouts and server errors are reported
+    to the router as slow completions. For streams the latency is measured until
+    the response starts, but the slot is held until the returned stream is
+    used up or closed.
+    """
+    tokens = _estimate_request_tokens(kwargs)
+    held: AsyncExitStack | None = None
+    async with AsyncExitStack() as stack:
+        waited = await stack.enter_async_context(openai_scheduler.slot())
+        OPENAI_QUEUE_SECONDS.observe(current_client()[1], value=waited)
+        attempt = 0
+        while True:
+            await openai_pacer.wait(tokens, remaining())
+            left = remaining()
+            if left is not None:
+                if left == 0.0:
+                    raise DeadlineExceeded(f"request deadline exceeded before {stage}")
+                kwargs["timeout"] = left
+            OPENAI_REQUESTS.inc(stage, model)
+            started = time.perf_counter()
+            client = get_openai_client()
+            try:
+                response = await client.chat.completions.create(model=model, **kwargs, **PROMPT_CACHE_OPTIONS)
+                break
+            except asyncio.CancelledError:
+                if remaining() == 0.0:
+                    # Cut off by the request deadline: the model was too slow
+                    model_router.observe(model, time.perf_counter() - started, failed=True)
+                raise
+            except Exception as exc:
+                import openai
+
+                if isinstance(exc, openai.APITimeoutError) or (
+                    is_retryable(exc) and not isinstance(exc, openai.RateLimitError)
+                ):
+                    # Timeouts and server errors count as slow answers; a 429 or a
+                    # rejected request says nothing about the model's latency
+                    model_router.observe(model, time.perf_counter() - started, failed=True)
+                if isinstance(exc, openai.APITimeoutError) and remaining() == 0.0:
+                    # Only the request's own deadline becomes a 504; other
+                    # client timeouts are upstream failures like any other
+                    raise DeadlineExceeded(f"OpenAI {stage} completion timed out") from exc
+                if not openai_pacer.enabled or attempt >= OPENAI_MAX_RETRIES or not is_retryable(exc):
+                    raise
+                rate_limited = isinstance(exc, openai.RateLimitError)
+            OPENAI_RETRIES.inc(stage)
+            logger.warning("Retrying OpenAI completion", extra={"stage": stage, "attempt": attempt + 1})
+            if not rate_limited:
+                # 429s wait in the pacer; other failures back off on their own
+                left = remaining()
+                delay = openai_pacer.backoff(attempt)
+                await asyncio.sleep(delay if left is None else min(delay, left))
+            attempt += 1
+        if kwargs.get("stream"):
+            held = stack.pop_all()
+    model_router.observe(model, time.perf_counter() - started)
+    if held is not None:
+        return _holding_slot(response, held)
+    return response
+
+
+async def _holding_slot(stream: Any, slot: AsyncExitStack) -> AsyncIterator[Any]:
+    """Yield the chunks of ``stream``, then free the scheduler slot in ``slot``."""
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        try:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                # Release the upstream connection when the stream was cut short
+                await close()
+        finally:
+            await slot.aclose()
+
+
+
+def _estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Estimate the tokens a completion counts against the rate limit (prompt plus output cap)."""
+    prompt = sum(estimate_tokens(m) for m in kwargs.get("messages") or () if isinstance(m, dict))
+    return prompt + int(kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or 0)
+
+
+def templated_answer(tool_messages: List[Dict[str, Any]]) -> str | None:
+    """Build the final answer locally when one templated tool was called.
+
+    Applies when templated answers are enabled, the model made exactly one tool
+    call, that tool has an ``answer_template`` and the call did not fail.
+    """
+    if not TEMPLATED_ANSWERS or len(tool_messages) != 1:
+        return None
+    name = tool_messages[0]["name"]
+    template = TOOL_ANSWER_TEMPLATES.get(name) or tool_catalog.metadata(name).get("answer_template")
+    if not isinstance(template, str) or getattr(tool_messages[0], "failed", True):
+        return None
+    ANSWERS.inc("template", name)
+    return template.replace("{result}", tool_messages[0]["content"])
+
+
+def maybe_shadow_templated(messages: List[Dict[str, Any]], tool: str, templated: str) -> None:
+    """Sample templated answers for comparison with the model's own answer.
+
+    The skipped second completion runs in the background for a fraction of
+    requests; both answers are logged and whether the model's answer contains
+    the tool result is counted.
+    """
+    if TEMPLATED_SHADOW_RATE <= 0 or random.random() >= TEMPLATED_SHADOW_RATE:
+        return
+
+    async def shadow() -> None:
+        try:
+            model = model_router.route("answer", _user_content(messages), [tool])
+            response = await create_completion("shadow", model, messages=list(messages))
+        except Exception:
+            logger.warning("Templated answer shadow completion failed", exc_info=True)
+            return
+        record_usage("shadow", response)
+        model_answer = response.choices[0].message.content or ""
+        matches = messages[-1]["content"] in model_answer
+        TEMPLATED_SHADOW.inc(tool, "yes" if matches else "no")
+        logger.info(
+            "Templated answer shadow comparison",
+            extra={"tool": tool, "templated": templated, "model": model_answer, "contains_result": matches},
+        )
+
+    task = asyncio.ensure_future(shadow())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def complete_chat(message: str) -> str | None:
+    """Run the tool-calling flow for one message and return the final answer."""
+
+    # First API call: Ask the model with tool definitions
+    messages = build_messages(message)
+    prefetched = start_prefetch(message)
+    try:
+        return await _complete_chat(messages, prefetched)
+    finally:
+        prefetcher.discard(prefetched)
+
+
+async def complete_session_chat(session_id: str, message: str) -> str | None:
+    """Answer a message in a session: prepend its history and store the new turn.
+
+    Turns of one session run one at a time so each sees the previous answer.
+    """
+    async with session_store.lock(session_id):
+        history = await session_store.history(session_id)
+        SESSION_HISTORY_TOKENS.observe(value=session_store.last_history_tokens)
+        messages = build_messages(message, history)
+        prefetched = start_prefetch(message)
+        try:
+            answer = await _complete_chat(messages, prefetched)
+        finally:
+            prefetcher.discard(prefetched)
+        await session_store.append(session_id, messages[len(history) + 1:], answer)
+        return answer
+
+
+async def _complete_chat(
+    messages: List[Dict[str, Any]], prefetched: Dict[str, "asyncio.Task[str]"]
+) -> str | None:
+    message = _user_content(messages)
+    with observe_stage("openai_first"):
+        response = await create_completion(
+            "openai_first",
+            model_router.route("tools", message),
+            messages=messages,
+            tools=await tool_catalog.get_tools(),
+            tool_choice="auto",
+        )
+    record_usage("openai_first", response)
 
     response_message = response.choices[0].message
     tool_calls = response_message.tool_calls
@@ -129,39 +1148,358 @@ async def chat(req: ChatRequest) -> Dict[str, str]:
         assistant_msg = response_message.model_dump()
         messages.append(assistant_msg)
 
-        # Process each tool call
-        for tool_call in tool_calls:
-            function_name = tool_call.function.name
-
-            if function_name == "get_server_time":
-                # Call the MCP server
-                try:
-                    server_time = await call_mcp_server()
-                    function_response = server_time
-                except Exception as e:
-                    logger.exception("Error calling MCP server")
-                    function_response = f"Error calling MCP server: {str(e)}"
-
-                # Add the function response to the conversation
-                messages.append(
-                    {
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": function_response,
-                    }
-                )
+        # Run all requested tool calls concurrently; results keep the model's order
+        with observe_stage("mcp_tools"):
+            tool_messages = await run_tool_calls(tool_calls, prefetched)
+        messages.extend(tool_messages)
+        # The answer is only as fresh as the tool results it was built from
+        cap_answer_ttl(min(_tool_cache_ttl(m["name"]) for m in tool_messages))
+
+        templated = templated_answer(tool_messages)
+        if templated is not None:
+            maybe_shadow_templated(messages, tool_messages[0]["name"], templated)
+            return templated
 
         # Get the final response from the model
-        second_response = await openai_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-        )
+        with observe_stage("openai_second"):
+            second_response = await create_completion(
+                "openai_second",
+                model_router.route("answer", message, [m["name"] for m in tool_messages]),
+                messages=messages,
+            )
+        record_usage("openai_second", second_response)
 
         final_message = second_response.choices[0].message.content
+        ANSWERS.inc("model", "tools")
     else:
         # No tool call was made
         logger.info("Model did not request any tool calls")
         final_message = response_message.content
+        ANSWERS.inc("model", "none")
+
+    return final_message
+
+
+def _deadline_for(request: Request) -> float | None:
+    return request_timeout(request.headers, REQUEST_TIMEOUT_HEADER, REQUEST_TIMEOUT, REQUEST_TIMEOUT_MAX)
+
+
+def _client_for(request: Request, default_priority: str) -> Tuple[str, str]:
+    """Return the request's client; ``X-Priority`` may lower its priority but not raise it."""
+    tenant, priority = client_from_headers(request.headers, TENANT_HEADER, default_priority)
+    if PRIORITIES.index(priority) < PRIORITIES.index(default_priority):
+        priority = default_priority
+    return tenant, priority
+
+
+@app.post("/sessions", status_code=201)
+async def create_session() -> Dict[str, str]:
+    """Start a conversation session and return its server-issued ID."""
+    _check_sessions_enabled()
+    return {"session_id": await session_store.create()}
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest, request: Request) -> Dict[str, str]:
+    """Handle a chat request, delegating to OpenAI and the MCP service.
+
+    The work is bounded by the request deadline and cancelled if the client
+    disconnects before the answer is ready.
+    """
+
+    _check_configuration()
+    await _check_session(req.session_id)
+
+    logger.info(
+        "Handling chat request", extra={"message_preview": req.message[:80]}
+    )
+
+    async def answer() -> Dict[str, str]:
+        if req.session_id is not None:
+            return {
+                "answer": await complete_session_chat(req.session_id, req.message),
+                "session_id": req.session_id,
+            }
+        return {"answer": await answer_message(req.message)}
+
+    with deadline_scope(_deadline_for(request)), client_scope(*_client_for(request, "interactive")):
+        async with admission.admit():
+            with observe_stage("total"):
+                return await cancel_on_disconnect(request.receive, with_deadline(answer()))
+
+
+async def answer_message(message: str) -> str | None:
+    """Answer one message, going through the answer cache when it is enabled."""
+    if not answer_cache.enabled:
+        return await complete_chat(message)
+
+    await tool_catalog.get_tools()
+    key = AnswerCache.key(message, model_router.signature(), tool_catalog.fingerprint)
+    return await answer_cache.get_or_compute(key, lambda: complete_chat(message))
+
+
+async def run_batch(messages: List[str], concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """Answer ``messages`` with at most ``concurrency`` in flight.
+
+    Results are yielded as they complete, each tagged with the index of its
+    message; a failed item yields an ``error`` entry instead of an ``answer``.
+    Every item holds an admission slot while it runs, so a batch counts
+    towards the same in-flight limit as interactive requests; an item that is
+    shed yields an ``error`` entry with ``retry_after``.
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(messages):
+        pending.put_nowait(item)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        while True:
+            try:
+                index, message = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                async with admission.admit():
+                    result = {"index": index, "answer": await answer_message(message)}
+            except Overloaded as e:
+                logger.warning("Batch item shed", extra={"index": index, "reason": e.reason})
+                result = {
+                    "index": index,
+                    "error": f"Server overloaded ({e.reason})",
+                    "retry_after": max(1, math.ceil(e.retry_after)),
+                }
+            except Exception as e:
+                logger.warning("Batch item failed", extra={"index": index, "error": str(e)})
+                result = {"index": index, "error": str(e)}
+            await results.put(result)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(messages)))]
+    try:
+        for _ in range(len(messages)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+@app.post("/chat/batch")
+async def chat_batch(req: BatchChatRequest, request: Request) -> StreamingResponse:
+    """Answer a list of messages, streaming one NDJSON line per result.
+
+    Its OpenAI calls are scheduled as ``batch`` work unless ``X-Priority``
+    says otherwise.
+    """
+
+    _check_configuration()
+
+    if len(req.messages) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} messages"
+        )
+    concurrency = max(1, min(req.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    logger.info(
+        "Handling batch chat request",
+        extra={"num_messages": len(req.messages), "concurrency": concurrency},
+    )
+
+    client = _client_for(request, "batch")
+
+    async def lines() -> AsyncIterator[str]:
+        # Batch workers are started inside the scope and inherit the client
+        with client_scope(*client):
+            async for result in run_batch(req.messages, concurrency):
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _merge_tool_call_deltas(pending: Dict[int, Dict[str, Any]], deltas: Any) -> None:
+    """Accumulate streamed tool-call fragments, keyed by their index."""
+    for delta in deltas or []:
+        entry = pending.setdefault(
+            delta.index,
+            {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+        )
+        if delta.id:
+            entry["id"] = delta.id
+        function = delta.function
+        if function is not None:
+            if function.name:
+                entry["function"]["name"] += function.name
+            if function.arguments:
+                entry["function"]["arguments"] += function.arguments
+
+
+async def stream_chat_events(
+    message: str,
+    history: List[Dict[str, Any]] | None = None,
+    on_done: Callable[[List[Dict[str, Any]], str], Awaitable[None]] | None = None,
+) -> AsyncIterator[str]:
+    """Run the tool-calling flow with streamed completions, yielding SSE events.
+
+    Events are ``token`` (a content delta), ``tool`` (a tool is being called),
+    ``done`` (the full answer, exactly the concatenated ``token`` contents)
+    and ``error``. ``on_done`` receives the
+    conversation and the answer before ``done`` is sent.
+    """
+    messages = build_messages(message, history)
+    answer_parts: List[str] = []
+    pending: Dict[int, Dict[str, Any]] = {}
+    prefetched = start_prefetch(message)
+
+    try:
+        stream = await create_completion(
+            "stream_first",
+            model_router.route("tools", message),
+            messages=messages,
+            tools=await tool_catalog.get_tools(),
+            tool_choice="auto",
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async with aclosing(stream):
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    record_usage("stream_first", chunk)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                _merge_tool_call_deltas(pending, getattr(delta, "tool_calls", None))
+                # Content is only streamed straight through when no tool is requested
+                if delta.content and not pending:
+                    answer_parts.append(delta.content)
+                    yield _sse("token", {"content": delta.content})
+
+        if pending:
+            assistant_tool_calls = [pending[index] for index in sorted(pending)]
+            logger.info("Model requested tool calls", extra={"num_calls": len(assistant_tool_calls)})
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": "".join(answer_parts) or None,
+                    "tool_calls": assistant_tool_calls,
+                }
+            )
+            for call in assistant_tool_calls:
+                yield _sse("tool", {"name": call["function"]["name"]})
+            tool_calls = [
+                SimpleNamespace(
+                    id=call["id"],
+                    function=SimpleNamespace(**call["function"]),
+                )
+                for call in assistant_tool_calls
+            ]
+            with observe_stage("mcp_tools"):
+                tool_messages = await run_tool_calls(tool_calls, prefetched)
+            messages.extend(tool_messages)
+            prefetcher.discard(prefetched)
+
+            templated = templated_answer(tool_messages)
+            if templated is not None:
+                maybe_shadow_templated(messages, tool_messages[0]["name"], templated)
+                answer_parts.append(templated)
+                yield _sse("token", {"content": templated})
+                answer = "".join(answer_parts)
+                if on_done is not None:
+                    await on_done(messages, answer)
+                yield _sse("done", {"answer": answer})
+                return
+
+            # Text streamed before the tool call stays part of the answer, so
+            # ``done`` always matches the tokens the client has shown
+            second_stream = await create_completion(
+                "stream_second",
+                model_router.route("answer", message, [m["name"] for m in tool_messages]),
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async with aclosing(second_stream):
+                async for chunk in second_stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        record_usage("stream_second", chunk)
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        answer_parts.append(content)
+                        yield _sse("token", {"content": content})
+    except Exception as e:
+        logger.exception("Error while streaming chat response")
+        yield _sse("error", {"detail": str(e)})
+        return
+    finally:
+        prefetcher.discard(prefetched)
+
+    answer = "".join(answer_parts)
+    if on_done is not None:
+        await on_done(messages, answer)
+    yield _sse("done", {"answer": answer})
+
+
+async def stream_session_events(session_id: str, message: str) -> AsyncIterator[str]:
+    """Stream an answer in a session, storing the turn once it is complete."""
+    async with session_store.lock(session_id):
+        history = await session_store.history(session_id)
+        SESSION_HISTORY_TOKENS.observe(value=session_store.last_history_tokens)
+
+        async def save(messages: List[Dict[str, Any]], answer: str) -> None:
+            await session_store.append(session_id, messages[len(history) + 1:], answer)
+
+        async for event in stream_chat_events(message, history, save):
+            yield event
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request) -> StreamingResponse:
+    """Handle a chat request, streaming the answer as Server-Sent Events.
+
+    Each completion and tool call is bounded by the request deadline; the
+    stream is cancelled when the client disconnects.
+    """
+
+    _check_configuration()
+    await _check_session(req.session_id)
+
+    logger.info(
+        "Handling streaming chat request", extra={"message_preview": req.message[:80]}
+    )
+
+    # The slot is held until the stream finishes, however it ends
+    await admission.acquire()
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            admission.release()
+
+    timeout = _deadline_for(request)
+    client = _client_for(request, "interactive")
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            with deadline_scope(timeout), client_scope(*client):
+                if req.session_id is not None:
+                    source = stream_session_events(req.session_id, req.message)
+                else:
+                    source = stream_chat_events(req.message)
+                async for event in source:
+                    yield event
+        finally:
+            release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),
+    )
+
 
-    return {"answer": final_message}
+IMPORT_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 4)
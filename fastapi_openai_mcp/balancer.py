@@ -0,0 +1,256 @@
+"""Load balancing MCP calls across replicas, with active health checks."""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import httpx
+
+from .config import env_float, env_int
+from .deadline import deadline_expired
+from .mcp_client import MCPConnectionPool
+
+logger = logging.getLogger("fastapi_openai_mcp.balancer")
+
+POLICIES = ("least_outstanding", "ewma")
+
+
+class MCPReplica:
+    """One MCP endpoint with its own connection pool and health state."""
+
+    def __init__(self, url: str, pool: MCPConnectionPool) -> None:
+        self.url = url
+        self.pool = pool
+        self.healthy = True
+        self.ewma = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.ejections = 0
+        self.request_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def outstanding(self) -> int:
+        return self.pool.in_flight
+
+    def available(self, now: float) -> bool:
+        """In rotation: passing health checks and not ejected for failing requests."""
+        return self.healthy and now >= self.ejected_until
+
+    def observe(self, seconds: float, decay: float) -> None:
+        """Fold a request latency into the exponentially weighted average."""
+        self.ewma = seconds if self.samples == 0 else decay * seconds + (1 - decay) * self.ewma
+        self.samples += 1
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.pool.stats()
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected": time.monotonic() < self.ejected_until,
+            "request_failures": self.request_failures,
+            "outstanding": self.outstanding,
+            "ewma_ms": round(1000 * self.ewma, 3),
+            "requests_total": pool["requests_total"],
+            "errors_total": pool["errors_total"],
+            "connections": pool["connections"],
+            "ejections": self.ejections,
+        }
+
+
+class MCPReplicaSet:
+    """Spreads MCP requests over replicas and takes unhealthy ones out of rotation.
+
+    ``least_outstanding`` sends each request to the replica with the fewest
+    requests in flight. ``ewma`` weighs that count by each replica's recent
+    latency, so a slow replica gets less traffic before it fails outright;
+    replicas without samples yet are tried first. Ties are broken at random.
+    A failed request counts in the average as at least ``error_penalty``
+    seconds, so a replica failing fast does not look fast.
+
+    With more than one replica, ``GET <url><health_path>`` is polled every
+    ``health_interval`` seconds. ``unhealthy_threshold`` failed checks in a row
+    take a replica out of rotation and ``healthy_threshold`` passed checks put
+    it back. Between checks, ``eject_failures`` failed requests in a row
+    (transport errors or ``5xx``) take a replica out for ``eject_seconds``.
+    If every replica is out, requests go to all of them rather than failing
+    outright.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        pool_factory: Callable[[str], MCPConnectionPool] = MCPConnectionPool,
+        policy: str = "least_outstanding",
+        ewma_decay: float = 0.3,
+        health_path: str = "/health",
+        health_interval: float = 5.0,
+        health_timeout: float = 1.0,
+        unhealthy_threshold: int = 2,
+        healthy_threshold: int = 2,
+        error_penalty: float = 1.0,
+        eject_failures: int = 3,
+        eject_seconds: float = 5.0,
+        choice: Callable[[List[MCPReplica]], MCPReplica] = random.choice,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown MCP balancing policy '{policy}'")
+        self.replicas = [MCPReplica(url.rstrip("/"), pool_factory(url.rstrip("/"))) for url in urls]
+        self.policy = policy
+        self.ewma_decay = ewma_decay
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.unhealthy_threshold = max(1, unhealthy_threshold)
+        self.healthy_threshold = max(1, healthy_threshold)
+        self.error_penalty = error_penalty
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self.choice = choice
+        self._health_task: asyncio.Task | None = None
+        self.health_checks = 0
+
+    @classmethod
+    def from_env(cls, urls: Sequence[str]) -> "MCPReplicaSet":
+        """Build a replica set from ``MCP_BALANCE_POLICY`` and ``MCP_HEALTH_*``.
+
+        Every replica gets a pool configured from ``MCP_POOL_*`` as usual.
+        """
+        return cls(
+            urls,
+            pool_factory=MCPConnectionPool.from_env,
+            policy=os.getenv("MCP_BALANCE_POLICY", "least_outstanding").lower(),
+            ewma_decay=env_float("MCP_BALANCE_EWMA_DECAY", 0.3),
+            health_path=os.getenv("MCP_HEALTH_PATH", "/health"),
+            health_interval=env_float("MCP_HEALTH_INTERVAL", 5.0),
+            health_timeout=env_float("MCP_HEALTH_TIMEOUT", 1.0),
+            unhealthy_threshold=env_int("MCP_HEALTH_UNHEALTHY_THRESHOLD", 2),
+            healthy_threshold=env_int("MCP_HEALTH_HEALTHY_THRESHOLD", 2),
+            error_penalty=env_float("MCP_BALANCE_ERROR_PENALTY", 1.0),
+            eject_failures=env_int("MCP_BALANCE_EJECT_FAILURES", 3),
+            eject_seconds=env_float("MCP_BALANCE_EJECT_SECONDS", 5.0),
+        )
+
+    def open(self) -> None:
+        for replica in self.replicas:
+            replica.pool.open()
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.pool.aclose()
+
+    def pick(self) -> MCPReplica:
+        """Return the replica the next request should go to."""
+        if not self.replicas:
+            raise ValueError("MCP configuration missing")
+        now = time.monotonic()
+        candidates = [r for r in self.replicas if r.available(now)] or self.replicas
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.policy == "ewma":
+            scores = [r.ewma * (r.outstanding + 1) if r.samples else 0.0 for r in candidates]
+        else:
+            scores = [float(r.outstanding) for r in candidates]
+        best = min(scores)
+        return self.choice([r for r, score in zip(candidates, scores) if score == best])
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send ``method path`` to the chosen replica through its own pool."""
+        replica = self.pick()
+        started = time.monotonic()
+        try:
+            response = await replica.pool.request(method, path, **kwargs)
+        except httpx.TransportError as exc:
+            if not deadline_expired(exc):
+                self._failed(replica, started)
+            raise
+        if response.status_code >= 500:
+            self._failed(replica, started)
+        else:
+            replica.request_failures = 0
+            replica.observe(time.monotonic() - started, self.ewma_decay)
+        return response
+
+    def _failed(self, replica: MCPReplica, started: float) -> None:
+        now = time.monotonic()
+        replica.observe(max(now - started, self.error_penalty), self.ewma_decay)
+        replica.request_failures += 1
+        if self.eject_failures > 0 and replica.request_failures >= self.eject_failures and now >= replica.ejected_until:
+            replica.ejected_until = now + self.eject_seconds
+            replica.ejections += 1
+            logger.warning(
+                "MCP replica ejected after failed requests",
+                extra={"replica": replica.url, "failures": replica.request_failures},
+            )
+
+    def start_health_checks(self) -> None:
+        """Start polling replica health in the background (only with several replicas)."""
+        if len(self.replicas) < 2 or self.health_interval <= 0 or self._health_task is not None:
+            return
+        self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    async def check_health(self) -> None:
+        """Probe every replica once and update which ones are in rotation."""
+        self.health_checks += 1
+        results = await asyncio.gather(*(self._probe(replica) for replica in self.replicas))
+        for replica, ok in zip(self.replicas, results):
+            if ok:
+                replica.consecutive_failures = 0
+                replica.consecutive_successes += 1
+                if not replica.healthy and replica.consecutive_successes >= self.healthy_threshold:
+                    replica.healthy = True
+                    logger.warning("MCP replica back in rotation", extra={"replica": replica.url})
+            else:
+                replica.consecutive_successes = 0
+                replica.consecutive_failures += 1
+                if replica.healthy and replica.consecutive_failures >= self.unhealthy_threshold:
+                    replica.healthy = False
+                    replica.ejections += 1
+                    logger.warning("MCP replica out of rotation", extra={"replica": replica.url})
+
+    async def _probe(self, replica: MCPReplica) -> bool:
+        try:
+            response = await replica.pool.client.get(self.health_path, timeout=self.health_timeout)
+        except httpx.HTTPError:
+            return False
+        return response.status_code < 500
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the pool statistics summed over replicas, plus per-replica detail."""
+        pools = [replica.pool.stats() for replica in self.replicas]
+        totals = {
+            key: sum(pool[key] for pool in pools)
+            for key in (
+                "connections", "idle_connections", "active_connections",
+                "requests_total", "errors_total", "in_flight", "max_in_flight",
+            )
+        }
+        first = pools[0] if pools else {}
+        return {
+            "open": any(pool["open"] for pool in pools),
+            "http2": first.get("http2", False),
+            "max_connections": first.get("max_connections", 0),
+            "max_keepalive_connections": first.get("max_keepalive_connections", 0),
+            "keepalive_expiry": first.get("keepalive_expiry", 0.0),
+            **totals,
+            "policy": self.policy,
+            "healthy_replicas": sum(1 for replica in self.replicas if replica.available(time.monotonic())),
+            "health_checks": self.health_checks,
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
@@ -0,0 +1,377 @@
+"""Caches: a bounded TTL/LRU map, single-flight coalescing, tool and answer caches."""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Tuple
+
+from .deadline import deadline_scope, with_deadline
+
+MISSING = object()
+
+# Upper bound on how long the answer being computed may be cached, if any
+_answer_ttl: ContextVar[float | None] = ContextVar("answer_ttl", default=None)
+
+
+def cap_answer_ttl(seconds: float) -> None:
+    """Limit how long the answer being computed may be cached; ``0`` keeps it out.
+
+    Called for answers built from tool results, which must not outlive them.
+    """
+    current = _answer_ttl.get()
+    _answer_ttl.set(seconds if current is None else min(current, seconds))
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after a per-entry TTL."""
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or ``MISSING`` if absent or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Store ``value`` for ``ttl`` seconds, evicting the least recently used entry."""
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class _Flight:
+    """One shared call and the number of callers still waiting for it."""
+
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one upstream call.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same result (or exception). Cancelling one waiter does
+    not cancel the shared call, but it is cancelled once every waiter has gone.
+
+    The shared call serves several requests, so it does not inherit the first
+    caller's deadline: it runs under a deadline of ``max_seconds`` (none when
+    ``None``) and each waiter gives up at its own deadline instead.
+    """
+
+    def __init__(self, max_seconds: float | None = None) -> None:
+        self.max_seconds = max_seconds
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._calls.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            flight = self._start(key, fn)
+        flight.waiters += 1
+        try:
+            return await with_deadline(asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to use the result
+                self.abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> _Flight:
+        async def _detached() -> Any:
+            with deadline_scope(self.max_seconds):
+                return await fn()
+
+        flight = _Flight(asyncio.ensure_future(_detached()))
+        self._calls[key] = flight
+
+        def _done(done: "asyncio.Future[Any]") -> None:
+            self._forget(key, flight)
+            if not done.cancelled():
+                # Mark the exception as retrieved when nobody is left waiting
+                done.exception()
+
+        flight.task.add_done_callback(_done)
+        return flight
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def clear(self) -> None:
+        self._calls.clear()
+
+
+def canonical_arguments(arguments: Dict[str, Any]) -> str:
+    """Return a stable string for ``arguments`` regardless of key order."""
+    return json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """Caches tool results by tool name and canonicalized arguments.
+
+    Each tool supplies its own TTL; a TTL of zero disables caching for that
+    tool. Concurrent misses for the same key share one upstream call.
+    """
+
+    def __init__(self, maxsize: int = 1024, enabled: bool = False, max_seconds: float | None = None) -> None:
+        self.enabled = enabled
+        self._cache = TTLCache(maxsize)
+        self._flight = SingleFlight(max_seconds)
+
+    async def get_or_call(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        ttl: float,
+        fn: Callable[[], Awaitable[str]],
+    ) -> str:
+        if not self.enabled or ttl <= 0:
+            return await fn()
+
+        key = (name, canonical_arguments(arguments))
+        value = self._cache.get(key)
+        if value is not MISSING:
+            return value
+
+        async def _load() -> str:
+            result = await fn()
+            self._cache.set(key, result, ttl)
+            return result
+
+        return await self._flight.do(key, _load)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._flight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            **self._cache.stats(),
+            "upstream_calls": self._flight.calls,
+            "coalesced": self._flight.coalesced,
+            "abandoned": self._flight.abandoned,
+            "in_flight": self._flight.in_flight,
+        }
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a chat message for cache lookups (case and whitespace)."""
+    return " ".join(message.split()).lower()
+
+
+class MemoryAnswerBackend:
+    """Answer cache backend held in this process, bounded by entry count."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self._cache = TTLCache(max_entries)
+
+    async def get(self, key: str) -> str | None:
+        value = self._cache.get(key)
+        return None if value is MISSING else value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SQLiteAnswerBackend:
+    """Answer cache backend in a local SQLite file shared by all workers on a host.
+
+    Expired rows are ignored on read and removed on write; when the table grows
+    past ``max_entries`` the entries closest to expiry are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, table: str = "answers") -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name '{table}'")
+        self.path = path
+        self.max_entries = max_entries
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key: str) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl),
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    async def get(self, key: str) -> str | None:
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        if ttl > 0 and self.max_entries > 0:
+            await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def clear(self) -> None:
+        def _clear() -> None:
+            with self._connect() as conn:
+                conn.execute(f"DELETE FROM {self.table}")
+
+        await asyncio.to_thread(_clear)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "maxsize": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_answer_backend(kind: str, max_entries: int, path: str | None = None) -> Any:
+    """Return the answer cache backend named ``kind`` (``memory`` or ``sqlite``)."""
+    if kind == "memory":
+        return MemoryAnswerBackend(max_entries)
+    if kind == "sqlite":
+        return SQLiteAnswerBackend(path or "answer_cache.sqlite3", max_entries)
+    raise ValueError(f"Unknown answer cache backend '{kind}'")
+
+
+class AnswerCache:
+    """Caches final chat answers and deduplicates identical in-flight requests.
+
+    An answer is kept for ``ttl`` seconds, or less if its computation called
+    :func:`cap_answer_ttl`.
+    """
+
+    def __init__(
+        self, backend: Any, ttl: float = 60.0, enabled: bool = False, max_seconds: float | None = None
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self._flight = SingleFlight(max_seconds)
+
+    @staticmethod
+    def key(message: str, model: str, fingerprint: str) -> str:
+        """Return the cache key for a message under a model and tool manifest."""
+        raw = "\x00".join((normalize_message(message), model, fingerprint))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get_or_compute(self, key: str, fn: Callable[[], Awaitable[str | None]]) -> str | None:
+        if not self.enabled:
+            return await fn()
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            return cached
+
+        async def _compute() -> str | None:
+            _answer_ttl.set(None)
+            answer = await fn()
+            cap = _answer_ttl.get()
+            ttl = self.ttl if cap is None else min(self.ttl, cap)
+            if isinstance(answer, str) and ttl > 0:
+                await self.backend.set(key, answer, ttl)
+            return answer
+
+        return await self._flight.do(key, _compute)
+
+    async def clear(self) -> None:
+        self._flight.clear()
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            **self.backend.stats(),
+            "computations": self._flight.calls,
+            "coalesced": self._flight.coalesced,
+            "abandoned": self._flight.abandoned,
+            "in_flight": self._flight.in_flight,
+        }
@@ -0,0 +1,42 @@
+"""Helpers for reading typed settings from the environment."""
+
+import os
+from typing import List
+
+
+def env_int(name: str, default: int) -> int:
+    """Return an integer environment variable, falling back to ``default``."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Return a float environment variable, falling back to ``default``."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Return a boolean environment variable (``1/true/yes/on`` are truthy)."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name: str, default: List[str] | None = None, sep: str = ",") -> List[str]:
+    """Return a ``sep``-separated environment variable as a list of strings."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return list(default or [])
+    return [item.strip() for item in value.split(sep) if item.strip()]
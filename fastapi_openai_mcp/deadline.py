@@ -0,0 +1,127 @@
+"""Per-request deadlines carried through the call stack in a context variable.
+
+The deadline is set once per request and read by every upstream call, which
+uses the remaining budget as its timeout. Tasks started during the request
+(parallel tool calls, prefetches) inherit it because asyncio copies the
+context when a task is created.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Mapping, TypeVar
+
+T = TypeVar("T")
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's deadline passed before its work finished."""
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready."""
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[None]:
+    """Set a deadline ``seconds`` from now for the enclosed code (``None`` for none).
+
+    The previous value is restored by assignment rather than with a reset
+    token, so a scope opened in a streaming generator may be closed from
+    another context.
+    """
+    previous = _deadline.get()
+    _deadline.set(time.monotonic() + seconds if seconds is not None and seconds > 0 else None)
+    try:
+        yield
+    finally:
+        _deadline.set(previous)
+
+
+def remaining() -> float | None:
+    """Return seconds left before the current deadline, or ``None`` without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def deadline_expired(exc: BaseException) -> bool:
+    """Return whether ``exc`` was caused by the caller's own deadline.
+
+    Such failures say nothing about the upstream's health, so they must not
+    trip circuit breakers or eject replicas.
+    """
+    return isinstance(exc, DeadlineExceeded) or remaining() == 0.0
+
+
+def bounded(timeout: float) -> float:
+    """Return ``timeout`` capped by the time left before the current deadline."""
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
+
+
+def request_timeout(headers: Mapping[str, str], header: str, default: float, maximum: float) -> float | None:
+    """Return the request's timeout in seconds from ``header`` or ``default``.
+
+    Values that are not positive numbers fall back to the default; values over
+    ``maximum`` are capped. A result of ``None`` means no deadline.
+    """
+    value = headers.get(header)
+    seconds = default
+    if value is not None:
+        try:
+            parsed = float(value)
+        except ValueError:
+            parsed = 0.0
+        if parsed > 0:
+            seconds = parsed
+    if maximum > 0:
+        seconds = min(seconds, maximum) if seconds > 0 else maximum
+    return seconds if seconds > 0 else None
+
+
+async def with_deadline(work: Awaitable[T]) -> T:
+    """Await ``work``, raising :class:`DeadlineExceeded` when the deadline passes."""
+    left = remaining()
+    if left is None:
+        return await work
+    try:
+        return await asyncio.wait_for(work, timeout=left)
+    except asyncio.TimeoutError as exc:
+        if isinstance(exc, DeadlineExceeded) or remaining() != 0.0:
+            raise
+        raise DeadlineExceeded("request deadline exceeded") from exc
+
+
+async def cancel_on_disconnect(receive: Receive, work: Awaitable[T]) -> T:
+    """Run ``work`` and cancel it if the ASGI client disconnects first.
+
+    ``receive`` is the ASGI receive callable of a request whose body has
+    already been read, so the next message it yields is ``http.disconnect``.
+    """
+    task = asyncio.ensure_future(work)
+    disconnected = False
+
+    async def watch() -> None:
+        nonlocal disconnected
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected = True
+                task.cancel()
+                return
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if disconnected:
+            raise ClientDisconnected("client disconnected") from None
+        raise
+    finally:
+        watcher.cancel()
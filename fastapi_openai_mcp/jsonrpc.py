@@ -0,0 +1,381 @@
+"""JSON-RPC 2.0 transport between the API server and MCP (MCP streamable HTTP).
+
+The MCP server answers JSON-RPC messages, single or batched, on ``POST /mcp``.
+A client authenticates once with ``initialize`` and gets an ``Mcp-Session-Id``
+that it sends instead of the API key from then on. Session ids are signed
+with the API key, so any worker or replica sharing the key accepts them.
+
+On the API server, :class:`RPCChannelPool` keeps a few such sessions open
+over the pooled keep-alive connections. Calls made in the same event-loop
+tick, such as the parallel tool calls of one model turn, are sent together
+as one batch, and several batches may be in flight on a channel at once.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from .config import env_float, env_int
+from .deadline import DeadlineExceeded, deadline_scope, remaining
+
+logger = logging.getLogger("fastapi_openai_mcp.jsonrpc")
+
+PROTOCOL_VERSION = "2025-03-26"
+SESSION_HEADER = "Mcp-Session-Id"
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+Method = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JSONRPCError(Exception):
+    """A JSON-RPC error object, raised by methods and by the client."""
+
+    def __init__(self, code: int, message: str, data: Any = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    @property
+    def server_error(self) -> bool:
+        """True when the server failed, rather than the request being wrong."""
+        return self.code == INTERNAL_ERROR
+
+    def to_dict(self) -> Dict[str, Any]:
+        error: Dict[str, Any] = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def error_response(message_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": message_id, "error": {"code": code, "message": message}}
+
+
+def tool_result(text: str, is_error: bool = False) -> Dict[str, Any]:
+    """Return the ``tools/call`` result for a tool that produced ``text``."""
+    return {"content": [{"type": "text", "text": text}], "isError": is_error}
+
+
+def sign_session(key: str, ttl: float, now: float | None = None) -> str:
+    """Return a new session id valid for ``ttl`` seconds, signed with ``key``."""
+    expires = int((time.time() if now is None else now) + ttl)
+    payload = f"{expires}.{secrets.token_hex(8)}"
+    return payload + "." + _signature(key, payload)
+
+
+def verify_session(key: str, session_id: str, now: float | None = None) -> bool:
+    """Check the signature and expiry of a session id from :func:`sign_session`."""
+    payload, _, signature = session_id.rpartition(".")
+    expires, _, _ = payload.partition(".")
+    if not key or not payload or not hmac.compare_digest(signature, _signature(key, payload)):
+        return False
+    try:
+        return int(expires) > (time.time() if now is None else now)
+    except ValueError:
+        return False
+
+
+def _signature(key: str, payload: str) -> str:
+    return hmac.new(key.encode(), payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+async def handle(payload: Any, methods: Dict[str, Method]) -> Any:
+    """Answer a JSON-RPC message or batch; ``None`` when only notifications were sent.
+
+    The messages of a batch run concurrently and the replies keep their order.
+    """
+    if isinstance(payload, list):
+        if not payload:
+            return error_response(None, INVALID_REQUEST, "Empty batch")
+        replies = await asyncio.gather(*(_handle_one(message, methods) for message in payload))
+        return [reply for reply in replies if reply is not None] or None
+    return await _handle_one(payload, methods)
+
+
+async def _handle_one(message: Any, methods: Dict[str, Method]) -> Dict[str, Any] | None:
+    if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or not isinstance(message.get("method"), str):
+        message_id = message.get("id") if isinstance(message, dict) else None
+        return error_response(message_id, INVALID_REQUEST, "Invalid request")
+    message_id = message.get("id")
+    params = message.get("params", {})
+    try:
+        method = methods.get(message["method"])
+        if method is None:
+            raise JSONRPCError(METHOD_NOT_FOUND, f"Method not found: {message['method']}")
+        if not isinstance(params, dict):
+            raise JSONRPCError(INVALID_PARAMS, "params must be an object")
+        reply: Dict[str, Any] = {"jsonrpc": "2.0", "id": message_id, "result": await method(params)}
+    except JSONRPCError as e:
+        reply = {"jsonrpc": "2.0", "id": message_id, "error": e.to_dict()}
+    except Exception as e:
+        logger.exception("JSON-RPC method failed", extra={"method": message["method"]})
+        reply = error_response(message_id, INTERNAL_ERROR, str(e))
+    # Notifications (no id) never get a reply, even on error
+    return reply if "id" in message else None
+
+
+Send = Callable[..., Awaitable[Any]]
+Pending = Tuple[Dict[str, Any], "asyncio.Future[Any]"]
+
+
+class RPCChannel:
+    """One MCP session carrying batched JSON-RPC calls.
+
+    ``send(method, path, **kwargs)`` issues the HTTP request (the MCP
+    connection pool) and ``auth_headers()`` returns the headers used to
+    authenticate ``initialize``. Later requests carry only the session id; if
+    the server no longer knows it (``404``), the channel initializes again and
+    resends the batch once.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        auth_headers: Callable[[], Dict[str, str]],
+        path: str = "/mcp",
+        max_batch: int = 32,
+        batch_window: float = 0.0,
+    ) -> None:
+        self.send = send
+        self.auth_headers = auth_headers
+        self.path = path
+        self.max_batch = max(1, max_batch)
+        self.batch_window = max(0.0, batch_window)
+        self.session_id: str | None = None
+        self.in_flight = 0
+        self.initializations = 0
+        self.batches = 0
+        self.calls = 0
+        self.max_batch_seen = 0
+        self.errors = 0
+        self._next_id = 0
+        self._pending: List[Pending] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._init_lock: asyncio.Lock | None = None
+        self._announce = False
+        self._tasks: set = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def call(self, method: str, params: Dict[str, Any] | None = None) -> Any:
+        """Send ``method`` with the next batch and return its result.
+
+        Raises :class:`JSONRPCError` for an error reply. Inside a request
+        deadline, waits no longer than the time left.
+        """
+        left = remaining()
+        if left == 0.0:
+            raise DeadlineExceeded("request deadline exceeded before MCP call")
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Any]" = loop.create_future()
+        self._next_id += 1
+        message = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params or {}}
+        self._pending.append((message, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            if self.batch_window:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        self.in_flight += 1
+        try:
+            if left is None:
+                return await future
+            try:
+                return await asyncio.wait_for(future, left)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("request deadline exceeded waiting for MCP") from None
+        finally:
+            self.in_flight -= 1
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def initialize(self) -> None:
+        """Open a session, authenticating with the API key; no-op when one is open."""
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self.session_id is not None:
+                return
+            response = await self.send(
+                "POST",
+                self.path,
+                headers=self.auth_headers(),
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 0,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": {"name": "fastapi-openai-mcp", "version": "1.0"},
+                    },
+                },
+            )
+            response.raise_for_status()
+            reply = response.json()
+            if "error" in reply:
+                error = reply["error"]
+                raise JSONRPCError(error.get("code", INTERNAL_ERROR), error.get("message", ""), error.get("data"))
+            # A server without sessions gets the API key on every request
+            self.session_id = response.headers.get(SESSION_HEADER) or ""
+            self.initializations += 1
+            self._announce = True
+            logger.info("MCP JSON-RPC session opened", extra={"session": bool(self.session_id)})
+
+    def close(self) -> None:
+        """Forget the session; the next call opens a new one."""
+        self.session_id = None
+
+    async def _post(self, batch: List[Pending]) -> Any:
+        if self.session_id is None:
+            await self.initialize()
+        messages = [message for message, _ in batch]
+        if self._announce:
+            # The initialized notification rides along with the first batch
+            self._announce = False
+            messages.insert(0, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        headers = {SESSION_HEADER: self.session_id} if self.session_id else self.auth_headers()
+        return await self.send("POST", self.path, headers=headers, json=messages)
+
+    async def _send_batch(self, batch: List[Pending]) -> None:
+        self.batches += 1
+        self.calls += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        # The batch serves several requests, so it is not bound by the deadline
+        # of whichever one opened it; each caller waits out its own instead
+        with deadline_scope(None):
+            try:
+                response = await self._post(batch)
+                if response.status_code == 404 and self.session_id:
+                    logger.info("MCP JSON-RPC session expired; opening a new one")
+                    self.session_id = None
+                    response = await self._post(batch)
+                response.raise_for_status()
+                replies = response.json() if response.content else []
+            except Exception as exc:
+                self.errors += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+        if isinstance(replies, dict):
+            replies = [replies]
+        by_id = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)}
+        for message, future in batch:
+            if future.done():
+                continue
+            reply = by_id.get(message["id"])
+            if reply is None:
+                future.set_exception(JSONRPCError(INTERNAL_ERROR, "No reply to JSON-RPC request"))
+            elif "error" in reply:
+                error = reply["error"] if isinstance(reply["error"], dict) else {}
+                future.set_exception(
+                    JSONRPCError(error.get("code", INTERNAL_ERROR), error.get("message", ""), error.get("data"))
+                )
+            else:
+                future.set_result(reply.get("result"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session": self.session_id is not None,
+            "in_flight": self.in_flight,
+            "initializations": self.initializations,
+            "batches": self.batches,
+            "calls": self.calls,
+            "max_batch": self.max_batch_seen,
+            "errors": self.errors,
+        }
+
+
+class RPCChannelPool:
+    """A few :class:`RPCChannel` sessions shared by all MCP tool calls.
+
+    A call joins a channel whose next batch is still open, so calls from the
+    same tick share a round trip; otherwise it takes the least busy channel.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        auth_headers: Callable[[], Dict[str, str]],
+        size: int = 2,
+        max_batch: int = 32,
+        batch_window: float = 0.0,
+        path: str = "/mcp",
+    ) -> None:
+        self.channels = [
+            RPCChannel(send, auth_headers, path=path, max_batch=max_batch, batch_window=batch_window)
+            for _ in range(max(1, size))
+        ]
+
+    @classmethod
+    def from_env(cls, send: Send, auth_headers: Callable[[], Dict[str, str]]) -> "RPCChannelPool":
+        """Build a pool from ``MCP_RPC_CHANNELS``, ``MCP_RPC_MAX_BATCH`` and ``MCP_RPC_BATCH_WINDOW``."""
+        return cls(
+            send,
+            auth_headers,
+            size=env_int("MCP_RPC_CHANNELS", 2),
+            max_batch=env_int("MCP_RPC_MAX_BATCH", 32),
+            batch_window=env_float("MCP_RPC_BATCH_WINDOW", 0.0),
+        )
+
+    def pick(self) -> RPCChannel:
+        for channel in self.channels:
+            if channel.pending:
+                return channel
+        return min(self.channels, key=lambda channel: channel.in_flight)
+
+    async def call(self, method: str, params: Dict[str, Any] | None = None) -> Any:
+        return await self.pick().call(method, params)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        """Call a tool and return its text; a tool error is raised as invalid params."""
+        result = await self.call("tools/call", {"name": name, "arguments": arguments})
+        text = "".join(item.get("text", "") for item in result.get("content", []) if item.get("type") == "text")
+        if result.get("isError"):
+            raise JSONRPCError(INVALID_PARAMS, text)
+        return text
+
+    async def initialize(self) -> None:
+        """Open every channel's session ahead of traffic."""
+        await asyncio.gather(*(channel.initialize() for channel in self.channels))
+
+    def reset(self) -> None:
+        for channel in self.channels:
+            channel.close()
+
+    def stats(self) -> Dict[str, Any]:
+        channels = [channel.stats() for channel in self.channels]
+        batches = sum(channel["batches"] for channel in channels)
+        calls = sum(channel["calls"] for channel in channels)
+        return {
+            "channels": channels,
+            "batches": batches,
+            "calls": calls,
+            "avg_batch": round(calls / batches, 3) if batches else 0.0,
+            "initializations": sum(channel["initializations"] for channel in channels),
+            "errors": sum(channel["errors"] for channel in channels),
+        }
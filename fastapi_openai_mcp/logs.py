@@ -0,0 +1,163 @@
+"""Logging setup: optional JSON output behind a queue, with sampled request logs.
+
+By default logging is configured with ``logging.basicConfig`` as before. The
+opt-in mode hands unformatted records to a queue so formatting and writing
+happen on a background thread instead of the event loop, can format them as
+JSON lines, and can keep only a sample of INFO/DEBUG records logged while a
+request is being served. Warnings and errors are always kept.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List
+
+from .config import env_bool, env_float, env_list
+
+_request_path: ContextVar[str | None] = ContextVar("log_request_path", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "path"}
+
+_configured = False
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record and its ``extra`` fields as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        path = getattr(record, "path", None)
+        if path is not None:
+            payload["path"] = path
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """A ``QueueHandler`` that leaves all formatting to the listener thread.
+
+    The stock ``prepare`` formats the record, traceback included, on the
+    logging thread and folds the result into its message; here the record is
+    only copied, so the output handler's formatter sees it unchanged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a sample of INFO/DEBUG records logged while serving a request.
+
+    The rate comes from ``route_rates`` by request path, else ``default_rate``.
+    Records at WARNING or above, and records logged outside a request (startup,
+    shutdown), are always kept.
+    """
+
+    def __init__(
+        self,
+        default_rate: float = 1.0,
+        route_rates: Dict[str, float] | None = None,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        super().__init__()
+        self.default_rate = default_rate
+        self.route_rates = route_rates or {}
+        self.rand = rand
+        self.kept = 0
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        path = _request_path.get()
+        record.path = path
+        if record.levelno >= logging.WARNING or path is None:
+            return True
+        rate = self.route_rates.get(path, self.default_rate)
+        if rate >= 1.0 or (rate > 0.0 and self.rand() < rate):
+            self.kept += 1
+            return True
+        self.dropped += 1
+        return False
+
+
+class LogContextMiddleware:
+    """ASGI middleware recording the request path for log sampling and JSON output."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_path.set(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_path.reset(token)
+
+
+def parse_rates(spec: List[str]) -> Dict[str, float]:
+    """Parse ``path=rate`` items, e.g. ``/server_time=0.01``."""
+    rates: Dict[str, float] = {}
+    for item in spec:
+        path, sep, rate = item.rpartition("=")
+        if sep and path:
+            try:
+                rates[path] = min(1.0, max(0.0, float(rate)))
+            except ValueError:
+                continue
+    return rates
+
+
+def configure_logging(level: str) -> None:
+    """Configure the root logger from ``LOG_FORMAT``, ``LOG_ASYNC`` and ``LOG_SAMPLE_*``.
+
+    Without any of them this is ``logging.basicConfig(level=level)``. The
+    queue listener is started once per process and flushed at exit.
+    """
+    global _configured
+    numeric_level = getattr(logging, level, logging.INFO)
+    json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    use_queue = env_bool("LOG_ASYNC", False)
+    default_rate = min(1.0, max(0.0, env_float("LOG_SAMPLE_RATE", 1.0)))
+    route_rates = parse_rates(env_list("LOG_SAMPLE_RATES"))
+
+    if not (json_format or use_queue or default_rate < 1.0 or route_rates):
+        logging.basicConfig(level=numeric_level)
+        return
+
+    root = logging.getLogger()
+    root.setLevel(numeric_level)
+    if _configured:
+        return
+    _configured = True
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if json_format else logging.Formatter(logging.BASIC_FORMAT))
+    if use_queue:
+        handler: logging.Handler = DeferredQueueHandler(queue.SimpleQueue())
+        listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+    else:
+        handler = output
+    handler.addFilter(SamplingFilter(default_rate, route_rates))
+    root.handlers = [handler]
+
@@ -0,0 +1,436 @@
+"""Shared, pooled and fault-tolerant HTTP client used by the API server to reach MCP."""
+
+import asyncio
+import importlib.util
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, TypeVar
+
+import httpx
+
+from .config import env_bool, env_float, env_int
+from .deadline import DeadlineExceeded, bounded, deadline_expired, remaining
+from .jsonrpc import JSONRPCError
+
+logger = logging.getLogger("fastapi_openai_mcp.mcp_client")
+
+T = TypeVar("T")
+
+
+class MCPConnectionPool:
+    """Owns one long-lived ``httpx.AsyncClient`` for all MCP calls.
+
+    The client is created on :meth:`open` (called from the API server startup
+    hook) and closed on :meth:`aclose`. If a call arrives before startup, for
+    example when ``chat()`` is invoked directly, the client is created lazily.
+    With ``base_url`` set, requests may use paths relative to it.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        timeout: float = 10.0,
+        pool_timeout: float = 5.0,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.pool_timeout = pool_timeout
+        self.http2 = http2
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._http2_enabled = False
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @classmethod
+    def from_env(cls, base_url: str = "") -> "MCPConnectionPool":
+        """Build a pool from ``MCP_POOL_*``, ``MCP_*_TIMEOUT`` and ``MCP_HTTP2``."""
+        return cls(
+            base_url=base_url,
+            max_connections=env_int("MCP_POOL_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=env_int("MCP_POOL_MAX_KEEPALIVE", 20),
+            keepalive_expiry=env_float("MCP_POOL_KEEPALIVE_EXPIRY", 30.0),
+            connect_timeout=env_float("MCP_CONNECT_TIMEOUT", 5.0),
+            timeout=env_float("MCP_TIMEOUT", 10.0),
+            pool_timeout=env_float("MCP_POOL_TIMEOUT", 5.0),
+            http2=env_bool("MCP_HTTP2", False),
+        )
+
+    def _http2_available(self) -> bool:
+        if not self.http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("MCP_HTTP2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    def open(self) -> httpx.AsyncClient:
+        """Create the shared client if it does not exist yet and return it."""
+        if self._client is None or self._client.is_closed:
+            self._http2_enabled = self._http2_available()
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self._http2_enabled,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    self.timeout, connect=self.connect_timeout, pool=self.pool_timeout
+                ),
+            )
+            logger.info(
+                "MCP connection pool opened (base_url=%s, max_connections=%s, max_keepalive=%s, http2=%s)",
+                self.base_url or None,
+                self.max_connections,
+                self.max_keepalive_connections,
+                self._http2_enabled,
+            )
+        return self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it lazily if needed."""
+        return self.open()
+
+    async def aclose(self) -> None:
+        """Close the shared client and release pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("MCP connection pool closed")
+        self._client = None
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request through the shared client, tracking pool statistics.
+
+        Inside a request deadline, every timeout is capped by the time left.
+        """
+        client = self.client
+        if "timeout" not in kwargs and remaining() is not None:
+            if remaining() == 0.0:
+                raise DeadlineExceeded("request deadline exceeded before MCP call")
+            kwargs["timeout"] = httpx.Timeout(
+                bounded(self.timeout), connect=bounded(self.connect_timeout), pool=bounded(self.pool_timeout)
+            )
+        self.requests_total += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and the state of pooled connections."""
+        connections = []
+        if self._client is not None:
+            transport = getattr(self._client, "_transport", None)
+            pool = getattr(transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if _safe_call(conn, "is_idle"))
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self._http2_enabled,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+def _safe_call(obj: Any, name: str) -> bool:
+    method = getattr(obj, name, None)
+    if method is None:
+        return False
+    try:
+        return bool(method())
+    except Exception:
+        return False
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the MCP server while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe.
+
+    ``closed`` lets every call through. After ``failure_threshold`` consecutive
+    failures it becomes ``open`` and rejects calls for ``reset_timeout``
+    seconds, then ``half_open`` lets one probe through: success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.transitions: Dict[str, int] = {}
+        self.short_circuited = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            key = f"{self.state}->{state}"
+            self.transitions[key] = self.transitions.get(key, 0) + 1
+            logger.warning("MCP circuit breaker %s", key)
+            self.state = state
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed now."""
+        if self.failure_threshold <= 0:
+            return True
+        if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+            self._transition("half_open")
+            self._probe_in_flight = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self._transition("closed")
+
+    def release(self) -> None:
+        """Forget an allowed call that ended without a result, e.g. it was cancelled.
+
+        The circuit state is unchanged, but a half-open circuit may send a new probe.
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.failure_threshold <= 0:
+            return
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            self._transition("open")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "short_circuited": self.short_circuited,
+            "transitions": dict(self.transitions),
+        }
+
+
+class LatencyWindow:
+    """Sliding window of recent call latencies for percentile estimates."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+        return ordered[index]
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transport failures, 5xx and 429 responses and JSON-RPC internal errors are worth retrying."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code >= 500 or code == 429
+    if isinstance(exc, JSONRPCError):
+        return exc.server_error
+    return isinstance(exc, httpx.TransportError)
+
+
+def _counts_as_failure(exc: BaseException) -> bool:
+    # A 4xx (other than 429) or a JSON-RPC request error means the request
+    # was wrong, not that MCP is unhealthy
+    if isinstance(exc, (httpx.HTTPStatusError, JSONRPCError)):
+        return is_retryable(exc)
+    return True
+
+
+class ResilientCaller:
+    """Wraps MCP calls with retries, optional hedging and a circuit breaker.
+
+    Idempotent calls are retried up to ``retries`` times with full-jitter
+    exponential backoff. With hedging enabled, an idempotent call still running
+    after the ``hedge_percentile`` latency of recent calls gets a second,
+    parallel attempt and the first success wins.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker | None = None,
+        retries: int = 2,
+        backoff_base: float = 0.05,
+        backoff_max: float = 1.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+    ) -> None:
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyWindow()
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_env(cls) -> "ResilientCaller":
+        """Build a caller from ``MCP_RETRY_*``, ``MCP_HEDGE_*`` and ``MCP_BREAKER_*``."""
+        return cls(
+            breaker=CircuitBreaker(
+                failure_threshold=env_int("MCP_BREAKER_FAILURES", 5),
+                reset_timeout=env_float("MCP_BREAKER_RESET", 10.0),
+            ),
+            retries=max(0, env_int("MCP_RETRIES", 2)),
+            backoff_base=env_float("MCP_RETRY_BACKOFF", 0.05),
+            backoff_max=env_float("MCP_RETRY_BACKOFF_MAX", 1.0),
+            hedge=env_bool("MCP_HEDGE_ENABLED", False),
+            hedge_percentile=env_float("MCP_HEDGE_PERCENTILE", 95.0),
+            hedge_min_samples=env_int("MCP_HEDGE_MIN_SAMPLES", 20),
+        )
+
+    def reset(self) -> None:
+        """Close the circuit and forget latency history."""
+        self.breaker = CircuitBreaker(self.breaker.failure_threshold, self.breaker.reset_timeout)
+        self.latencies = LatencyWindow()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def call(self, fn: Callable[[], Awaitable[T]], idempotent: bool = False) -> T:
+        """Run ``fn`` with the configured resilience policy."""
+        self.calls += 1
+        attempts = self.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self.failures += 1
+                raise CircuitOpenError("MCP circuit breaker is open")
+            started = time.monotonic()
+            try:
+                if idempotent and self._should_hedge():
+                    result = await self._hedged(fn)
+                else:
+                    result = await fn()
+            except asyncio.CancelledError:
+                # No verdict on MCP's health; let the next call probe instead
+                self.breaker.release()
+                raise
+            except Exception as exc:
+                if deadline_expired(exc):
+                    # The caller ran out of time; MCP may well be healthy
+                    self.breaker.release()
+                elif _counts_as_failure(exc):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                delay = self._backoff(attempt)
+                left = remaining()
+                if attempt + 1 >= attempts or not is_retryable(exc) or (left is not None and left <= delay):
+                    self.failures += 1
+                    raise
+                self.retried += 1
+                logger.info(
+                    "Retrying MCP call",
+                    extra={"attempt": attempt + 1, "delay": round(delay, 3), "error": str(exc)},
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.latencies.add(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def _should_hedge(self) -> bool:
+        return self.hedge and len(self.latencies) >= self.hedge_min_samples
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]]) -> T:
+        delay = self.latencies.percentile(self.hedge_percentile)
+        primary = asyncio.ensure_future(fn())
+        pending = {primary}
+        error: BaseException | None = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedged += 1
+            backup = asyncio.ensure_future(fn())
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "latency_p50": round(self.latencies.percentile(50), 6),
+            "latency_p95": round(self.latencies.percentile(95), 6),
+            "circuit_breaker": self.breaker.stats(),
+        }
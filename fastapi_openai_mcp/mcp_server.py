@@ -1,37 +1,200 @@
 """Minimal MCP server exposing the current time."""
 
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+import hashlib
+import inspect
+import json
 import os
 import logging
-from typing import Dict
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Union
 
-from fastapi import FastAPI, Header, HTTPException, status
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from starlette.routing import Route
+
+from .config import env_bool, env_float
+from .fastpath import JSONEndpoint, TokenChecker
+from .jsonrpc import (
+    INVALID_PARAMS,
+    PARSE_ERROR,
+    PROTOCOL_VERSION,
+    SESSION_HEADER,
+    JSONRPCError,
+    error_response,
+    handle,
+    sign_session,
+    tool_result,
+    verify_session,
+)
+from .logs import LogContextMiddleware, configure_logging
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import MetricsMiddleware, MetricsRegistry, SharedMetrics
 
 load_dotenv()
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
+configure_logging(LOG_LEVEL)
 logger = logging.getLogger("fastapi_openai_mcp.mcp_server")
 
 app = FastAPI()
 
+# Prometheus metrics served at /metrics
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+app.add_middleware(LogContextMiddleware)
+
+# With several workers (see serve.py) each one snapshots its metrics into
+# SHARED_STATE_DIR and /metrics returns the sum over workers
+SHARED_STATE_DIR = os.getenv("SHARED_STATE_DIR")
+shared_metrics = SharedMetrics(metrics, SHARED_STATE_DIR, "mcp") if SHARED_STATE_DIR else None
+
+TOOL_CALLS = metrics.counter("mcp_tool_calls_total", "Tool calls by tool and outcome", ("tool", "outcome"))
+TOOL_CALL_SECONDS = metrics.histogram(
+    "mcp_tool_call_duration_seconds", "Tool handler latency", ("tool",)
+)
+
+RPC_MESSAGES = metrics.counter("mcp_rpc_messages_total", "JSON-RPC messages received by method", ("method",))
+RPC_BATCH_SIZE = metrics.histogram(
+    "mcp_rpc_batch_size", "Messages per JSON-RPC request", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
 MCP_API_KEY: str | None = os.getenv("MCP_API_KEY")
 
+# Lifetime of JSON-RPC sessions opened with initialize on /mcp
+MCP_SESSION_TTL = env_float("MCP_SESSION_TTL", 3600.0)
+
+ToolHandler = Callable[[Dict[str, Any]], Union[str, Awaitable[str]]]
+
+
+@dataclass
+class Tool:
+    """A tool published in the manifest and callable through ``/tools/{name}``."""
+
+    name: str
+    description: str
+    handler: ToolHandler
+    parameters: Dict[str, Any] = field(
+        default_factory=lambda: {"type": "object", "properties": {}, "required": []}
+    )
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def describe(self) -> Dict[str, Any]:
+        """Return the manifest entry for this tool."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters,
+            "endpoint": f"/tools/{self.name}",
+            **self.metadata,
+        }
+
+
+class ToolRegistry:
+    """Registry of tools served by this MCP server."""
+
+    def __init__(self) -> None:
+        self._tools: Dict[str, Tool] = {}
+        self._manifest: Dict[str, Any] | None = None
+        self._etag: str | None = None
+
+    def register(
+        self,
+        name: str,
+        description: str,
+        parameters: Dict[str, Any] | None = None,
+        **metadata: Any,
+    ) -> Callable[[ToolHandler], ToolHandler]:
+        """Decorator registering ``handler`` as the tool ``name``.
+
+        Extra keyword arguments are published as-is in the manifest entry.
+        """
+
+        def decorator(handler: ToolHandler) -> ToolHandler:
+            tool = Tool(name=name, description=description, handler=handler, metadata=metadata)
+            if parameters is not None:
+                tool.parameters = parameters
+            self._tools[name] = tool
+            self._manifest = None
+            self._etag = None
+            return handler
+
+        return decorator
+
+    def get(self, name: str) -> Tool | None:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return sorted(self._tools)
+
+    def manifest(self) -> Dict[str, Any]:
+        """Return the tool manifest, sorted by name so it is byte-stable."""
+        if self._manifest is None:
+            self._manifest = {"tools": [self._tools[name].describe() for name in self.names()]}
+        return self._manifest
+
+    def etag(self) -> str:
+        """Return a strong ETag derived from the manifest contents."""
+        if self._etag is None:
+            encoded = json.dumps(self.manifest(), sort_keys=True, separators=(",", ":"))
+            self._etag = '"' + hashlib.sha256(encoded.encode()).hexdigest()[:32] + '"'
+        return self._etag
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> str:
+        tool = self._tools[name]
+        started = time.perf_counter()
+        try:
+            result = tool.handler(arguments)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception:
+            TOOL_CALLS.inc(name, "error")
+            raise
+        finally:
+            TOOL_CALL_SECONDS.observe(name, value=time.perf_counter() - started)
+        TOOL_CALLS.inc(name, "success")
+        return result
+
+
+registry = ToolRegistry()
+
+
+@registry.register(
+    "get_server_time",
+    "Get the current server time from the MCP server",
+    cache_ttl=0.5,
+    idempotent=True,
+    answer_template="The current server time is {result}.",
+)
+def _server_time_tool(arguments: Dict[str, Any]) -> str:
+    now = datetime.now(timezone.utc).isoformat()
+    return f"[MCP Server Time] {now}"
+
+
 @app.on_event("startup")
 async def _on_startup() -> None:
     logger.info(
-        "MCP server startup: MCP_API_KEY set=%s",
+        "MCP server startup: MCP_API_KEY set=%s, tools=%s",
         bool(MCP_API_KEY),
+        registry.names(),
     )
+    if shared_metrics is not None:
+        shared_metrics.start()
 
 
-@app.get("/server_time")
-async def get_server_time(
+@app.on_event("shutdown")
+async def _on_shutdown() -> None:
+    if shared_metrics is not None:
+        await shared_metrics.stop()
+
+
+async def require_token(
     authorization: str | None = Header(default=None),
     x_api_key: str | None = Header(default=None, alias="X-Api-Key"),
-) -> Dict[str, str]:
-    """Return the current server time if a valid token is provided.
+) -> str:
+    """Validate the request token and return which header supplied it.
 
     Accepts either `Authorization: Bearer <token>` or `X-Api-Key: <token>`.
     """
@@ -58,6 +221,176 @@ async def get_server_time(
         logger.warning("Unauthorized request: invalid token (source=%s)", token_source)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
 
-    now = datetime.now(timezone.utc).isoformat()
+    return token_source
+
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    """Unauthenticated liveness check used by the API server's replica health checks."""
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Expose metrics in the Prometheus text format."""
+    body = shared_metrics.render() if shared_metrics is not None else metrics.render()
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/server_time")
+async def get_server_time(token_source: str = Depends(require_token)) -> Dict[str, str]:
+    """Return the current server time if a valid token is provided.
+
+    Accepts either `Authorization: Bearer <token>` or `X-Api-Key: <token>`.
+    """
+
+    server_time = await registry.call("get_server_time", {})
     logger.info("Authorized request succeeded (source=%s)", token_source)
-    return {"server_time": f"[MCP Server Time] {now}"}
+    return {"server_time": server_time}
+
+
+@app.get("/tools")
+async def list_tools(request: Request, token_source: str = Depends(require_token)) -> Response:
+    """Return the tool manifest, honouring ``If-None-Match`` revalidation."""
+
+    etag = registry.etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(registry.manifest(), headers=headers)
+
+
+@app.post("/tools/{name}")
+async def call_tool(
+    name: str,
+    arguments: Dict[str, Any] | None = Body(default=None),
+    token_source: str = Depends(require_token),
+) -> Dict[str, str]:
+    """Invoke a registered tool with JSON ``arguments`` and return its result."""
+
+    if registry.get(name) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown tool '{name}'")
+    try:
+        result = await registry.call(name, arguments or {})
+    except (TypeError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info("Tool call succeeded (tool=%s, source=%s)", name, token_source)
+    return {"result": result}
+
+
+async def _rpc_initialize(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "protocolVersion": PROTOCOL_VERSION,
+        "capabilities": {"tools": {"listChanged": False}},
+        "serverInfo": {"name": "fastapi-openai-mcp", "version": "1.0"},
+    }
+
+
+async def _rpc_ping(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {}
+
+
+async def _rpc_list_tools(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "tools": [
+            {"name": tool["name"], "description": tool["description"], "inputSchema": tool["parameters"]}
+            for tool in registry.manifest()["tools"]
+        ]
+    }
+
+
+async def _rpc_call_tool(params: Dict[str, Any]) -> Dict[str, Any]:
+    name = params.get("name")
+    arguments = params.get("arguments") or {}
+    if not isinstance(name, str) or registry.get(name) is None:
+        raise JSONRPCError(INVALID_PARAMS, f"Unknown tool '{name}'")
+    if not isinstance(arguments, dict):
+        raise JSONRPCError(INVALID_PARAMS, "arguments must be an object")
+    try:
+        result = await registry.call(name, arguments)
+    except (TypeError, ValueError, KeyError) as e:
+        # Bad arguments are reported in the result, as /tools/{name} answers 400
+        return tool_result(str(e), is_error=True)
+    return tool_result(result)
+
+
+async def _rpc_notification(params: Dict[str, Any]) -> None:
+    return None
+
+
+RPC_METHODS = {
+    "initialize": _rpc_initialize,
+    "notifications/initialized": _rpc_notification,
+    "ping": _rpc_ping,
+    "tools/list": _rpc_list_tools,
+    "tools/call": _rpc_call_tool,
+}
+
+
+@app.post("/mcp")
+async def mcp_rpc(request: Request) -> Response:
+    """JSON-RPC 2.0 endpoint taking one message or a batch (MCP streamable HTTP).
+
+    ``initialize`` authenticates with the API key and returns an
+    ``Mcp-Session-Id`` header; later requests may send that instead of the
+    key. An unknown or expired session gets ``404`` so the client opens a new one.
+    """
+
+    if not MCP_API_KEY:
+        logger.error("MCP_API_KEY not configured")
+        raise RuntimeError("MCP_API_KEY not configured")
+
+    session_id = request.headers.get(SESSION_HEADER)
+    if not TokenChecker([MCP_API_KEY]).authorized(request.scope["headers"]):
+        if not session_id:
+            logger.warning("Unauthorized JSON-RPC request: missing token or session")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+        if not verify_session(MCP_API_KEY, session_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown or expired session")
+
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        return JSONResponse(error_response(None, PARSE_ERROR, "Parse error"), status_code=400)
+
+    messages = payload if isinstance(payload, list) else [payload]
+    RPC_BATCH_SIZE.observe(value=len(messages))
+    headers: Dict[str, str] = {}
+    for message in messages:
+        method = message.get("method") if isinstance(message, dict) else None
+        # Only known method names become labels; non-string methods are "unknown"
+        RPC_MESSAGES.inc(method if isinstance(method, str) and method in RPC_METHODS else "unknown")
+        if method == "initialize":
+            headers[SESSION_HEADER] = sign_session(MCP_API_KEY, MCP_SESSION_TTL)
+
+    reply = await handle(payload, RPC_METHODS)
+    if reply is None:
+        return Response(status_code=status.HTTP_202_ACCEPTED, headers=headers)
+    return JSONResponse(reply, headers=headers)
+
+
+def enable_fast_path() -> JSONEndpoint | None:
+    """Serve authorized ``GET /server_time`` requests from a lean ASGI endpoint.
+
+    The endpoint is routed ahead of the FastAPI route, which still handles
+    requests the fast path passes on (missing or invalid tokens).
+    """
+    if not MCP_API_KEY:
+        return None
+    for route in app.router.routes:
+        if isinstance(route, Route) and isinstance(route.app, JSONEndpoint):
+            return route.app
+    regular = next(r for r in app.router.routes if getattr(r, "path", None) == "/server_time")
+    endpoint = JSONEndpoint(
+        "server_time",
+        lambda: registry.call("get_server_time", {}),
+        TokenChecker([MCP_API_KEY]),
+        fallback=regular.handle,
+    )
+    app.router.routes.insert(0, Route("/server_time", endpoint, methods=["GET"]))
+    logger.info("MCP fast path enabled for /server_time")
+    return endpoint
+
+
+if env_bool("MCP_FAST_PATH", False):
+    enable_fast_path()
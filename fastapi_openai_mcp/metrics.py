@@ -0,0 +1,346 @@
+"""Minimal Prometheus metrics: counters, gauges, histograms and an ASGI middleware.
+
+Metrics are updated from the event loop thread only, so plain integer and
+float updates are safe without locks and cost a dict lookup each. With several
+worker processes, :class:`SharedMetrics` merges every worker's metrics at
+scrape time.
+"""
+
+import asyncio
+import bisect
+import glob
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return self.header() + list(self.samples())
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class MetricsRegistry:
+    """Holds metrics and collector callbacks and renders the text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def _register(self, metric: Any) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        """Register a callback producing metrics computed at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def gauge_from_values(
+    name: str, documentation: str, values: Dict[LabelValues, float], labelnames: Sequence[str] = ()
+) -> Gauge:
+    """Build a one-off gauge for a collector from a mapping of label values."""
+    gauge = Gauge(name, documentation, labelnames)
+    for labels, value in values.items():
+        gauge.set(*labels, value=value)
+    return gauge
+
+
+def counter_from_values(
+    name: str, documentation: str, values: Dict[LabelValues, float], labelnames: Sequence[str] = ()
+) -> Counter:
+    """Build a one-off counter for a collector from totals kept elsewhere."""
+    counter = Counter(name, documentation, labelnames)
+    for labels, value in values.items():
+        counter.inc(*labels, amount=value)
+    return counter
+
+
+def merge_expositions(snapshots: Iterable[Tuple[str, bool]]) -> str:
+    """Sum the samples of several processes' text expositions into one.
+
+    ``snapshots`` are ``(text, live)`` pairs. Counters and histograms are
+    summed over all snapshots; gauges only over live processes, so a recycled
+    worker's in-flight count does not linger.
+    """
+    headers: Dict[str, List[str]] = {}
+    kinds: Dict[str, str] = {}
+    samples: Dict[str, Dict[str, float]] = {}
+    for text, live in snapshots:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) < 3 or parts[1] not in ("HELP", "TYPE"):
+                    continue
+                family = parts[2]
+                header = headers.setdefault(family, [])
+                if len(header) < 2 and line not in header:
+                    header.append(line)
+                if parts[1] == "TYPE" and len(parts) == 4:
+                    kinds.setdefault(family, parts[3])
+                samples.setdefault(family, {})
+            elif line and family is not None:
+                if kinds.get(family) == "gauge" and not live:
+                    continue
+                key, _, value = line.rpartition(" ")
+                family_samples = samples[family]
+                family_samples[key] = family_samples.get(key, 0.0) + float(value)
+    lines: List[str] = []
+    for family, header in headers.items():
+        lines.extend(header)
+        lines.extend(f"{key} {_format_value(value)}" for key, value in samples[family].items())
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedMetrics:
+    """Shares a registry with the other worker processes through files in ``directory``.
+
+    Each worker writes its exposition to ``<prefix>-metrics-<pid>.prom`` every
+    ``interval`` seconds, on shutdown and whenever it serves a scrape. A scrape
+    returns all workers' snapshots merged, so it does not matter which worker
+    the kernel hands the scrape to.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, prefix: str, interval: float = 5.0) -> None:
+        self.registry = registry
+        self.directory = directory
+        self.prefix = prefix
+        self.interval = interval
+        self.path = os.path.join(directory, f"{prefix}-metrics-{os.getpid()}.prom")
+        self._task: asyncio.Task | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def clear(directory: str, prefix: str) -> None:
+        """Remove snapshots left by a previous run (called before workers start)."""
+        for path in glob.glob(os.path.join(directory, f"{prefix}-metrics-*.prom")):
+            os.unlink(path)
+
+    def write(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as handle:
+            handle.write(self.registry.render())
+        os.replace(tmp, self.path)
+
+    def render(self) -> str:
+        self.write()
+        snapshots = []
+        for path in sorted(glob.glob(os.path.join(self.directory, f"{self.prefix}-metrics-*.prom"))):
+            pid = path.rsplit("-", 1)[-1][: -len(".prom")]
+            try:
+                with open(path) as handle:
+                    text = handle.read()
+            except FileNotFoundError:
+                continue
+            snapshots.append((text, pid.isdigit() and _pid_alive(int(pid))))
+        return merge_expositions(snapshots)
+
+    def start(self) -> None:
+        self.write()
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.write()
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests.
+
+    Requests are labelled by route template (``/tools/{name}``) rather than the
+    raw path, keeping label cardinality bounded.
+    """
+
+    def __init__(self, app: Any, registry: MetricsRegistry) -> None:
+        self.app = app
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by method, route and status code",
+            ("method", "route", "status"),
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route", ("route",)
+        )
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.requests.inc(scope["method"], route, status)
+            self.latency.observe(route, value=time.perf_counter() - started)
@@ -0,0 +1,88 @@
+"""Speculative tool prefetch: start likely tool calls alongside the first completion."""
+
+import asyncio
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Pattern
+
+logger = logging.getLogger("fastapi_openai_mcp.prefetch")
+
+
+def parse_rules(spec: List[str]) -> Dict[str, Pattern[str]]:
+    """Parse ``tool=regex`` items into compiled, case-insensitive patterns."""
+    rules: Dict[str, Pattern[str]] = {}
+    for item in spec:
+        name, sep, pattern = item.partition("=")
+        if sep and name.strip() and pattern:
+            rules[name.strip()] = re.compile(pattern, re.IGNORECASE)
+    return rules
+
+
+class Prefetcher:
+    """Predicts tool calls from the user message with per-tool regex rules.
+
+    Predicted tools are started with empty arguments before the model answers.
+    A prefetch is a *hit* when the model then calls that tool with no
+    arguments; otherwise it is cancelled (or its result discarded) and counted
+    as *wasted*.
+    """
+
+    def __init__(self, rules: Dict[str, Pattern[str]], enabled: bool = False) -> None:
+        self.rules = rules
+        self.enabled = enabled
+        self.started = 0
+        self.hits = 0
+        self.wasted = 0
+        self.misses = 0
+
+    def predict(self, message: str) -> List[str]:
+        if not self.enabled:
+            return []
+        return [name for name, pattern in self.rules.items() if pattern.search(message)]
+
+    def start(
+        self, message: str, run: Callable[[str], Awaitable[str]]
+    ) -> Dict[str, "asyncio.Task[str]"]:
+        """Start a task running ``run(name)`` for every predicted tool."""
+        tasks = {}
+        for name in self.predict(message):
+            tasks[name] = asyncio.ensure_future(run(name))
+            self.started += 1
+        if tasks:
+            logger.debug("Prefetching tools", extra={"tools": sorted(tasks)})
+        return tasks
+
+    def claim(
+        self, tasks: Dict[str, "asyncio.Task[str]"], name: str, arguments: Dict[str, Any]
+    ) -> "asyncio.Task[str] | None":
+        """Take the prefetched task matching a model tool call, if there is one."""
+        if not self.enabled:
+            return None
+        task = tasks.pop(name, None) if not arguments else None
+        if task is not None:
+            self.hits += 1
+        elif name in self.rules:
+            self.misses += 1
+        return task
+
+    def discard(self, tasks: Dict[str, "asyncio.Task[str]"]) -> None:
+        """Cancel prefetches the model did not use."""
+        for task in tasks.values():
+            self.wasted += 1
+            if task.done():
+                if not task.cancelled():
+                    task.exception()
+            else:
+                task.cancel()
+        tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "rules": {name: pattern.pattern for name, pattern in self.rules.items()},
+            "started": self.started,
+            "hits": self.hits,
+            "wasted": self.wasted,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / self.started, 4) if self.started else 0.0,
+        }
@@ -0,0 +1,160 @@
+"""Per-stage OpenAI model routing with a latency-based fallback."""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence
+
+from .mcp_client import LatencyWindow
+
+logger = logging.getLogger("fastapi_openai_mcp.routing")
+
+STAGES = ("tools", "answer")
+CONDITIONS = ("tool", "min_chars", "max_chars", "*")
+
+
+@dataclass(frozen=True)
+class RoutingRule:
+    """Use ``model`` for ``stage`` when ``condition`` matches the request."""
+
+    stage: str
+    condition: str
+    value: str
+    model: str
+
+    def matches(self, message: str, tools: Sequence[str]) -> bool:
+        if self.condition == "tool":
+            return self.value in tools
+        if self.condition == "min_chars":
+            return len(message) >= int(self.value)
+        if self.condition == "max_chars":
+            return len(message) <= int(self.value)
+        return True
+
+
+def parse_routing_rules(spec: List[str]) -> List[RoutingRule]:
+    """Parse ``stage:condition:model`` items, e.g. ``answer:tool=get_server_time:gpt-4.1-mini``.
+
+    Conditions are ``tool=NAME`` (answer stage), ``min_chars=N``, ``max_chars=N``
+    or ``*``. Malformed items are logged and skipped.
+    """
+    rules: List[RoutingRule] = []
+    for item in spec:
+        parts = item.split(":", 2)
+        if len(parts) != 3:
+            logger.warning("Ignoring malformed routing rule", extra={"rule": item})
+            continue
+        stage, condition, model = (part.strip() for part in parts)
+        key, _, value = condition.partition("=")
+        valid = stage in STAGES and key in CONDITIONS and model and (key == "*" or value)
+        if valid and key in ("min_chars", "max_chars") and not value.isdigit():
+            valid = False
+        if not valid:
+            logger.warning("Ignoring malformed routing rule", extra={"rule": item})
+            continue
+        rules.append(RoutingRule(stage, key, value, model))
+    return rules
+
+
+class ModelRouter:
+    """Chooses the model for the tool-selection and final-answer completions.
+
+    The first matching rule for a stage wins, otherwise the stage default is
+    used. When a model's recent p95 latency goes over ``p95_threshold``, its
+    requests go to ``fallback_model`` for ``cooldown`` seconds; after that the
+    model is tried again with a fresh latency window. A failed completion
+    counts as at least ``error_penalty`` seconds (by default twice the
+    threshold), so a model that times out or errors is treated as slow.
+    """
+
+    def __init__(
+        self,
+        tools_model: str,
+        answer_model: str,
+        rules: List[RoutingRule] | None = None,
+        fallback_model: str | None = None,
+        p95_threshold: float = 0.0,
+        min_samples: int = 20,
+        cooldown: float = 30.0,
+        error_penalty: float | None = None,
+        window: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.defaults = {"tools": tools_model, "answer": answer_model}
+        self.rules = rules or []
+        self.fallback_model = fallback_model
+        self.p95_threshold = p95_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.error_penalty = 2 * p95_threshold if error_penalty is None else error_penalty
+        self.window = window
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        self._windows: Dict[str, LatencyWindow] = {}
+        self._degraded_until: Dict[str, float] = {}
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+        self.switches = 0
+
+    def route(self, stage: str, message: str = "", tools: Sequence[str] = ()) -> str:
+        """Return the model for ``stage`` given the user message and called tools."""
+        model = self.defaults[stage]
+        for rule in self.rules:
+            if rule.stage == stage and rule.matches(message, tools):
+                model = rule.model
+                break
+        if self.fallback_model and self._degraded_until.get(model, 0.0) > self.clock():
+            self.fallbacks += 1
+            model = self.fallback_model
+        self.routed[model] = self.routed.get(model, 0) + 1
+        return model
+
+    def observe(self, model: str, seconds: float, failed: bool = False) -> None:
+        """Record a completion latency and switch to the fallback if ``model`` is slow."""
+        if failed:
+            seconds = max(seconds, self.error_penalty)
+        window = self._windows.get(model)
+        if window is None:
+            window = self._windows[model] = LatencyWindow(self.window)
+        window.add(seconds)
+        if (
+            self.p95_threshold <= 0
+            or not self.fallback_model
+            or model == self.fallback_model
+            or len(window) < self.min_samples
+        ):
+            return
+        p95 = window.percentile(95)
+        if p95 > self.p95_threshold:
+            self._degraded_until[model] = self.clock() + self.cooldown
+            self._windows[model] = LatencyWindow(self.window)
+            self.switches += 1
+            logger.warning(
+                "Model latency over threshold; using fallback",
+                extra={"model": model, "p95": p95, "fallback": self.fallback_model},
+            )
+
+    def signature(self) -> str:
+        """Return a string identifying the routing configuration, for cache keys."""
+        rules = ";".join(f"{r.stage}:{r.condition}={r.value}:{r.model}" for r in self.rules)
+        return f"{self.defaults['tools']}/{self.defaults['answer']}/{rules}"
+
+    def degraded(self) -> List[str]:
+        now = self.clock()
+        return sorted(model for model, until in self._degraded_until.items() if until > now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tools_model": self.defaults["tools"],
+            "answer_model": self.defaults["answer"],
+            "fallback_model": self.fallback_model,
+            "p95_threshold": self.p95_threshold,
+            "rules": [f"{r.stage}:{r.condition}{'=' + r.value if r.value else ''}:{r.model}" for r in self.rules],
+            "p95": {model: round(window.percentile(95), 4) for model, window in self._windows.items()},
+            "degraded": self.degraded(),
+            "routed": dict(self.routed),
+            "fallbacks": self.fallbacks,
+            "switches": self.switches,
+        }
@@ -0,0 +1,248 @@
+"""Weighted fair scheduling of upstream OpenAI calls across clients.
+
+Every completion waits for one of ``max_concurrency`` slots. When they are all
+taken, waiting calls are ordered by start-time fair queueing: each client
+(tenant) gets a share of the slots proportional to its weight, however many
+calls it queues. ``interactive`` calls are always dispatched before ``batch``
+calls, so offline work only uses capacity that live traffic leaves over.
+
+The tenant and priority of the current request are carried in a context
+variable, set once per request like the deadline in ``deadline.py``.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Mapping, Tuple
+
+from .mcp_client import LatencyWindow
+
+PRIORITIES = ("interactive", "batch")
+ANONYMOUS = "anonymous"
+OTHER = "other"
+
+_client: ContextVar[Tuple[str, str]] = ContextVar("scheduler_client", default=(ANONYMOUS, "interactive"))
+
+
+@contextmanager
+def client_scope(tenant: str, priority: str) -> Iterator[None]:
+    """Tag upstream calls made by the enclosed code with ``tenant`` and ``priority``.
+
+    As with ``deadline_scope``, the previous value is restored by assignment
+    so the scope may be opened and closed in a streaming generator.
+    """
+    previous = _client.get()
+    _client.set((tenant, priority if priority in PRIORITIES else "interactive"))
+    try:
+        yield
+    finally:
+        _client.set(previous)
+
+
+def current_client() -> Tuple[str, str]:
+    """Return the ``(tenant, priority)`` of the current request."""
+    return _client.get()
+
+
+def client_from_headers(headers: Mapping[str, str], header: str, default_priority: str) -> Tuple[str, str]:
+    """Identify the client of a request and the priority it asked for.
+
+    The tenant is the ``header`` value when present, otherwise a short hash of
+    the API key the client sent, otherwise ``anonymous``. ``X-Priority`` may
+    be ``interactive`` or ``batch``; anything else keeps ``default_priority``.
+    """
+    tenant = (headers.get(header) or "").strip()[:64]
+    if not tenant:
+        key = headers.get("x-api-key") or headers.get("authorization") or ""
+        tenant = "key:" + hashlib.sha256(key.encode()).hexdigest()[:12] if key else ANONYMOUS
+    priority = (headers.get("x-priority") or "").strip().lower()
+    return tenant, priority if priority in PRIORITIES else default_priority
+
+
+def parse_weights(spec: List[str]) -> Dict[str, float]:
+    """Parse ``tenant=weight`` items, e.g. ``acme=4``; weights must be positive."""
+    weights: Dict[str, float] = {}
+    for item in spec:
+        tenant, sep, weight = item.rpartition("=")
+        if sep and tenant:
+            try:
+                value = float(weight)
+            except ValueError:
+                continue
+            if value > 0:
+                weights[tenant.strip()] = value
+    return weights
+
+
+class _TenantStats:
+    def __init__(self, window: int) -> None:
+        self.dispatched = 0
+        self.queued = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.waits = LatencyWindow(window)
+
+    def record_wait(self, seconds: float) -> None:
+        self.dispatched += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        self.waits.add(seconds)
+
+    def stats(self, weight: float) -> Dict[str, Any]:
+        return {
+            "weight": weight,
+            "dispatched": self.dispatched,
+            "queued": self.queued,
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.dispatched, 6) if self.dispatched else 0.0,
+            "wait_seconds_p50": round(self.waits.percentile(50), 6),
+            "wait_seconds_p95": round(self.waits.percentile(95), 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+class FairScheduler:
+    """Bounds concurrent upstream calls and shares them fairly between tenants.
+
+    A call from tenant ``t`` with weight ``w`` gets the start tag
+    ``max(V, finish[t])`` and moves ``finish[t]`` on by ``1 / w``; ``V`` is the
+    tag of the call dispatched last. Free slots go to the smallest tag, so a
+    tenant with weight 2 gets twice the calls of one with weight 1 while both
+    are waiting, and an idle tenant does not bank credit. Each priority class
+    has its own tags and ``interactive`` is served first.
+
+    Tenants beyond ``max_tenants`` share the ``other`` bucket. A
+    ``max_concurrency`` of zero disables the limit.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        weights: Mapping[str, float] | None = None,
+        default_weight: float = 1.0,
+        max_tenants: int = 1000,
+        window: int = 200,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight if default_weight > 0 else 1.0
+        self.max_tenants = max_tenants
+        self.window = window
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def reset(self) -> None:
+        self.in_flight = 0
+        self._queue: List[Tuple[int, float, int, str, "asyncio.Future[None]"]] = []
+        self._virtual_time = [0.0 for _ in PRIORITIES]
+        self._finish: List[Dict[str, float]] = [{} for _ in PRIORITIES]
+        self._seq = 0
+        self._tenants: Dict[str, _TenantStats] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(stats.waiting for stats in self._tenants.values())
+
+    def weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, self.default_weight)
+
+    def _tenant(self, tenant: str) -> str:
+        if tenant in self._tenants or tenant in self.weights or len(self._tenants) < self.max_tenants:
+            return tenant
+        return OTHER
+
+    def _tag(self, rank: int, tenant: str) -> float:
+        finish = self._finish[rank]
+        start = max(self._virtual_time[rank], finish.get(tenant, 0.0))
+        finish[tenant] = start + 1.0 / self.weight(tenant)
+        return start
+
+    async def acquire(self, tenant: str, priority: str = "interactive") -> str:
+        """Wait for an upstream slot; return the tenant the call was counted under."""
+        tenant = self._tenant(tenant)
+        stats = self._tenants.get(tenant)
+        if stats is None:
+            stats = self._tenants[tenant] = _TenantStats(self.window)
+        rank = PRIORITIES.index(priority) if priority in PRIORITIES else 0
+        tag = self._tag(rank, tenant)
+
+        if not self.enabled or (self.in_flight < self.max_concurrency and not self.queue_depth):
+            self._virtual_time[rank] = max(self._virtual_time[rank], tag)
+            self.in_flight += 1
+            stats.in_flight += 1
+            stats.record_wait(0.0)
+            return tenant
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._queue, (rank, tag, self._seq, tenant, waiter))
+        stats.queued += 1
+        stats.waiting += 1
+        started = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._abandon(tenant, waiter)
+            raise
+        # The releasing call handed its slot over; in_flight is unchanged
+        stats.in_flight += 1
+        stats.record_wait(time.monotonic() - started)
+        return tenant
+
+    def release(self, tenant: str) -> None:
+        """Free a slot, handing it to the waiting call with the smallest tag."""
+        stats = self._tenants.get(tenant)
+        if stats is not None:
+            stats.in_flight -= 1
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        while self._queue:
+            rank, tag, _, tenant, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            self._virtual_time[rank] = max(self._virtual_time[rank], tag)
+            self._tenants[tenant].waiting -= 1
+            waiter.set_result(None)
+            return
+        self.in_flight -= 1
+
+    def _abandon(self, tenant: str, waiter: "asyncio.Future[None]") -> None:
+        if waiter.done() and not waiter.cancelled():
+            # A slot was handed over just as the call gave up; pass it on
+            self._hand_over()
+            return
+        waiter.cancel()
+        self._tenants[tenant].waiting -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold a slot for the current client; yields the seconds spent waiting."""
+        tenant, priority = current_client()
+        started = time.monotonic()
+        counted = await self.acquire(tenant, priority)
+        try:
+            yield time.monotonic() - started
+        finally:
+            self.release(counted)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "default_weight": self.default_weight,
+            "tenants": {
+                tenant: stats.stats(self.weight(tenant))
+                for tenant, stats in sorted(self._tenants.items())
+            },
+        }
@@ -0,0 +1,132 @@
+"""Production launcher: ``python -m fastapi_openai_mcp.serve api|mcp``.
+
+Runs uvicorn with ``WEB_CONCURRENCY`` worker processes on the uvloop event
+loop and httptools HTTP parser when they are installed (``pip install
+".[production]"``). Workers are recycled after ``MAX_REQUESTS`` requests and
+restarted by the uvicorn supervisor if they die.
+
+With more than one worker, state that would otherwise be per process is
+shared through ``SHARED_STATE_DIR`` (shared memory under ``/dev/shm`` when
+available): the answer cache and sessions default to SQLite files there,
+``/metrics`` sums every worker's metrics, and the admission and upstream
+OpenAI concurrency limits are split between workers so they still hold for
+the whole server.
+"""
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import sys
+import tempfile
+from typing import Dict, List, Mapping
+
+import uvicorn
+
+from .config import env_bool, env_int
+from .metrics import SharedMetrics
+
+logger = logging.getLogger("fastapi_openai_mcp.serve")
+
+SERVICES = {
+    "api": ("fastapi_openai_mcp.api_server:app", 8000),
+    "mcp": ("fastapi_openai_mcp.mcp_server:app", 8001),
+}
+
+
+def worker_count(value: str | None) -> int:
+    """Parse ``WEB_CONCURRENCY``: a number, or ``auto`` for the CPUs this process may use."""
+    if value is None or value.strip() == "":
+        return 1
+    if value.strip().lower() == "auto":
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except AttributeError:
+            return max(1, os.cpu_count() or 1)
+    return max(1, int(value))
+
+
+def implementation(module: str, fallback: str) -> str:
+    """Return ``module`` if it is installed, else ``fallback``."""
+    return module if importlib.util.find_spec(module) is not None else fallback
+
+
+def default_state_dir(service: str, port: int) -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"fastapi_openai_mcp-{service}-{port}")
+
+
+def _split(total: int, workers: int) -> int:
+    return total if total <= 0 else max(1, math.ceil(total / workers))
+
+
+def shared_state_env(workers: int, directory: str, environ: Mapping[str, str]) -> Dict[str, str]:
+    """Return the environment that makes ``workers`` processes share state.
+
+    Settings already present in ``environ`` are kept, except the admission
+    and OpenAI concurrency limits, which are divided between workers.
+    """
+    if workers < 2:
+        return {}
+    env = {"SHARED_STATE_DIR": directory}
+    defaults = {
+        "ANSWER_CACHE_BACKEND": "sqlite",
+        "ANSWER_CACHE_PATH": os.path.join(directory, "answer_cache.sqlite3"),
+        "SESSION_BACKEND": "sqlite",
+        "SESSION_PATH": os.path.join(directory, "sessions.sqlite3"),
+    }
+    env.update({key: value for key, value in defaults.items() if not environ.get(key)})
+    limits = (("ADMISSION_MAX_IN_FLIGHT", 64), ("ADMISSION_MAX_QUEUE", 128), ("OPENAI_MAX_CONCURRENCY", 0))
+    for name, default in limits:
+        total = int(environ.get(name) or default)
+        env[name] = str(_split(total, workers))
+    return env
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=None, help="defaults to PORT, then 8000 (api) or 8001 (mcp)")
+    args = parser.parse_args(argv)
+
+    app, default_port = SERVICES[args.service]
+    port = args.port or env_int("PORT", default_port)
+    workers = worker_count(os.getenv("WEB_CONCURRENCY"))
+    loop = implementation("uvloop", "asyncio")
+    http = implementation("httptools", "h11")
+    log_level = os.getenv("LOG_LEVEL", "info").lower()
+
+    if workers > 1:
+        directory = os.getenv("SHARED_STATE_DIR") or default_state_dir(args.service, port)
+        os.makedirs(directory, exist_ok=True)
+        SharedMetrics.clear(directory, args.service)
+        # Workers are spawned after this and inherit the environment
+        os.environ.update(shared_state_env(workers, directory, os.environ))
+
+    logging.basicConfig(level=getattr(logging, log_level.upper(), logging.INFO))
+    logger.info(
+        "Starting %s server on %s:%s (workers=%s, loop=%s, http=%s, shared_state=%s)",
+        args.service, args.host, port, workers, loop, http, os.getenv("SHARED_STATE_DIR"),
+    )
+    max_requests = env_int("MAX_REQUESTS", 0)
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        log_level=log_level,
+        access_log=env_bool("ACCESS_LOG", True),
+        limit_max_requests=max_requests or None,
+        limit_max_requests_jitter=env_int("MAX_REQUESTS_JITTER", 0),
+        timeout_graceful_shutdown=env_int("GRACEFUL_TIMEOUT", 30),
+        timeout_keep_alive=env_int("KEEPALIVE_TIMEOUT", 5),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
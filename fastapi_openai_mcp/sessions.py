@@ -0,0 +1,186 @@
+"""Server-side conversation sessions with history trimmed to a token budget."""
+
+import asyncio
+import json
+import logging
+import secrets
+import weakref
+from typing import Any, Dict, List
+
+from .cache import MemoryAnswerBackend, SQLiteAnswerBackend
+
+logger = logging.getLogger("fastapi_openai_mcp.sessions")
+
+Message = Dict[str, Any]
+Turn = List[Message]
+
+
+def estimate_tokens(message: Message) -> int:
+    """Roughly estimate the prompt tokens of one message (about 4 characters each)."""
+    size = len(str(message.get("content") or ""))
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        size += len(function.get("name") or "") + len(function.get("arguments") or "")
+    return 4 + size // 4
+
+
+def compact_message(message: Message, max_tool_chars: int) -> Message:
+    """Keep only the fields the model needs, truncating long tool results."""
+    role = message.get("role")
+    if role == "tool":
+        content = str(message.get("content") or "")
+        if len(content) > max_tool_chars:
+            content = content[:max_tool_chars] + " [truncated]"
+        return {
+            "role": "tool",
+            "tool_call_id": message.get("tool_call_id"),
+            "name": message.get("name"),
+            "content": content,
+        }
+    compact: Message = {"role": role, "content": message.get("content")}
+    if message.get("tool_calls"):
+        compact["tool_calls"] = [
+            {
+                "id": call.get("id"),
+                "type": "function",
+                "function": {
+                    "name": (call.get("function") or {}).get("name"),
+                    "arguments": (call.get("function") or {}).get("arguments") or "",
+                },
+            }
+            for call in message["tool_calls"]
+        ]
+    return compact
+
+
+def _without_tool_exchange(turn: Turn) -> Turn:
+    return [m for m in turn if m["role"] != "tool" and not m.get("tool_calls")]
+
+
+def create_session_backend(kind: str, max_sessions: int, path: str | None = None) -> Any:
+    """Return the session backend named ``kind`` (``memory`` or ``sqlite``).
+
+    Sessions are stored as JSON strings, so the answer cache backends are reused.
+    """
+    if kind == "memory":
+        return MemoryAnswerBackend(max_sessions)
+    if kind == "sqlite":
+        return SQLiteAnswerBackend(path or "sessions.sqlite3", max_sessions, table="sessions")
+    raise ValueError(f"Unknown session backend '{kind}'")
+
+
+class SessionStore:
+    """Keeps per-session conversation turns and builds a bounded history.
+
+    A turn is the user message, any tool exchange and the final answer. Tool
+    results are truncated when stored, and only the latest ``keep_tool_turns``
+    turns keep their tool exchange in the history; older turns keep just the
+    question and answer. The oldest turns are then dropped until the history
+    fits in ``max_tokens``. Sessions expire ``ttl`` seconds after their last
+    turn.
+
+    Session IDs are unguessable tokens issued by :meth:`create`; callers
+    should reject IDs for which :meth:`exists` is false.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        ttl: float = 1800.0,
+        max_tokens: int = 2000,
+        max_turns: int = 20,
+        max_tool_chars: int = 500,
+        keep_tool_turns: int = 1,
+        enabled: bool = True,
+    ) -> None:
+        if max_turns < 1:
+            raise ValueError(f"max_turns must be at least 1, got {max_turns}")
+        self.backend = backend
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.max_tool_chars = max_tool_chars
+        self.keep_tool_turns = keep_tool_turns
+        self.enabled = enabled
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.reset()
+
+    def reset(self) -> None:
+        self.sessions_created = 0
+        self.turns_appended = 0
+        self.turns_trimmed = 0
+        self.tool_exchanges_dropped = 0
+        self.last_history_tokens = 0
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Return the lock serializing turns of one session in this process."""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def create(self) -> str:
+        """Start an empty session and return its ID."""
+        session_id = secrets.token_urlsafe(24)
+        await self.backend.set(session_id, "[]", self.ttl)
+        self.sessions_created += 1
+        return session_id
+
+    async def exists(self, session_id: str) -> bool:
+        """Return whether ``session_id`` was issued here and has not expired."""
+        return await self.backend.get(session_id) is not None
+
+    async def turns(self, session_id: str) -> List[Turn]:
+        raw = await self.backend.get(session_id)
+        if raw is None:
+            return []
+        try:
+            turns = json.loads(raw)
+        except ValueError:
+            logger.warning("Discarding unreadable session", extra={"session_id": session_id})
+            return []
+        return turns if isinstance(turns, list) else []
+
+    def build_history(self, turns: List[Turn]) -> List[Message]:
+        """Flatten stored turns into messages that fit the token budget."""
+        selected: List[Turn] = []
+        budget = self.max_tokens
+        for age, turn in enumerate(reversed(turns)):
+            if age >= self.keep_tool_turns:
+                compacted = _without_tool_exchange(turn)
+                if len(compacted) != len(turn):
+                    self.tool_exchanges_dropped += 1
+                turn = compacted
+            cost = sum(estimate_tokens(message) for message in turn)
+            if cost > budget:
+                self.turns_trimmed += len(turns) - len(selected)
+                break
+            budget -= cost
+            selected.append(turn)
+        self.last_history_tokens = self.max_tokens - budget
+        return [message for turn in reversed(selected) for message in turn]
+
+    async def history(self, session_id: str) -> List[Message]:
+        return self.build_history(await self.turns(session_id))
+
+    async def append(self, session_id: str, messages: List[Message], answer: str | None) -> None:
+        """Store a finished turn: its new messages (from the user message on) and the answer."""
+        turn = [compact_message(message, self.max_tool_chars) for message in messages]
+        turn.append({"role": "assistant", "content": answer or ""})
+        turns = (await self.turns(session_id) + [turn])[-self.max_turns:]
+        await self.backend.set(session_id, json.dumps(turns, separators=(",", ":")), self.ttl)
+        self.turns_appended += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_tokens": self.max_tokens,
+            "max_turns": self.max_turns,
+            **self.backend.stats(),
+            "sessions_created": self.sessions_created,
+            "turns_appended": self.turns_appended,
+            "turns_trimmed": self.turns_trimmed,
+            "tool_exchanges_dropped": self.tool_exchanges_dropped,
+            "last_history_tokens": self.last_history_tokens,
+        }
@@ -0,0 +1,182 @@
+"""Tool catalog used by the API server: cached MCP manifest and handler dispatch."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger("fastapi_openai_mcp.tools")
+
+ToolHandler = Callable[[Dict[str, Any]], Awaitable[str]]
+# Fetches the manifest given the last ETag; returns (status_code, etag, manifest or None)
+ManifestFetcher = Callable[[str | None], Awaitable[Tuple[int, str | None, Dict[str, Any] | None]]]
+# Builds a handler that invokes a discovered tool on the MCP server by name
+RemoteHandlerFactory = Callable[[str], ToolHandler]
+
+
+def to_openai_tool(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an MCP manifest entry into an OpenAI function tool definition."""
+    return {
+        "type": "function",
+        "function": {
+            "name": entry["name"],
+            "description": entry.get("description", ""),
+            "parameters": entry.get(
+                "parameters", {"type": "object", "properties": {}, "required": []}
+            ),
+        },
+    }
+
+
+def canonical_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return ``tools`` ordered by name with all object keys sorted.
+
+    The result serializes to the same bytes for the same tools regardless of
+    manifest order, keeping the request prefix stable for prompt caching.
+    """
+    ordered = sorted(tools, key=lambda tool: tool["function"]["name"])
+    return json.loads(json.dumps(ordered, sort_keys=True))
+
+
+class ToolCatalog:
+    """Tool definitions for OpenAI plus an O(1) name-to-handler map.
+
+    Built-in tools are always available. When discovery is enabled the MCP
+    ``/tools`` manifest is fetched once, cached for ``ttl`` seconds and then
+    revalidated with ``If-None-Match``; tools it adds are dispatched through
+    handlers built by ``remote_handler``. If the manifest cannot be fetched or
+    is malformed the last known tools keep being served.
+    """
+
+    def __init__(
+        self,
+        static_tools: List[Dict[str, Any]],
+        static_handlers: Dict[str, ToolHandler],
+        fetch_manifest: ManifestFetcher | None = None,
+        remote_handler: RemoteHandlerFactory | None = None,
+        ttl: float = 300.0,
+        enabled: bool = False,
+        static_metadata: Dict[str, Dict[str, Any]] | None = None,
+    ) -> None:
+        self.static_tools = static_tools
+        self.static_handlers = static_handlers
+        self.static_metadata = static_metadata or {}
+        self.fetch_manifest = fetch_manifest
+        self.remote_handler = remote_handler
+        self.ttl = ttl
+        self.enabled = enabled and fetch_manifest is not None
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget any discovered manifest and fall back to the built-in tools."""
+        self._tools: List[Dict[str, Any]] = self.static_tools
+        self._fingerprint: str | None = None
+        self._handlers: Dict[str, ToolHandler] = dict(self.static_handlers)
+        self._metadata: Dict[str, Dict[str, Any]] = dict(self.static_metadata)
+        self._etag: str | None = None
+        self._expires_at = 0.0
+        self._lock: asyncio.Lock | None = None
+        self.refreshes = 0
+        self.revalidations = 0
+        self.fetch_errors = 0
+
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        """Return the current OpenAI tool definitions without refreshing."""
+        return self._tools
+
+    @property
+    def fingerprint(self) -> str:
+        """Return a short hash identifying the current tool definitions."""
+        if self._fingerprint is None:
+            encoded = json.dumps(self._tools, sort_keys=True, separators=(",", ":"))
+            self._fingerprint = hashlib.sha256(encoded.encode()).hexdigest()[:16]
+        return self._fingerprint
+
+    def handler(self, name: str) -> ToolHandler | None:
+        return self._handlers.get(name)
+
+    def metadata(self, name: str) -> Dict[str, Any]:
+        """Return the extra manifest fields the MCP server published for ``name``."""
+        return self._metadata.get(name, {})
+
+    async def get_tools(self) -> List[Dict[str, Any]]:
+        """Return the tool definitions, refreshing the manifest when it expired."""
+        if self.enabled and time.monotonic() >= self._expires_at:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if time.monotonic() >= self._expires_at:
+                    await self.refresh()
+        return self._tools
+
+    async def refresh(self) -> None:
+        """Fetch or revalidate the MCP manifest.
+
+        A failed fetch or a malformed manifest keeps the current tools, which
+        are the last good manifest or the built-in tools.
+        """
+        assert self.fetch_manifest is not None
+        try:
+            status_code, etag, manifest = await self.fetch_manifest(self._etag)
+            if status_code == 304:
+                self.revalidations += 1
+            elif manifest is not None:
+                self._apply(manifest)
+                self._etag = etag
+                self.refreshes += 1
+                logger.info("Loaded MCP tool manifest", extra={"tools": sorted(self._handlers)})
+        except Exception:
+            self.fetch_errors += 1
+            logger.warning("Failed to load MCP tool manifest; using cached tools", exc_info=True)
+            self._expires_at = time.monotonic() + min(self.ttl, 30.0)
+            return
+        self._expires_at = time.monotonic() + self.ttl
+
+    def _apply(self, manifest: Dict[str, Any]) -> None:
+        """Replace the current tools with ``manifest``'s, or raise if it is malformed.
+
+        Nothing is changed until the whole manifest has been validated.
+        """
+        entries = manifest.get("tools", [])
+        if not isinstance(entries, list) or not all(
+            isinstance(entry, dict) and isinstance(entry.get("name"), str) for entry in entries
+        ):
+            raise ValueError("MCP tool manifest 'tools' must be a list of named entries")
+        entries = sorted(entries, key=lambda entry: entry["name"])
+        handlers: Dict[str, ToolHandler] = {}
+        metadata: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            name = entry["name"]
+            if name in self.static_handlers:
+                handlers[name] = self.static_handlers[name]
+            elif self.remote_handler is not None:
+                handlers[name] = self.remote_handler(name)
+            else:
+                continue
+            metadata[name] = {
+                **self.static_metadata.get(name, {}),
+                **{
+                    key: value
+                    for key, value in entry.items()
+                    if key not in ("name", "description", "parameters")
+                },
+            }
+        self._tools = canonical_tools(
+            [to_openai_tool(entry) for entry in entries if entry["name"] in handlers]
+        )
+        self._fingerprint = None
+        self._handlers = handlers
+        self._metadata = metadata
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "discovery_enabled": self.enabled,
+            "tools": sorted(self._handlers),
+            "etag": self._etag,
+            "refreshes": self.refreshes,
+            "revalidations": self.revalidations,
+            "fetch_errors": self.fetch_errors,
+        }
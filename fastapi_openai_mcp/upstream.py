@@ -0,0 +1,270 @@
+"""Tuned HTTP transport and rate-limit pacing for the OpenAI client.
+
+OpenAI reports the request and token budget left in the current window in
+``x-ratelimit-*`` headers on every response. :class:`RateLimitPacer` reads
+them through an httpx response hook and holds back new calls when a budget
+is nearly spent, until the window resets. A ``429`` blocks every new call
+for the ``retry-after`` time (or an exponential backoff), so the calls that
+are in flight retry together after the window instead of each hammering the
+limit on its own schedule.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Mapping
+
+from .config import env_bool, env_float, env_int
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger("fastapi_openai_mcp.upstream")
+
+KINDS = ("requests", "tokens")
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Parse a reset time such as ``1s``, ``6m0s``, ``20ms`` or ``1.5`` into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+def retry_after(headers: Mapping[str, str]) -> float | None:
+    """Return the server's requested backoff from ``retry-after-ms`` or ``retry-after``."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP dates are not sent by OpenAI; fall back to our own backoff
+            return None
+    return None
+
+
+class _Budget:
+    """What is known about one rate limit (requests or tokens) in this window."""
+
+    def __init__(self) -> None:
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+
+    def refresh(self, now: float) -> None:
+        # Once the window has reset the whole limit is available again
+        if self.limit is not None and self.reset_at and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = 0.0
+
+
+class RateLimitPacer:
+    """Keeps request and token throughput just under OpenAI's rate limits.
+
+    Before a call, :meth:`wait` checks the budgets left in the current window.
+    If dispatching the call would take either one below ``headroom`` (a share
+    of the limit kept in reserve), the call waits for the window to reset.
+    Each dispatched call takes one request and its estimated tokens off the
+    local budget, so concurrent calls do not all spend the same headroom;
+    the next response headers correct the estimate.
+
+    A ``429`` response blocks all new calls for its ``retry-after`` time, or
+    ``backoff_base * 2 ** n`` seconds (capped at ``backoff_max``) after ``n``
+    earlier 429s in a row.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        headroom: float = 0.05,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.enabled = enabled
+        self.headroom = min(0.5, max(0.0, headroom))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self.reset()
+
+    @classmethod
+    def from_env(cls) -> "RateLimitPacer":
+        """Build a pacer from ``OPENAI_PACING`` and ``OPENAI_PACING_*``."""
+        return cls(
+            enabled=env_bool("OPENAI_PACING", True),
+            headroom=env_float("OPENAI_PACING_HEADROOM", 0.05),
+            backoff_base=env_float("OPENAI_PACING_BACKOFF", 1.0),
+            backoff_max=env_float("OPENAI_PACING_BACKOFF_MAX", 30.0),
+        )
+
+    def reset(self) -> None:
+        self.budgets: Dict[str, _Budget] = {kind: _Budget() for kind in KINDS}
+        self.blocked_until = 0.0
+        self.consecutive_429 = 0
+        self.rate_limited = 0
+        self.paced = 0
+        self.wait_seconds_total = 0.0
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Update the budgets from a response's rate-limit headers."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        for kind, budget in self.budgets.items():
+            budget.refresh(now)
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            try:
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                if limit is not None:
+                    budget.limit = int(limit)
+                left = headers.get(f"x-ratelimit-remaining-{kind}")
+                if left is not None:
+                    # Responses finish out of order; within a window an older,
+                    # higher count must not undo calls sent since
+                    known = budget.remaining is not None and reset is not None
+                    budget.remaining = min(budget.remaining, int(left)) if known else int(left)
+            except ValueError:
+                continue
+            if reset is not None:
+                # Each response puts the reset a little late (by the time it
+                # took to arrive), so the earliest estimate is the best one
+                reset_at = now + reset
+                budget.reset_at = min(budget.reset_at, reset_at) if budget.reset_at else reset_at
+        if status_code == 429:
+            self.rate_limited += 1
+            delay = retry_after(headers)
+            if delay is None:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** self.consecutive_429)
+            self.consecutive_429 += 1
+            if now + delay > self.blocked_until:
+                self.blocked_until = now + delay
+                logger.warning("OpenAI rate limited; pausing new calls", extra={"seconds": round(delay, 3)})
+        elif status_code < 400:
+            self.consecutive_429 = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter backoff before retry ``attempt`` of a call that failed for another reason."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def on_response(self, response: Any) -> None:
+        """httpx ``response`` event hook."""
+        self.observe(response.status_code, response.headers)
+
+    def delay(self, tokens: int) -> float:
+        """Return how long a call estimated at ``tokens`` should wait before it is sent."""
+        if not self.enabled:
+            return 0.0
+        now = self.clock()
+        wait = self.blocked_until - now
+        for kind, needed in (("requests", 1), ("tokens", tokens)):
+            budget = self.budgets[kind]
+            budget.refresh(now)
+            if budget.remaining is None or not budget.reset_at:
+                continue
+            reserve = self.headroom * (budget.limit or 0)
+            if budget.remaining - needed < reserve:
+                wait = max(wait, budget.reset_at - now)
+        return max(0.0, wait)
+
+    async def wait(self, tokens: int, budget: float | None = None) -> float:
+        """Wait until a call estimated at ``tokens`` may go out; return the seconds waited.
+
+        No more than ``budget`` seconds are spent waiting, if given. The call
+        is then counted against the local request and token budgets.
+        """
+        waited = 0.0
+        while True:
+            delay = self.delay(tokens)
+            if budget is not None:
+                delay = min(delay, budget - waited)
+            if delay <= 0:
+                break
+            await self.sleep(delay)
+            waited += delay
+        if waited:
+            self.paced += 1
+            self.wait_seconds_total += waited
+        for kind, needed in (("requests", 1), ("tokens", tokens)):
+            budget_state = self.budgets[kind]
+            if budget_state.remaining is not None:
+                budget_state.remaining -= needed
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        return {
+            "enabled": self.enabled,
+            "headroom": self.headroom,
+            "rate_limited": self.rate_limited,
+            "paced": self.paced,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 3),
+            **{
+                kind: {
+                    "limit": budget.limit,
+                    "remaining": budget.remaining,
+                    "reset_in": round(max(0.0, budget.reset_at - now), 3) if budget.reset_at else None,
+                }
+                for kind, budget in self.budgets.items()
+            },
+        }
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Connection errors, 408, 409, 429 and 5xx responses are worth retrying, as in the SDK."""
+    import openai
+
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return isinstance(exc, openai.APIConnectionError) and not isinstance(exc, openai.APITimeoutError)
+
+
+def build_openai_client(pacer: RateLimitPacer) -> "openai.AsyncOpenAI":
+    """Create the OpenAI client on an explicitly configured, pooled HTTP client.
+
+    Connection limits and timeouts come from ``OPENAI_POOL_*`` and
+    ``OPENAI_*_TIMEOUT``, and every response passes through ``pacer``. With
+    pacing on, the SDK's own retries are turned off; ``create_completion``
+    retries instead so retries wait for the shared backoff.
+    """
+    import openai
+
+    # The SDK's own Limits type, whichever httpx package it is built on
+    limits_type = type(openai.DEFAULT_CONNECTION_LIMITS)
+    http_client = openai.DefaultAsyncHttpxClient(
+        limits=limits_type(
+            max_connections=env_int("OPENAI_POOL_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=env_int("OPENAI_POOL_MAX_KEEPALIVE", 20),
+            keepalive_expiry=env_float("OPENAI_POOL_KEEPALIVE_EXPIRY", 60.0),
+        ),
+        timeout=openai.Timeout(
+            env_float("OPENAI_TIMEOUT", 600.0),
+            connect=env_float("OPENAI_CONNECT_TIMEOUT", 5.0),
+            pool=env_float("OPENAI_POOL_TIMEOUT", 10.0),
+        ),
+        event_hooks={"response": [pacer.on_response]},
+    )
+    max_retries = 0 if pacer.enabled else max(0, env_int("OPENAI_MAX_RETRIES", 2))
+    return openai.AsyncOpenAI(http_client=http_client, max_retries=max_retries)
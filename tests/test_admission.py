@@ -0,0 +1,67 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from fastapi_openai_mcp.admission import AdmissionController, Overloaded
+
+
+def test_admission_queues_then_hands_over_slots_in_order() -> None:
+    """Waiters are admitted FIFO as slots are released."""
+    controller = AdmissionController(max_in_flight=1, max_queue=5, queue_timeout=1.0)
+    order: List[int] = []
+
+    async def job(n: int) -> None:
+        async with controller.admit():
+            order.append(n)
+            await asyncio.sleep(0.01)
+
+    async def run() -> None:
+        await asyncio.gather(*(job(n) for n in range(4)))
+
+    asyncio.run(run())
+    assert order == [0, 1, 2, 3]
+    stats = controller.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["admitted"] == 4
+    assert stats["queued"] == 3
+    assert stats["wait_seconds_max"] > 0
+
+
+def test_admission_rejects_when_queue_full() -> None:
+    """Requests beyond the queue bound are shed immediately."""
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=1.0, retry_after=3)
+
+    async def run() -> None:
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as info:
+            await controller.acquire()
+        assert info.value.reason == "queue full"
+        assert info.value.retry_after == 3
+        controller.release()
+        await waiter
+        controller.release()
+
+    asyncio.run(run())
+    assert controller.in_flight == 0
+    assert controller.rejected_queue_full == 1
+
+
+def test_admission_rejects_after_queue_timeout() -> None:
+    """Queued requests give up once the queue-time deadline passes."""
+    controller = AdmissionController(max_in_flight=1, max_queue=5, queue_timeout=0.02)
+
+    async def run() -> None:
+        await controller.acquire()
+        with pytest.raises(Overloaded) as info:
+            await controller.acquire()
+        assert info.value.reason == "queue timeout"
+        assert controller.queue_depth == 0
+        controller.release()
+
+    asyncio.run(run())
+    assert controller.in_flight == 0
+    assert controller.rejected_timeout == 1
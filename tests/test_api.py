@@ -260,4 +260,917 @@ def test_mcp_server_error(monkeypatch: pytest.MonkeyPatch) -> None:
     
     assert resp.status_code == 200
     assert error_message is not None
-    assert "Error calling MCP server" in error_message
\ No newline at end of file
+    assert "Error calling MCP server" in error_message
+
+def test_mcp_pool_stats_endpoint() -> None:
+    """The shared MCP pool is opened at startup and exposes statistics."""
+    with TestClient(api_server.app) as client:
+        resp = client.get("/stats/mcp_pool")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["open"] is True
+    assert "requests_total" in data
+    assert api_server.mcp_pool.stats()["open"] is False
+
+
+def _tool_call(call_id: str, name: str = "get_server_time") -> MagicMock:
+    call = MagicMock()
+    call.id = call_id
+    call.function.name = name
+    call.function.arguments = "{}"
+    return call
+
+
+def test_tool_calls_run_concurrently_in_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Several tool calls overlap, keep their order and isolate failures."""
+    import asyncio
+
+    active = 0
+    peak = 0
+    count = 0
+
+    async def fake_call_mcp() -> str:
+        nonlocal active, peak, count
+        count += 1
+        attempt = count
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        if attempt == 2:
+            raise RuntimeError("boom")
+        return f"[MCP Server Time] {attempt}"
+
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    calls = [_tool_call("a"), _tool_call("b"), _tool_call("c"), _tool_call("d", "unknown")]
+
+    results = asyncio.run(api_server.run_tool_calls(calls))
+
+    assert [r["tool_call_id"] for r in results] == ["a", "b", "c", "d"]
+    assert peak == 3
+    assert "Error calling MCP server: boom" in results[1]["content"]
+    assert results[0]["content"].startswith("[MCP Server Time]")
+    assert results[2]["content"].startswith("[MCP Server Time]")
+    assert "unknown tool" in results[3]["content"]
+    assert [r.failed for r in results] == [False, True, False, True]
+
+
+def test_tool_call_concurrency_cap(monkeypatch: pytest.MonkeyPatch) -> None:
+    """No more than TOOL_CALL_CONCURRENCY calls run at once."""
+    import asyncio
+
+    active = 0
+    peak = 0
+
+    async def fake_call_mcp() -> str:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return "[MCP Server Time] now"
+
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    monkeypatch.setattr(api_server, "TOOL_CALL_CONCURRENCY", 2)
+
+    results = asyncio.run(api_server.run_tool_calls([_tool_call(str(i)) for i in range(6)]))
+
+    assert len(results) == 6
+    assert peak == 2
+
+
+def _chunk(content: Optional[str] = None, tool_calls: Optional[List[Any]] = None) -> Any:
+    from types import SimpleNamespace
+
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _tool_delta(index: int, call_id: Optional[str], name: Optional[str], arguments: str) -> Any:
+    from types import SimpleNamespace
+
+    return SimpleNamespace(
+        index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments)
+    )
+
+
+def _stream(chunks: List[Any]) -> Any:
+    async def gen() -> Any:
+        for chunk in chunks:
+            yield chunk
+
+    return gen()
+
+
+def _sse_events(body: str) -> List[Any]:
+    import json
+
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_chat_stream_with_tool_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Streamed tool-call deltas are assembled, executed and the answer streamed."""
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        assert kwargs["stream"] is True
+        if len(calls) == 1:
+            return _stream([
+                _chunk(tool_calls=[_tool_delta(0, "call_1", "get_server", "")]),
+                _chunk(tool_calls=[_tool_delta(0, None, "_time", "{}")]),
+            ])
+        return _stream([_chunk("The time is "), _chunk("[MCP Server Time] t")])
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] t"
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/stream", json={"message": "what time is it?"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(resp.text)
+    assert events[0] == ("tool", {"name": "get_server_time"})
+    assert [e for e in events if e[0] == "token"] == [
+        ("token", {"content": "The time is "}),
+        ("token", {"content": "[MCP Server Time] t"}),
+    ]
+    assert events[-1] == ("done", {"answer": "The time is [MCP Server Time] t"})
+    tool_message = calls[1]["messages"][-1]
+    assert tool_message["role"] == "tool"
+    assert tool_message["tool_call_id"] == "call_1"
+    assert calls[1]["messages"][-2]["tool_calls"][0]["function"]["name"] == "get_server_time"
+
+
+def test_chat_stream_done_matches_tokens_before_a_tool_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Text streamed ahead of a tool call stays in the final answer."""
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        if len(calls) == 1:
+            return _stream([
+                _chunk("Let me check. "),
+                _chunk(tool_calls=[_tool_delta(0, "call_1", "get_server_time", "{}")]),
+            ])
+        return _stream([_chunk("It is [MCP Server Time] t")])
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] t"
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/stream", json={"message": "what time is it?"})
+
+    events = _sse_events(resp.text)
+    tokens = "".join(data["content"] for kind, data in events if kind == "token")
+    assert tokens == "Let me check. It is [MCP Server Time] t"
+    assert events[-1] == ("done", {"answer": tokens})
+    assert calls[1]["messages"][-2]["content"] == "Let me check. "
+
+
+def test_chat_stream_without_tool_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Plain answers are streamed token by token from the first completion."""
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        return _stream([_chunk("Why did "), _chunk("the chicken...")])
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/stream", json={"message": "tell me a joke"})
+
+    events = _sse_events(resp.text)
+    assert events == [
+        ("token", {"content": "Why did "}),
+        ("token", {"content": "the chicken..."}),
+        ("done", {"answer": "Why did the chicken..."}),
+    ]
+
+
+def test_mcp_tool_manifest_and_etag() -> None:
+    """The MCP server publishes its registry with ETag revalidation."""
+    client: TestClient = TestClient(mcp_app)
+    headers = {"X-Api-Key": MCP_API_KEY}
+    assert client.get("/tools").status_code == 401
+
+    r = client.get("/tools", headers=headers)
+    assert r.status_code == 200
+    names = [tool["name"] for tool in r.json()["tools"]]
+    assert "get_server_time" in names
+    etag = r.headers["etag"]
+
+    r = client.get("/tools", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+
+def test_mcp_generic_tool_call() -> None:
+    """Registered tools are callable by name; unknown names return 404."""
+    client: TestClient = TestClient(mcp_app)
+    headers = {"X-Api-Key": MCP_API_KEY}
+    r = client.post("/tools/get_server_time", headers=headers, json={})
+    assert r.status_code == 200
+    assert r.json()["result"].startswith("[MCP Server Time]")
+    assert client.post("/tools/nope", headers=headers, json={}).status_code == 404
+
+
+def test_tool_cache_coalesces_chat_tool_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    """With the tool cache enabled, identical concurrent calls hit MCP once."""
+    import asyncio
+
+    from fastapi_openai_mcp.cache import ToolResultCache
+
+    upstream = 0
+
+    async def fake_call_mcp() -> str:
+        nonlocal upstream
+        upstream += 1
+        await asyncio.sleep(0.02)
+        return "[MCP Server Time] cached"
+
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    monkeypatch.setattr(api_server, "tool_cache", ToolResultCache(enabled=True))
+
+    async def run() -> None:
+        await api_server.run_tool_calls([_tool_call(str(i)) for i in range(5)])
+        await api_server.run_tool_calls([_tool_call("again")])
+
+    asyncio.run(run())
+    assert upstream == 1
+    assert api_server.tool_cache.stats()["coalesced"] == 4
+
+
+def test_answer_cache_deduplicates_identical_chats(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Identical concurrent /chat messages share one OpenAI computation when enabled."""
+    import asyncio
+
+    import httpx
+
+    from fastapi_openai_mcp.cache import AnswerCache, MemoryAnswerBackend
+
+    calls: List[Dict[str, Any]] = []
+    mock_message = MagicMock()
+    mock_message.tool_calls = None
+    mock_message.content = "cached answer"
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=mock_message)]
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        await asyncio.sleep(0.02)
+        return mock_response
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(
+        api_server, "answer_cache", AnswerCache(MemoryAnswerBackend(), ttl=60, enabled=True)
+    )
+
+    async def run() -> List[Dict[str, str]]:
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            messages = ["Hi there", "hi  there", "HI THERE"]
+            responses = await asyncio.gather(*(client.post("/chat", json={"message": m}) for m in messages))
+            responses.append(await client.post("/chat", json={"message": "hi there"}))
+        return [r.json() for r in responses]
+
+    results = asyncio.run(run())
+    assert [r["answer"] for r in results] == ["cached answer"] * 4
+    assert len(calls) == 1
+
+
+def test_chat_batch_streams_ndjson(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Batch items run with bounded concurrency; failures become error entries."""
+    import asyncio
+    import json
+
+    active = 0
+    peak = 0
+
+    async def fake_complete_chat(message: str) -> str:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if message == "bad":
+            raise RuntimeError("upstream failed")
+        return f"answer to {message}"
+
+    monkeypatch.setattr(api_server, "complete_chat", fake_complete_chat)
+    messages = ["a", "b", "bad", "c", "d", "e"]
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/batch", json={"messages": messages, "concurrency": 2})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == list(range(len(messages)))
+    assert by_index[0] == {"index": 0, "answer": "answer to a"}
+    assert by_index[2] == {"index": 2, "error": "upstream failed"}
+    assert peak == 2
+
+
+def test_chat_batch_items_are_admission_controlled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Batch items hold admission slots and are shed like interactive requests."""
+    import asyncio
+    import json
+
+    from fastapi_openai_mcp.admission import AdmissionController
+
+    active = 0
+    peak = 0
+
+    async def fake_complete_chat(message: str) -> str:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f"answer to {message}"
+
+    monkeypatch.setattr(api_server, "complete_chat", fake_complete_chat)
+    controller = AdmissionController(max_in_flight=2, max_queue=10, retry_after=3)
+    monkeypatch.setattr(api_server, "admission", controller)
+    messages = ["a", "b", "c", "d", "e", "f"]
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/batch", json={"messages": messages, "concurrency": 4})
+        controller.in_flight, controller.max_queue = 2, 0
+        shed = client.post("/chat/batch", json={"messages": ["g"]})
+        controller.in_flight = 0
+
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert all("answer" in line for line in lines)
+    assert peak == 2
+    assert controller.stats()["admitted"] == len(messages)
+    assert json.loads(shed.text) == {"index": 0, "error": "Server overloaded (queue full)", "retry_after": 3}
+
+
+def test_scheduler_tags_openai_calls_by_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    """OpenAI calls are counted per client and priority in /stats/scheduler."""
+    from fastapi_openai_mcp.scheduler import FairScheduler
+
+    mock_message = MagicMock()
+    mock_message.tool_calls = None
+    mock_message.content = "hi"
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=mock_message)]
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        return mock_response
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "openai_scheduler", FairScheduler(max_concurrency=2, weights={"acme": 3}))
+
+    with TestClient(api_server.app) as client:
+        assert client.post("/chat", json={"message": "a"}, headers={"X-Client-Id": "acme"}).status_code == 200
+        assert client.post("/chat", json={"message": "b"}).status_code == 200
+        stats = client.get("/stats/scheduler").json()
+        exposition = client.get("/metrics").text
+
+    assert stats["max_concurrency"] == 2
+    assert stats["tenants"]["acme"]["dispatched"] == 1
+    assert stats["tenants"]["acme"]["weight"] == 3
+    assert stats["tenants"]["anonymous"]["dispatched"] == 1
+    assert 'openai_scheduler_wait_seconds_count{priority="interactive"}' in exposition
+
+
+def test_streams_hold_their_scheduler_slot(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A streamed completion keeps its upstream slot until the stream is used up."""
+    from fastapi_openai_mcp.scheduler import FairScheduler
+
+    scheduler = FairScheduler(max_concurrency=2)
+    in_flight: List[int] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        async def gen() -> Any:
+            for text in ("Why did ", "the chicken..."):
+                in_flight.append(scheduler.in_flight)
+                yield _chunk(text)
+
+        return gen()
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "openai_scheduler", scheduler)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/stream", json={"message": "tell me a joke"})
+
+    assert _sse_events(resp.text)[-1] == ("done", {"answer": "Why did the chicken..."})
+    assert in_flight == [1, 1]
+    assert scheduler.in_flight == 0
+
+
+def test_batch_requests_cannot_raise_their_priority() -> None:
+    """X-Priority can lower a request's priority but not raise it."""
+    from starlette.requests import Request
+
+    def request(priority: str) -> Request:
+        return Request({"type": "http", "headers": [(b"x-priority", priority.encode())]})
+
+    assert api_server._client_for(request("interactive"), "batch")[1] == "batch"
+    assert api_server._client_for(request("batch"), "interactive")[1] == "batch"
+    assert api_server._client_for(request("interactive"), "interactive")[1] == "interactive"
+
+
+def test_chat_batch_rejects_oversized_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Batches larger than BATCH_MAX_ITEMS are rejected up front."""
+    monkeypatch.setattr(api_server, "BATCH_MAX_ITEMS", 2)
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat/batch", json={"messages": ["a", "b", "c"]})
+    assert resp.status_code == 413
+
+
+def test_chat_sheds_load_with_429(monkeypatch: pytest.MonkeyPatch) -> None:
+    """When admission is saturated /chat returns 429 with Retry-After."""
+    from fastapi_openai_mcp.admission import AdmissionController
+
+    controller = AdmissionController(max_in_flight=1, max_queue=0, retry_after=2)
+    controller.in_flight = 1
+    monkeypatch.setattr(api_server, "admission", controller)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat", json={"message": "hello"})
+        stats = client.get("/stats/admission").json()
+
+    assert resp.status_code == 429
+    assert resp.headers["retry-after"] == "2"
+    assert stats["rejected_queue_full"] == 1
+
+
+def test_metrics_endpoints(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Both servers expose Prometheus metrics with stage, tool and token data."""
+    mock_tool_call = _tool_call("call_m")
+    first = MagicMock()
+    first.choices = [MagicMock(message=MagicMock(tool_calls=[mock_tool_call], content=None))]
+    first.choices[0].message.model_dump.return_value = {"role": "assistant", "content": None}
+    first.usage.prompt_tokens = 120
+    first.usage.completion_tokens = 7
+    second = MagicMock()
+    second.choices = [MagicMock(message=MagicMock(content="done"))]
+    second.usage.prompt_tokens = 150
+    second.usage.completion_tokens = 12
+    responses = [first, second]
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        return responses.pop(0)
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] now"
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as client:
+        assert client.post("/chat", json={"message": "time?"}).status_code == 200
+        resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    for stage in ("openai_first", "mcp_tools", "openai_second", "total"):
+        assert f'chat_stage_duration_seconds_count{{stage="{stage}"}}' in body
+    assert 'openai_tokens_total{stage="openai_first",type="prompt"}' in body
+    assert 'tool_calls_total{tool="get_server_time",outcome="success"}' in body
+    assert 'http_requests_total{method="POST",route="/chat",status="200"}' in body
+    assert "chat_admission_queue_depth 0" in body
+
+    mcp_client: TestClient = TestClient(mcp_app)
+    mcp_client.get("/server_time", headers={"X-Api-Key": MCP_API_KEY})
+    body = mcp_client.get("/metrics").text
+    assert 'mcp_tool_calls_total{tool="get_server_time",outcome="success"}' in body
+    assert 'http_requests_total{method="GET",route="/server_time",status="200"}' in body
+
+
+def _completion(message: Any) -> Any:
+    response = MagicMock()
+    response.choices = [MagicMock(message=message)]
+    return response
+
+
+def _tool_message(call_id: str = "call_p") -> Any:
+    message = MagicMock()
+    message.tool_calls = [_tool_call(call_id)]
+    message.content = None
+    message.model_dump.return_value = {"role": "assistant", "content": None}
+    return message
+
+
+def test_speculative_prefetch_hit(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A predicted tool starts during the first completion and its result is reused."""
+    import asyncio
+
+    from fastapi_openai_mcp.prefetch import Prefetcher, parse_rules
+
+    events: List[str] = []
+
+    async def fake_call_mcp() -> str:
+        events.append("mcp start")
+        await asyncio.sleep(0.01)
+        return "[MCP Server Time] prefetched"
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        if "tools" in kwargs:
+            events.append("first completion")
+            await asyncio.sleep(0.02)
+            return _completion(_tool_message())
+        final = MagicMock(content=kwargs["messages"][-1]["content"])
+        return _completion(final)
+
+    prefetcher = Prefetcher(parse_rules([r"get_server_time=\btime\b"]), enabled=True)
+    monkeypatch.setattr(api_server, "prefetcher", prefetcher)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+
+    answer = asyncio.run(api_server.complete_chat("what time is it?"))
+
+    assert answer == "[MCP Server Time] prefetched"
+    assert sorted(events) == ["first completion", "mcp start"]
+    assert prefetcher.stats()["hits"] == 1
+    assert prefetcher.stats()["wasted"] == 0
+
+
+def test_speculative_prefetch_wasted(monkeypatch: pytest.MonkeyPatch) -> None:
+    """An unused prefetch is cancelled and counted as wasted."""
+    import asyncio
+
+    from fastapi_openai_mcp.prefetch import Prefetcher, parse_rules
+
+    cancelled = False
+
+    async def fake_call_mcp() -> str:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return "unused"
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(0.01)
+        return _completion(MagicMock(tool_calls=None, content="No tool needed"))
+
+    prefetcher = Prefetcher(parse_rules([r"get_server_time=\btime\b"]), enabled=True)
+    monkeypatch.setattr(api_server, "prefetcher", prefetcher)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+
+    async def run() -> str | None:
+        answer = await api_server.complete_chat("is it time for a joke?")
+        await asyncio.sleep(0)
+        return answer
+
+    assert asyncio.run(run()) == "No tool needed"
+    assert cancelled
+    assert prefetcher.stats()["wasted"] == 1
+    assert prefetcher.stats()["hits"] == 0
+
+
+def test_templated_answer_skips_second_completion(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A single call to a templated tool is answered without a second completion."""
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        return _completion(_tool_message())
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] 2024-01-01T00:00:00Z"
+
+    monkeypatch.setattr(api_server, "TEMPLATED_ANSWERS", True)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat", json={"message": "what time is it?"})
+        metrics_text = client.get("/metrics").text
+
+    assert resp.json()["answer"] == "The current server time is [MCP Server Time] 2024-01-01T00:00:00Z."
+    assert len(calls) == 1
+    assert 'chat_answers_total{source="template",tool="get_server_time"}' in metrics_text
+
+
+def test_tool_cache_ttls_skip_invalid_items() -> None:
+    """Malformed TOOL_CACHE_TTLS items are ignored instead of failing the import."""
+    spec = ["get_server_time=0.25", "echo=abc", "=5", "weather", "slow=-1", "echo2=30"]
+    assert api_server._parse_tool_ttls(spec) == {"get_server_time": 0.25, "echo2": 30.0}
+
+
+def test_answer_cache_skips_answers_from_uncached_tools(monkeypatch: pytest.MonkeyPatch) -> None:
+    """An answer built from tool results is cached no longer than those results."""
+    from fastapi_openai_mcp.cache import AnswerCache, MemoryAnswerBackend
+
+    calls: List[Dict[str, Any]] = []
+    times = iter(["[MCP Server Time] 1", "[MCP Server Time] 2"])
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        return _completion(_tool_message())
+
+    async def fake_call_mcp() -> str:
+        return next(times)
+
+    monkeypatch.setattr(api_server, "TEMPLATED_ANSWERS", True)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    monkeypatch.setitem(api_server.TOOL_CACHE_TTLS, "get_server_time", 0.0)
+    monkeypatch.setattr(
+        api_server, "answer_cache", AnswerCache(MemoryAnswerBackend(), ttl=60, enabled=True)
+    )
+
+    with TestClient(api_server.app) as client:
+        answers = [client.post("/chat", json={"message": "what time is it?"}).json()["answer"] for _ in range(2)]
+
+    assert answers[0] != answers[1]
+    assert len(calls) == 2
+    assert api_server.answer_cache.stats()["size"] == 0
+
+
+def test_templated_answer_falls_back_on_tool_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Failed tool calls still go to the model for the final answer."""
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        if len(calls) == 1:
+            return _completion(_tool_message())
+        return _completion(MagicMock(content="Sorry, the time is unavailable."))
+
+    async def fake_call_mcp() -> str:
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(api_server, "TEMPLATED_ANSWERS", True)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat", json={"message": "what time is it?"})
+
+    assert resp.json()["answer"] == "Sorry, the time is unavailable."
+    assert len(calls) == 2
+
+
+def test_templated_answer_uses_the_call_outcome(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Templating follows the tool call's outcome, not the text of its result."""
+    monkeypatch.setattr(api_server, "TEMPLATED_ANSWERS", True)
+    message = {"tool_call_id": "1", "role": "tool", "name": "get_server_time"}
+
+    ok = api_server.ToolMessage(message, content="Error budget is 5%")
+    failed = api_server.ToolMessage(message, content="timed out", failed=True)
+
+    assert api_server.templated_answer([ok]) == "The current server time is Error budget is 5%."
+    assert api_server.templated_answer([failed]) is None
+
+
+def test_templated_answer_shadow_sampling(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sampled templated answers are compared against a background model answer."""
+    import asyncio
+
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        if "tools" in kwargs:
+            return _completion(_tool_message())
+        return _completion(MagicMock(content=f"It is {kwargs['messages'][-1]['content']}"))
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] shadow"
+
+    monkeypatch.setattr(api_server, "TEMPLATED_ANSWERS", True)
+    monkeypatch.setattr(api_server, "TEMPLATED_SHADOW_RATE", 1.0)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+    before = api_server.TEMPLATED_SHADOW.get("get_server_time", "yes")
+
+    async def run() -> str | None:
+        answer = await api_server.complete_chat("what time is it?")
+        await asyncio.gather(*api_server._background_tasks)
+        return answer
+
+    assert asyncio.run(run()) == "The current server time is [MCP Server Time] shadow."
+    assert len(calls) == 2
+    assert api_server.TEMPLATED_SHADOW.get("get_server_time", "yes") == before + 1
+
+
+def test_chat_session_carries_history(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Requests with a session_id see earlier turns; other requests do not."""
+    calls: List[List[Dict[str, Any]]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(list(kwargs["messages"]))
+        return _completion(MagicMock(content=f"reply {len(calls)}", tool_calls=None))
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+
+    with TestClient(api_server.app) as client:
+        created = client.post("/sessions")
+        session_id = created.json()["session_id"]
+        first = client.post("/chat", json={"message": "hello", "session_id": session_id})
+        client.post("/chat", json={"message": "and again", "session_id": session_id})
+        client.post("/chat", json={"message": "no session"})
+        stats = client.get("/stats/sessions").json()
+
+    assert created.status_code == 201
+    assert first.json() == {"answer": "reply 1", "session_id": session_id}
+    assert len(calls[0]) == 2
+    assert [m["content"] for m in calls[1][1:]] == ["hello", "reply 1", "and again"]
+    assert len(calls[2]) == 2
+    assert stats["turns_appended"] == 2
+
+
+def test_chat_rejects_sessions_the_server_did_not_issue(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Guessed or made-up session IDs cannot read or extend a conversation."""
+    calls: List[Any] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        return _completion(MagicMock(content="reply", tool_calls=None))
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+
+    with TestClient(api_server.app) as client:
+        issued = {client.post("/sessions").json()["session_id"] for _ in range(2)}
+        chat = client.post("/chat", json={"message": "hi", "session_id": "default"})
+        stream = client.post("/chat/stream", json={"message": "hi", "session_id": "1"})
+
+    assert len(issued) == 2 and all(len(session_id) >= 32 for session_id in issued)
+    assert chat.status_code == 404
+    assert stream.status_code == 404
+    assert calls == []
+
+
+def test_chat_session_rejected_when_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(api_server.session_store, "enabled", False)
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat", json={"message": "hi", "session_id": "s"})
+    assert resp.status_code == 400
+
+
+def test_completions_use_routed_models(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tool selection and the final answer use their own configured models."""
+    from fastapi_openai_mcp.routing import ModelRouter, parse_routing_rules
+
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs)
+        if len(calls) == 1:
+            return _completion(_tool_message())
+        return _completion(MagicMock(content="done"))
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] 2024-01-01T00:00:00Z"
+
+    router = ModelRouter(
+        "gpt-4.1-nano", "gpt-4.1", rules=parse_routing_rules(["answer:tool=get_server_time:gpt-4.1-mini"])
+    )
+    monkeypatch.setattr(api_server, "model_router", router)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as client:
+        client.post("/chat", json={"message": "what time is it?"})
+        stats = client.get("/stats/models").json()
+
+    assert [call["model"] for call in calls] == ["gpt-4.1-nano", "gpt-4.1-mini"]
+    assert stats["routed"] == {"gpt-4.1-nano": 1, "gpt-4.1-mini": 1}
+    assert set(stats["p95"]) == {"gpt-4.1-nano", "gpt-4.1-mini"}
+
+
+def test_chat_deadline_from_header(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Completions get the remaining budget as timeout; an expired deadline returns 504."""
+    import asyncio
+
+    timeouts: List[float] = []
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        timeouts.append(kwargs["timeout"])
+        await asyncio.sleep(0.5)
+        return _completion(MagicMock(content="too late", tool_calls=None))
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+
+    with TestClient(api_server.app) as client:
+        resp = client.post("/chat", json={"message": "hi"}, headers={"X-Request-Timeout": "0.1"})
+        metrics_text = client.get("/metrics").text
+
+    assert resp.status_code == 504
+    assert 0 < timeouts[0] <= 0.1
+    assert 'chat_aborted_total{reason="deadline"}' in metrics_text
+
+
+def test_openai_timeout_is_a_deadline_only_when_the_deadline_expired(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A client timeout maps to DeadlineExceeded only once the request deadline ran out."""
+    import asyncio
+
+    import httpx
+    import openai
+
+    from fastapi_openai_mcp.deadline import DeadlineExceeded, deadline_scope
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(0.05)
+        raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "OPENAI_MAX_RETRIES", 0)
+
+    async def run(seconds: float | None) -> None:
+        with deadline_scope(seconds):
+            await api_server.create_completion("tool_selection", "gpt-4o-mini", messages=[])
+
+    with pytest.raises(openai.APITimeoutError):
+        asyncio.run(run(None))
+    with pytest.raises(openai.APITimeoutError):
+        asyncio.run(run(30.0))
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run(0.01))
+
+
+def test_failed_completions_feed_the_model_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Timeouts from a hung primary model count towards its latency window."""
+    import asyncio
+
+    import httpx
+    import openai
+
+    from fastapi_openai_mcp.routing import ModelRouter
+
+    async def fake_create(*args: Any, **kwargs: Any) -> Any:
+        raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+    router = ModelRouter("primary", "primary", fallback_model="backup", p95_threshold=1.0, min_samples=2)
+    monkeypatch.setattr(api_server.openai_client.chat.completions, "create", fake_create)
+    monkeypatch.setattr(api_server, "OPENAI_MAX_RETRIES", 0)
+    monkeypatch.setattr(api_server, "model_router", router)
+
+    async def run() -> None:
+        for _ in range(2):
+            with pytest.raises(openai.APITimeoutError):
+                await api_server.create_completion("tool_selection", router.route("tools"), messages=[])
+
+    asyncio.run(run())
+    assert router.route("tools") == "backup"
+
+
+def test_openai_sdk_is_imported_lazily() -> None:
+    """Importing the API server neither imports the OpenAI SDK nor needs its key."""
+    import subprocess
+    import sys
+
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, fastapi_openai_mcp.api_server; print('openai' in sys.modules)"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_startup_prewarms_connections(monkeypatch: pytest.MonkeyPatch) -> None:
+    """With PREWARM=startup the OpenAI client is built and MCP/OpenAI connections opened."""
+    import httpx
+
+    from fastapi_openai_mcp.balancer import MCPReplicaSet
+    from fastapi_openai_mcp.mcp_client import MCPConnectionPool
+
+    paths: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return httpx.Response(200, json={"tools": []})
+
+    listed: List[bool] = []
+
+    async def fake_list(*args: Any, **kwargs: Any) -> None:
+        listed.append(True)
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(
+        api_server, "mcp_pool",
+        MCPReplicaSet(["http://mcp"], lambda url: MCPConnectionPool(url, transport=transport)),
+    )
+    monkeypatch.setattr(api_server.openai_client.models, "list", fake_list)
+    monkeypatch.setattr(api_server, "PREWARM", "startup")
+
+    with TestClient(api_server.app) as client:
+        stats = client.get("/stats/startup").json()
+
+    assert paths == ["/tools"]
+    assert listed == [True]
+    assert stats["openai_client_ready"] is True
+    assert stats["import_seconds"] > 0
+    assert {"openai_client", "openai_connection", "mcp_connection", "prewarm"} <= set(stats["timings"])
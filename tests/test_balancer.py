@@ -0,0 +1,198 @@
+import asyncio
+from typing import Dict, List, Sequence
+
+import httpx
+import pytest
+
+from fastapi_openai_mcp.balancer import MCPReplicaSet
+from fastapi_openai_mcp.mcp_client import MCPConnectionPool
+
+
+def _replica_set(handler, urls: Sequence[str] = ("http://a", "http://b"), **kwargs) -> MCPReplicaSet:
+    transport = httpx.MockTransport(handler)
+    return MCPReplicaSet(urls, lambda url: MCPConnectionPool(url, transport=transport), **kwargs)
+
+
+def test_least_outstanding_avoids_busy_replica() -> None:
+    """A replica with a request in flight is skipped while another is idle."""
+    release = asyncio.Event()
+    hosts: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "a":
+            await release.wait()
+        return httpx.Response(200, json={"server_time": "now"})
+
+    replicas = _replica_set(handler, choice=lambda candidates: candidates[0])
+
+    async def run() -> None:
+        slow = asyncio.ensure_future(replicas.request("GET", "/server_time"))
+        await asyncio.sleep(0.01)
+        assert replicas.pick().url == "http://b"
+        for _ in range(3):
+            await replicas.request("GET", "/server_time")
+        release.set()
+        await slow
+        await replicas.aclose()
+
+    asyncio.run(run())
+    assert hosts == ["a", "b", "b", "b"]
+
+
+def test_ewma_prefers_faster_replica() -> None:
+    """Once both replicas have latency samples, the faster one gets the traffic."""
+    delays: Dict[str, float] = {"a": 0.03, "b": 0.0}
+    hosts: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        await asyncio.sleep(delays[request.url.host])
+        return httpx.Response(200, json={"server_time": "now"})
+
+    replicas = _replica_set(handler, policy="ewma", choice=lambda candidates: candidates[0])
+
+    async def run() -> None:
+        for _ in range(5):
+            await replicas.request("GET", "/server_time")
+        await replicas.aclose()
+
+    asyncio.run(run())
+    # Unsampled replicas are tried first, then the faster one wins
+    assert hosts == ["a", "b", "b", "b", "b"]
+    stats = replicas.stats()
+    assert stats["requests_total"] == 5
+    assert [r["requests_total"] for r in stats["replicas"]] == [1, 4]
+
+
+def test_ewma_avoids_replica_failing_fast() -> None:
+    """Refused connections count as slow, so a fast-failing replica does not attract traffic."""
+    hosts: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "a":
+            raise httpx.ConnectError("refused", request=request)
+        await asyncio.sleep(0.005)
+        return httpx.Response(200, json={"server_time": "now"})
+
+    replicas = _replica_set(handler, policy="ewma", eject_failures=0, choice=lambda candidates: candidates[0])
+
+    async def run() -> int:
+        failures = 0
+        for _ in range(20):
+            try:
+                await replicas.request("GET", "/server_time")
+            except httpx.ConnectError:
+                failures += 1
+        await replicas.aclose()
+        return failures
+
+    assert asyncio.run(run()) == 1
+    assert hosts.count("a") == 1
+
+
+def test_failing_requests_eject_replica_until_cooldown() -> None:
+    """Consecutive failed requests take a replica out before the next health check."""
+    hosts: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        status = 503 if request.url.host == "a" else 200
+        return httpx.Response(status, json={"server_time": "now"})
+
+    replicas = _replica_set(
+        handler, eject_failures=2, eject_seconds=0.05, choice=lambda candidates: candidates[0]
+    )
+
+    async def run() -> None:
+        for _ in range(6):
+            await replicas.request("GET", "/server_time")
+        stats = replicas.stats()
+        assert stats["healthy_replicas"] == 1
+        assert stats["replicas"][0]["ejected"] is True
+        await asyncio.sleep(0.06)
+        # Back after the cooldown; one more failure ejects it again
+        await replicas.request("GET", "/server_time")
+        await replicas.request("GET", "/server_time")
+        await replicas.aclose()
+
+    asyncio.run(run())
+    assert hosts == ["a", "a", "b", "b", "b", "b", "a", "b"]
+    assert replicas.replicas[0].ejections == 2
+
+
+def test_caller_deadline_does_not_eject_replica() -> None:
+    """A request cut short by the caller's deadline does not count against the replica."""
+    from fastapi_openai_mcp.deadline import deadline_scope
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.03)
+        raise httpx.ReadTimeout("read timed out", request=request)
+
+    replicas = _replica_set(handler, eject_failures=2, choice=lambda candidates: candidates[0])
+
+    async def run() -> None:
+        for _ in range(3):
+            with deadline_scope(0.01), pytest.raises(httpx.ReadTimeout):
+                await replicas.request("GET", "/server_time")
+        await replicas.aclose()
+
+    asyncio.run(run())
+    assert replicas.stats()["healthy_replicas"] == 2
+    assert [replica.request_failures for replica in replicas.replicas] == [0, 0]
+
+
+def test_health_checks_eject_and_restore_replicas() -> None:
+    """Failing health checks take a replica out; passing ones put it back."""
+    down = {"a"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/health" and request.url.host in down:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    replicas = _replica_set(handler, unhealthy_threshold=2, healthy_threshold=1)
+
+    async def run() -> None:
+        await replicas.check_health()
+        assert replicas.replicas[0].healthy
+        await replicas.check_health()
+        assert not replicas.replicas[0].healthy
+        assert {replicas.pick().url for _ in range(10)} == {"http://b"}
+
+        down.add("b")
+        await replicas.check_health()
+        await replicas.check_health()
+        # With every replica out of rotation, requests still go somewhere
+        assert replicas.stats()["healthy_replicas"] == 0
+        assert {replicas.pick().url for _ in range(50)} == {"http://a", "http://b"}
+
+        down.clear()
+        await replicas.check_health()
+        assert replicas.stats()["healthy_replicas"] == 2
+        assert replicas.replicas[0].ejections == 1
+        await replicas.aclose()
+
+    asyncio.run(run())
+
+
+def test_health_checks_run_only_with_several_replicas() -> None:
+    async def run() -> None:
+        single = _replica_set(lambda request: httpx.Response(200), urls=["http://a"], health_interval=0.01)
+        single.start_health_checks()
+        assert single._health_task is None
+
+        several = _replica_set(lambda request: httpx.Response(200), health_interval=0.01)
+        several.start_health_checks()
+        await asyncio.sleep(0.05)
+        assert several.health_checks >= 1
+        await several.aclose()
+        assert several._health_task is None
+
+    asyncio.run(run())
+
+
+def test_unknown_policy_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        MCPReplicaSet(["http://a"], policy="round_robin")
@@ -0,0 +1,149 @@
+import os
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("MCP_API_KEY", "testkey")
+os.environ.setdefault("MCP_SERVER_URL", "http://mcp")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from benchmarks import fake_openai
+from benchmarks.common import histogram_summary, parse_metrics
+from benchmarks.load_test import compare
+from fastapi_openai_mcp import api_server
+
+
+def test_fake_openai_drives_full_tool_flow(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The fake OpenAI server works with the real SDK through both completions."""
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_LATENCY", 0.0)
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_JITTER", 0.0)
+    client = openai.AsyncOpenAI(
+        api_key="sk-fake",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai.app)),
+    )
+
+    async def fake_call_mcp() -> str:
+        return "[MCP Server Time] 2024-01-01T00:00:00Z"
+
+    monkeypatch.setattr(api_server, "openai_client", client)
+    monkeypatch.setattr(api_server, "call_mcp_server", fake_call_mcp)
+
+    with TestClient(api_server.app) as api:
+        resp = api.post("/chat", json={"message": "What time is it?"})
+        plain = api.post("/chat", json={"message": "Tell me a joke"})
+
+    assert resp.status_code == 200
+    assert "[MCP Server Time] 2024-01-01T00:00:00Z" in resp.json()["answer"]
+    assert plain.json()["answer"] == "You said: Tell me a joke"
+
+
+def test_rate_limited_completions_are_paced_and_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The pacer waits out a spent budget; a 429 it did not see coming is retried."""
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_LATENCY", 0.0)
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_JITTER", 0.0)
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_RATE_LIMIT", 1)
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_RATE_WINDOW", 0.2)
+    monkeypatch.setattr(fake_openai, "rate_window", {"started": 0.0, "used": 0})
+    limited_before = fake_openai.stats["rate_limited"]
+    pacer = api_server.openai_pacer
+    client = openai.AsyncOpenAI(
+        api_key="sk-fake",
+        base_url="http://fake-openai/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fake_openai.app),
+            event_hooks={"response": [pacer.on_response]},
+        ),
+    )
+    monkeypatch.setattr(api_server, "openai_client", client)
+
+    with TestClient(api_server.app) as api:
+        assert api.post("/chat", json={"message": "Tell me a joke"}).status_code == 200
+        # The first response said the budget is spent, so this call waits for the window
+        paced = api.post("/chat", json={"message": "Tell me another joke"})
+        assert pacer.stats()["paced"] == 1
+        assert fake_openai.stats["rate_limited"] == limited_before
+
+        # As if another worker spent the budget: the call gets a 429 and is retried
+        pacer.reset()
+        retried = api.post("/chat", json={"message": "One more"})
+        pacing = api.get("/stats/openai_pacing").json()
+        metrics_text = api.get("/metrics").text
+
+    assert paced.json()["answer"] == "You said: Tell me another joke"
+    assert retried.json()["answer"] == "You said: One more"
+    assert fake_openai.stats["rate_limited"] - limited_before == 1
+    assert pacing["rate_limited"] == 1
+    assert pacing["requests"]["limit"] == 1
+    assert 'openai_retries_total{stage="openai_first"} 1' in metrics_text
+
+
+def test_histogram_summary_from_scrapes() -> None:
+    """Per-stage summaries are computed from the difference of two scrapes."""
+    before = parse_metrics(
+        'chat_stage_duration_seconds_bucket{stage="total",le="0.1"} 1\n'
+        'chat_stage_duration_seconds_bucket{stage="total",le="+Inf"} 1\n'
+        'chat_stage_duration_seconds_sum{stage="total"} 0.05\n'
+        'chat_stage_duration_seconds_count{stage="total"} 1\n'
+    )
+    after = parse_metrics(
+        'chat_stage_duration_seconds_bucket{stage="total",le="0.1"} 3\n'
+        'chat_stage_duration_seconds_bucket{stage="total",le="+Inf"} 5\n'
+        'chat_stage_duration_seconds_sum{stage="total"} 0.85\n'
+        'chat_stage_duration_seconds_count{stage="total"} 5\n'
+    )
+    summary = histogram_summary(before, after, "chat_stage_duration_seconds", "stage")
+    assert summary["total"]["count"] == 4
+    assert summary["total"]["mean_ms"] == 200.0
+    assert summary["total"]["p50_ms"] == 100.0
+
+
+def test_compare_flags_regressions() -> None:
+    """Throughput drops and latency increases beyond the tolerance are reported."""
+    baseline = {"results": {"rps": 100, "errors": 0, "latency": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 30}}}
+    same = {"results": {"rps": 95, "errors": 0, "latency": {"p50_ms": 10.5, "p95_ms": 21, "p99_ms": 31}}}
+    worse = {"results": {"rps": 80, "errors": 2, "latency": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 40}}}
+    assert compare(same, baseline, 0.1) == []
+    assert len(compare(worse, baseline, 0.1)) == 3
+
+
+def test_prompt_cache_usage_is_recorded(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Repeated requests reuse a byte-stable prefix, reported as cached tokens."""
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_LATENCY", 0.0)
+    monkeypatch.setattr(fake_openai, "FAKE_OPENAI_JITTER", 0.0)
+    monkeypatch.setattr(fake_openai, "seen_prefixes", set())
+    monkeypatch.setattr(api_server, "prompt_usage", {})
+    client = openai.AsyncOpenAI(
+        api_key="sk-fake",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai.app)),
+    )
+    monkeypatch.setattr(api_server, "openai_client", client)
+
+    with TestClient(api_server.app) as api:
+        api.post("/chat", json={"message": "Tell me a joke"})
+        api.post("/chat", json={"message": "Tell me another joke"})
+        stats = api.get("/stats/prompt_cache").json()
+        metrics_text = api.get("/metrics").text
+
+    first = stats["stages"]["openai_first"]
+    assert first["requests"] == 2
+    assert 0 < first["cached_tokens"] < first["prompt_tokens"]
+    assert 0 < stats["hit_ratio"] < 1
+    assert len(stats["prefix_fingerprint"]) == 16
+    assert 'openai_tokens_total{stage="openai_first",type="cached"}' in metrics_text
+
+
+def test_cold_start_config_parsing() -> None:
+    from benchmarks.cold_start import parse_config, summarize_runs
+
+    assert parse_config("default") == ("default", {})
+    assert parse_config("prewarm:PREWARM=startup,LOG_LEVEL=info") == (
+        "prewarm", {"PREWARM": "startup", "LOG_LEVEL": "info"}
+    )
+    assert summarize_runs([{"first_chat_ms": 3.0}, {"first_chat_ms": 1.0}, {"first_chat_ms": 2.0}]) == {
+        "first_chat_ms": 2.0
+    }
@@ -0,0 +1,207 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from fastapi_openai_mcp.cache import MISSING, SingleFlight, TTLCache, ToolResultCache
+from fastapi_openai_mcp.deadline import DeadlineExceeded, deadline_scope, remaining
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expiry_and_lru_eviction() -> None:
+    """Entries expire after their TTL and the least recently used is evicted."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1, ttl=0.5)
+    cache.set("b", 2, ttl=10)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=10)  # evicts "b", since "a" was just used
+    assert cache.get("b") is MISSING
+    clock.now = 0.6
+    assert cache.get("a") is MISSING
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_single_flight_coalesces_concurrent_calls() -> None:
+    """Concurrent callers for one key share a single upstream call."""
+    flight = SingleFlight()
+    started: List[int] = []
+
+    async def work() -> str:
+        started.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run() -> List[str]:
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["done"] * 10
+    assert len(started) == 1
+    assert flight.coalesced == 9
+    assert flight.in_flight == 0
+
+
+def test_single_flight_waiters_keep_their_own_deadlines() -> None:
+    """A short deadline on the first caller does not cut the shared call short for others."""
+    flight = SingleFlight()
+
+    async def work() -> str:
+        assert remaining() is None
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def call(seconds: float) -> str:
+        with deadline_scope(seconds):
+            return await flight.do("k", work)
+
+    async def run() -> List[object]:
+        return await asyncio.gather(call(0.01), call(5.0), return_exceptions=True)
+
+    short, long = asyncio.run(run())
+    assert isinstance(short, DeadlineExceeded)
+    assert long == "done"
+
+
+def test_single_flight_cancels_abandoned_call() -> None:
+    """The shared call is bounded by max_seconds and cancelled when every waiter left."""
+    flight = SingleFlight(max_seconds=30.0)
+    events: List[str] = []
+
+    async def work() -> str:
+        left = remaining()
+        assert left is not None and left <= 30.0
+        try:
+            await asyncio.sleep(0.2)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        events.append("finished")
+        return "done"
+
+    async def call(seconds: float) -> str:
+        with deadline_scope(seconds):
+            return await flight.do("k", work)
+
+    async def run() -> List[object]:
+        results = await asyncio.gather(call(0.01), call(0.02), return_exceptions=True)
+        await asyncio.sleep(0.01)
+        again = await flight.do("k", work)
+        return [*results, again]
+
+    first, second, again = asyncio.run(run())
+    assert isinstance(first, DeadlineExceeded) and isinstance(second, DeadlineExceeded)
+    assert again == "done"
+    assert events == ["cancelled", "finished"]
+    assert flight.abandoned == 1
+    assert flight.in_flight == 0
+
+
+def test_tool_result_cache_per_tool_ttl() -> None:
+    """Results are cached by name and canonical arguments; errors are not cached."""
+    cache = ToolResultCache(enabled=True)
+    calls: List[str] = []
+
+    async def fetch() -> str:
+        calls.append("x")
+        return f"result {len(calls)}"
+
+    async def fail() -> str:
+        raise RuntimeError("down")
+
+    async def run() -> None:
+        assert await cache.get_or_call("t", {"a": 1, "b": 2}, 60, fetch) == "result 1"
+        assert await cache.get_or_call("t", {"b": 2, "a": 1}, 60, fetch) == "result 1"
+        assert await cache.get_or_call("t", {"a": 2}, 60, fetch) == "result 2"
+        assert await cache.get_or_call("u", {}, 0, fetch) == "result 3"
+        assert await cache.get_or_call("u", {}, 0, fetch) == "result 4"
+        with pytest.raises(RuntimeError):
+            await cache.get_or_call("v", {}, 60, fail)
+        assert await cache.get_or_call("v", {}, 60, fetch) == "result 5"
+
+    asyncio.run(run())
+    assert cache.stats()["hits"] == 1
+
+
+def test_answer_ttl_is_capped_by_tool_results() -> None:
+    """An answer is cached for the smallest capped TTL, and not at all for a cap of 0."""
+    from fastapi_openai_mcp.cache import AnswerCache, MemoryAnswerBackend, cap_answer_ttl
+
+    clock = FakeClock()
+    cache = AnswerCache(MemoryAnswerBackend(), ttl=60, enabled=True)
+    cache.backend._cache.clock = clock
+    computed: List[str] = []
+
+    def compute(*caps: float):
+        async def fn() -> str:
+            computed.append("x")
+            for cap in caps:
+                cap_answer_ttl(cap)
+            return "answer"
+
+        return fn
+
+    async def run() -> None:
+        await cache.get_or_compute("fresh", compute(0.0))
+        await cache.get_or_compute("fresh", compute(0.0))
+        await cache.get_or_compute("capped", compute(5.0, 0.5))
+        await cache.get_or_compute("capped", compute())
+        clock.now = 1.0
+        await cache.get_or_compute("capped", compute())
+
+    asyncio.run(run())
+    assert len(computed) == 4
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_answer_cache_backends(kind: str, tmp_path) -> None:
+    """Answers are cached per normalized key and identical misses share one computation."""
+    from fastapi_openai_mcp.cache import AnswerCache, create_answer_backend
+
+    backend = create_answer_backend(kind, 10, str(tmp_path / "answers.sqlite3"))
+    cache = AnswerCache(backend, ttl=60, enabled=True)
+    computed: List[str] = []
+
+    async def compute() -> str:
+        computed.append("x")
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    key = AnswerCache.key("  What   TIME is it? ", "gpt-4.1", "abc")
+    assert key == AnswerCache.key("what time is it?", "gpt-4.1", "abc")
+    assert key != AnswerCache.key("what time is it?", "gpt-4.1-mini", "abc")
+
+    async def run() -> None:
+        results = await asyncio.gather(*(cache.get_or_compute(key, compute) for _ in range(5)))
+        assert results == ["answer"] * 5
+        assert await cache.get_or_compute(key, compute) == "answer"
+
+    asyncio.run(run())
+    assert computed == ["x"]
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_sqlite_answer_backend_is_bounded(tmp_path) -> None:
+    """The on-disk backend evicts entries beyond its bound and ignores expired rows."""
+    from fastapi_openai_mcp.cache import SQLiteAnswerBackend
+
+    path = str(tmp_path / "answers.sqlite3")
+    backend = SQLiteAnswerBackend(path, max_entries=2)
+
+    async def run() -> None:
+        await backend.set("a", "1", ttl=10)
+        await backend.set("b", "2", ttl=20)
+        await backend.set("c", "3", ttl=30)
+        assert await backend.get("a") is None
+        assert await SQLiteAnswerBackend(path).get("c") == "3"
+        await backend.set("d", "4", ttl=-1)
+        assert await backend.get("d") is None
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from fastapi_openai_mcp.deadline import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    cancel_on_disconnect,
+    deadline_scope,
+    remaining,
+    request_timeout,
+    with_deadline,
+)
+from fastapi_openai_mcp.mcp_client import MCPConnectionPool
+
+
+def test_request_timeout_from_header_or_default() -> None:
+    assert request_timeout({}, "X-Request-Timeout", 60.0, 300.0) == 60.0
+    assert request_timeout({"X-Request-Timeout": "2.5"}, "X-Request-Timeout", 60.0, 300.0) == 2.5
+    assert request_timeout({"X-Request-Timeout": "1000"}, "X-Request-Timeout", 60.0, 300.0) == 300.0
+    assert request_timeout({"X-Request-Timeout": "soon"}, "X-Request-Timeout", 60.0, 300.0) == 60.0
+    assert request_timeout({}, "X-Request-Timeout", 0.0, 0.0) is None
+
+
+def test_deadline_scope_and_remaining() -> None:
+    """Deadlines nest, are inherited by tasks and are restored on exit."""
+    assert remaining() is None
+
+    async def run() -> None:
+        with deadline_scope(5.0):
+            assert 4.0 < remaining() <= 5.0
+            with deadline_scope(None):
+                assert remaining() is None
+            inherited = await asyncio.ensure_future(asyncio.sleep(0, result=remaining()))
+            assert inherited is not None and inherited <= 5.0
+        assert remaining() is None
+
+    asyncio.run(run())
+
+
+def test_with_deadline_raises_when_exceeded() -> None:
+    async def run() -> None:
+        with deadline_scope(0.02):
+            await with_deadline(asyncio.sleep(1))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+
+
+def test_cancel_on_disconnect_cancels_work() -> None:
+    """Work is cancelled as soon as the client disconnects."""
+    cancelled: List[bool] = []
+
+    async def receive() -> Dict[str, Any]:
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def work() -> str:
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "unreachable"
+
+    with pytest.raises(ClientDisconnected):
+        asyncio.run(cancel_on_disconnect(receive, work()))
+    assert cancelled == [True]
+
+
+def test_pool_caps_timeouts_by_deadline() -> None:
+    """MCP requests inside a deadline get at most the remaining time as timeouts."""
+    timeouts: List[Dict[str, float]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(200, json={})
+
+    pool = MCPConnectionPool(transport=httpx.MockTransport(handler), timeout=10.0)
+
+    async def run() -> None:
+        await pool.request("GET", "http://mcp/server_time")
+        with deadline_scope(1.0):
+            await pool.request("GET", "http://mcp/server_time")
+        with deadline_scope(0.001):
+            await asyncio.sleep(0.01)
+            with pytest.raises(DeadlineExceeded):
+                await pool.request("GET", "http://mcp/server_time")
+        await pool.aclose()
+
+    asyncio.run(run())
+    assert timeouts[0]["read"] == 10.0
+    assert timeouts[1]["read"] <= 1.0
+    assert len(timeouts) == 2
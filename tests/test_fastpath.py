@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("MCP_API_KEY", "testkey")
+
+from fastapi_openai_mcp import mcp_server
+from fastapi_openai_mcp.fastpath import TokenChecker
+
+
+def test_token_checker_header_precedence() -> None:
+    checker = TokenChecker(["secret", ""])
+    assert checker.keys == [b"secret"]
+    assert checker.authorized([(b"x-api-key", b"secret")])
+    assert checker.authorized([(b"authorization", b"Bearer secret")])
+    # X-Api-Key wins over Authorization, like require_token
+    assert not checker.authorized([(b"x-api-key", b"wrong"), (b"authorization", b"Bearer secret")])
+    assert checker.authorized([(b"x-api-key", b""), (b"authorization", b"Bearer secret")])
+    assert not checker.authorized([(b"authorization", b"Basic secret")])
+    assert not checker.authorized([(b"authorization", b"Bearer secre")])
+    assert not checker.authorized([])
+
+
+def test_mcp_fast_path_serves_server_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Authorized requests take the fast path; the rest get the regular route's 401."""
+    monkeypatch.setattr(mcp_server.app.router, "routes", list(mcp_server.app.router.routes))
+    endpoint = mcp_server.enable_fast_path()
+    assert endpoint is not None
+    assert mcp_server.enable_fast_path() is endpoint
+
+    key = mcp_server.MCP_API_KEY
+    with TestClient(mcp_server.app) as client:
+        r = client.get("/server_time", headers={"X-Api-Key": key})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        assert r.json()["server_time"].startswith("[MCP Server Time]")
+        assert client.get("/server_time", headers={"Authorization": f"Bearer {key}"}).status_code == 200
+
+        r = client.get("/server_time", headers={"X-Api-Key": "wrong"})
+        assert r.status_code == 401
+        assert r.json() == {"detail": "Unauthorized"}
+        assert client.get("/server_time").status_code == 401
+        assert client.post("/server_time", headers={"X-Api-Key": key}).status_code == 405
+
+    assert (endpoint.served, endpoint.passed_on) == (2, 2)
+    # Requests are still counted under the route template
+    assert 'route="/server_time",status="200"' in mcp_server.metrics.render()
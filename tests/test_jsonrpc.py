@@ -0,0 +1,199 @@
+import asyncio
+import os
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("MCP_API_KEY", "testkey")
+os.environ.setdefault("MCP_SERVER_URL", "http://mcp")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from fastapi_openai_mcp import api_server, mcp_server
+from fastapi_openai_mcp.jsonrpc import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    SESSION_HEADER,
+    JSONRPCError,
+    RPCChannelPool,
+    handle,
+    sign_session,
+    verify_session,
+)
+from fastapi_openai_mcp.mcp_client import is_retryable
+
+KEY = mcp_server.MCP_API_KEY
+
+
+def _registry() -> mcp_server.ToolRegistry:
+    registry = mcp_server.ToolRegistry()
+
+    @registry.register("echo", "Echo the text argument")
+    async def echo(arguments: Dict[str, Any]) -> str:
+        await asyncio.sleep(0.01)
+        return arguments["text"]
+
+    return registry
+
+
+def _message(message_id: Any, method: str, **params: Any) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": message_id, "method": method, "params": params}
+
+
+def test_session_ids_are_signed_and_expire() -> None:
+    session_id = sign_session("key", ttl=60, now=1000)
+    assert verify_session("key", session_id, now=1059)
+    assert not verify_session("key", session_id, now=1061)
+    assert not verify_session("other", session_id, now=1000)
+    tampered = session_id[:-1] + ("1" if session_id.endswith("0") else "0")
+    assert not verify_session("key", tampered, now=1000)
+    assert not verify_session("key", "garbage", now=1000)
+
+
+def test_handle_batches_and_notifications() -> None:
+    async def add(params: Dict[str, Any]) -> int:
+        return params["a"] + params["b"]
+
+    async def fail(params: Dict[str, Any]) -> None:
+        raise JSONRPCError(INVALID_PARAMS, "bad")
+
+    methods = {"add": add, "fail": fail}
+    batch = [
+        _message(1, "add", a=1, b=2),
+        {"jsonrpc": "2.0", "method": "add", "params": {"a": 1, "b": 1}},
+        _message(2, "missing"),
+        _message(3, "fail"),
+        {"id": 4},
+    ]
+    replies = asyncio.run(handle(batch, methods))
+    assert [reply["id"] for reply in replies] == [1, 2, 3, 4]
+    assert replies[0]["result"] == 3
+    assert replies[1]["error"]["code"] == METHOD_NOT_FOUND
+    assert replies[2]["error"] == {"code": INVALID_PARAMS, "message": "bad"}
+    assert replies[3]["error"]["code"] == -32600
+    assert asyncio.run(handle({"jsonrpc": "2.0", "method": "add", "params": {"a": 1, "b": 1}}, methods)) is None
+
+
+def test_mcp_endpoint_authenticates_once_per_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(mcp_server, "registry", _registry())
+    client = TestClient(mcp_server.app)
+
+    assert client.post("/mcp", json=_message(1, "ping")).status_code == 401
+    r = client.post("/mcp", json=_message(1, "initialize"), headers={"X-Api-Key": KEY})
+    assert r.status_code == 200
+    assert r.json()["result"]["capabilities"] == {"tools": {"listChanged": False}}
+    session = {SESSION_HEADER: r.headers[SESSION_HEADER]}
+
+    r = client.post(
+        "/mcp",
+        json=[
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            _message(2, "tools/list"),
+            _message(3, "tools/call", name="echo", arguments={"text": "hi"}),
+            _message(4, "tools/call", name="echo", arguments={}),
+            _message(5, "tools/call", name="nope"),
+        ],
+        headers=session,
+    )
+    assert r.status_code == 200
+    tools, hi, bad_arguments, unknown = r.json()
+    assert tools["result"]["tools"][0]["name"] == "echo"
+    assert "inputSchema" in tools["result"]["tools"][0]
+    assert hi["result"] == {"content": [{"type": "text", "text": "hi"}], "isError": False}
+    assert bad_arguments["result"]["isError"] is True
+    assert unknown["error"]["code"] == INVALID_PARAMS
+
+    notification = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+    assert client.post("/mcp", json=notification, headers=session).status_code == 202
+    assert client.post("/mcp", json=_message(6, "ping"), headers={SESSION_HEADER: "1.2.3"}).status_code == 404
+    r = client.post("/mcp", json={"jsonrpc": "2.0", "method": ["x"], "id": 7}, headers=session)
+    assert r.status_code == 200
+    assert r.json()["error"]["code"] == -32600
+    r = client.post("/mcp", content=b"{", headers=session)
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == -32700
+    assert 'mcp_rpc_messages_total{method="tools/call"}' in mcp_server.metrics.render()
+
+
+def _pool(monkeypatch: pytest.MonkeyPatch, **kwargs: Any) -> tuple:
+    monkeypatch.setattr(mcp_server, "registry", _registry())
+    requests: List[httpx.Request] = []
+
+    async def record(request: httpx.Request) -> None:
+        requests.append(request)
+
+    http = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=mcp_server.app),
+        base_url="http://mcp",
+        event_hooks={"request": [record]},
+    )
+    pool = RPCChannelPool(http.request, lambda: {"X-Api-Key": KEY}, **kwargs)
+    return pool, requests
+
+
+def test_concurrent_calls_share_one_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool, requests = _pool(monkeypatch, size=2)
+
+    async def run() -> List[str]:
+        first = await asyncio.gather(*(pool.call_tool("echo", {"text": str(i)}) for i in range(5)))
+        second = await asyncio.gather(*(pool.call_tool("echo", {"text": str(i)}) for i in range(3)))
+        return list(first) + list(second)
+
+    assert asyncio.run(run()) == ["0", "1", "2", "3", "4", "0", "1", "2"]
+    # initialize, then one round trip per group of concurrent calls
+    assert len(requests) == 3
+    assert all(SESSION_HEADER not in request.headers for request in requests[:1])
+    assert all(request.headers[SESSION_HEADER] for request in requests[1:])
+    assert all("x-api-key" not in request.headers for request in requests[1:])
+    stats = pool.stats()
+    assert stats["batches"] == 2
+    assert stats["avg_batch"] == 4.0
+    assert stats["initializations"] == 1
+
+
+def test_batches_are_capped_and_errors_raised(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool, _ = _pool(monkeypatch, size=1, max_batch=2)
+
+    async def run() -> List[Any]:
+        return await asyncio.gather(
+            *(pool.call_tool("echo", {"text": "x"}) for _ in range(3)),
+            pool.call_tool("echo", {}),
+            return_exceptions=True,
+        )
+
+    *results, error = asyncio.run(run())
+    assert results == ["x", "x", "x"]
+    assert isinstance(error, JSONRPCError) and error.code == INVALID_PARAMS
+    # A rejected request is not retried and does not trip the circuit breaker
+    assert not is_retryable(error)
+    assert pool.stats()["batches"] == 2
+    assert pool.stats()["channels"][0]["max_batch"] == 2
+
+
+def test_expired_session_is_reopened(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool, requests = _pool(monkeypatch, size=1)
+
+    async def run() -> List[str]:
+        first = await pool.call_tool("echo", {"text": "a"})
+        pool.channels[0].session_id = sign_session(KEY, ttl=-1)
+        return [first, await pool.call_tool("echo", {"text": "b"})]
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert [request.headers.get(SESSION_HEADER) is None for request in requests] == [True, False, False, True, False]
+    assert pool.stats()["initializations"] == 2
+
+
+def test_api_server_routes_tool_calls_over_jsonrpc(monkeypatch: pytest.MonkeyPatch) -> None:
+    pool, requests = _pool(monkeypatch)
+    monkeypatch.setattr(api_server, "MCP_TRANSPORT", "jsonrpc")
+    monkeypatch.setattr(api_server, "mcp_rpc", pool)
+
+    async def run() -> List[str]:
+        return list(await asyncio.gather(*(api_server.call_mcp_tool("echo", {"text": t}) for t in "abc")))
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert len(requests) == 2
+    stats = TestClient(api_server.app).get("/stats/mcp_rpc").json()
+    assert stats["transport"] == "jsonrpc"
+    assert stats["calls"] == 3
@@ -0,0 +1,118 @@
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastapi_openai_mcp import logs
+from fastapi_openai_mcp.logs import (
+    DeferredQueueHandler,
+    JSONFormatter,
+    LogContextMiddleware,
+    SamplingFilter,
+    parse_rates,
+)
+
+
+def _record(level: int = logging.INFO, msg: str = "hello %s", args: tuple = ("world",), **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_parse_rates_skips_malformed_items() -> None:
+    assert parse_rates(["/server_time=0.01", "/chat=2", "bad", "=0.5", "/x=soon"]) == {
+        "/server_time": 0.01,
+        "/chat": 1.0,
+    }
+
+
+def test_json_formatter_includes_extras_and_path() -> None:
+    record = _record(tool="get_server_time", path="/chat")
+    payload = json.loads(JSONFormatter().format(record))
+    assert payload["message"] == "hello world"
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "test"
+    assert payload["path"] == "/chat"
+    assert payload["tool"] == "get_server_time"
+    assert "args" not in payload and "msecs" not in payload
+
+
+def test_queued_records_are_formatted_on_the_listener_thread() -> None:
+    """Queued records keep their shape and are formatted off the logging thread."""
+    threads = []
+    lines = []
+
+    class Output(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            threads.append(threading.current_thread())
+            lines.append(self.format(record))
+
+    output = Output()
+    output.setFormatter(JSONFormatter())
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    logger = logging.getLogger("test.deferred")
+    logger.addHandler(handler)
+    logger.propagate = False
+    listener.start()
+    try:
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("failed %s", "call", extra={"tool": "t"})
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    payload = json.loads(lines[0])
+    assert threads[0] is not threading.current_thread()
+    assert payload["message"] == "failed call"
+    assert payload["tool"] == "t"
+    assert "RuntimeError: boom" in payload["exc_info"]
+
+
+def test_sampling_filter_keeps_warnings_and_records_outside_requests() -> None:
+    sampler = SamplingFilter(default_rate=0.0, rand=lambda: 0.5)
+    assert sampler.filter(_record())  # no request in progress
+    token = logs._request_path.set("/server_time")
+    try:
+        assert not sampler.filter(_record())
+        assert sampler.filter(_record(logging.WARNING))
+        assert sampler.filter(_record(logging.ERROR))
+    finally:
+        logs._request_path.reset(token)
+    assert (sampler.kept, sampler.dropped) == (0, 1)
+
+
+def test_sampling_filter_uses_route_rates() -> None:
+    values = iter([0.005, 0.5, 0.5])
+    sampler = SamplingFilter(default_rate=1.0, route_rates={"/server_time": 0.01}, rand=lambda: next(values))
+    token = logs._request_path.set("/server_time")
+    try:
+        assert sampler.filter(_record())
+        assert not sampler.filter(_record())
+    finally:
+        logs._request_path.reset(token)
+    token = logs._request_path.set("/chat")
+    try:
+        assert sampler.filter(_record())
+    finally:
+        logs._request_path.reset(token)
+    assert (sampler.kept, sampler.dropped) == (2, 1)
+
+
+def test_log_context_middleware_sets_request_path() -> None:
+    app = FastAPI()
+    app.add_middleware(LogContextMiddleware)
+
+    @app.get("/where")
+    async def where() -> dict:
+        return {"path": logs._request_path.get()}
+
+    with TestClient(app) as client:
+        assert client.get("/where").json() == {"path": "/where"}
+    assert logs._request_path.get() is None
@@ -0,0 +1,259 @@
+import asyncio
+from typing import List
+
+import httpx
+
+from fastapi_openai_mcp.mcp_client import MCPConnectionPool
+
+
+def test_pool_reuses_single_client() -> None:
+    """All requests go through one shared client until the pool is closed."""
+    seen: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"server_time": "[MCP Server Time] now"})
+
+    pool = MCPConnectionPool(transport=httpx.MockTransport(handler))
+
+    async def run() -> None:
+        first = pool.client
+        await pool.request("GET", "http://mcp/server_time")
+        await pool.request("GET", "http://mcp/server_time")
+        assert pool.client is first
+        stats = pool.stats()
+        assert stats["open"] is True
+        assert stats["requests_total"] == 2
+        assert stats["in_flight"] == 0
+        await pool.aclose()
+        assert pool.stats()["open"] is False
+
+    asyncio.run(run())
+    assert seen == ["/server_time", "/server_time"]
+
+
+def test_pool_counts_errors() -> None:
+    """Transport failures are counted and re-raised."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+
+    pool = MCPConnectionPool(transport=httpx.MockTransport(handler))
+
+    async def run() -> None:
+        try:
+            await pool.request("GET", "http://mcp/server_time")
+        except httpx.ConnectError:
+            pass
+        else:
+            raise AssertionError("expected ConnectError")
+        await pool.aclose()
+
+    asyncio.run(run())
+    assert pool.errors_total == 1
+
+
+def test_pool_from_env(monkeypatch) -> None:
+    """Pool limits and timeouts are read from the environment."""
+    monkeypatch.setenv("MCP_POOL_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("MCP_POOL_MAX_KEEPALIVE", "3")
+    monkeypatch.setenv("MCP_TIMEOUT", "2.5")
+    pool = MCPConnectionPool.from_env()
+    assert pool.max_connections == 7
+    assert pool.max_keepalive_connections == 3
+    assert pool.timeout == 2.5
+
+
+def _http_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://mcp/server_time")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_circuit_breaker_transitions() -> None:
+    """The breaker opens after repeated failures and closes after a good probe."""
+    from fastapi_openai_mcp.mcp_client import CircuitBreaker
+
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=5, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    now[0] = 6.0
+    assert breaker.allow()  # half-open probe
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["transitions"] == {
+        "closed->open": 1,
+        "open->half_open": 1,
+        "half_open->closed": 1,
+    }
+    assert breaker.short_circuited == 2
+
+
+def test_resilient_caller_retries_idempotent_calls() -> None:
+    """Retryable errors are retried for idempotent calls only."""
+    import pytest
+
+    from fastapi_openai_mcp.mcp_client import ResilientCaller
+
+    caller = ResilientCaller(retries=2, backoff_base=0.001)
+    attempts: List[int] = []
+
+    async def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _http_error(503)
+        return "ok"
+
+    assert asyncio.run(caller.call(flaky, idempotent=True)) == "ok"
+    assert len(attempts) == 3
+    assert caller.retried == 2
+
+    attempts.clear()
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(caller.call(flaky, idempotent=False))
+    assert len(attempts) == 1
+
+    async def bad_request() -> str:
+        attempts.append(1)
+        raise _http_error(400)
+
+    attempts.clear()
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(caller.call(bad_request, idempotent=True))
+    assert len(attempts) == 1
+    assert caller.breaker.state == "closed"
+
+
+def test_resilient_caller_fails_fast_when_open() -> None:
+    """An open circuit rejects calls without invoking them."""
+    import pytest
+
+    from fastapi_openai_mcp.mcp_client import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+    caller = ResilientCaller(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60), retries=0)
+    invoked: List[int] = []
+
+    async def down() -> str:
+        invoked.append(1)
+        raise httpx.ConnectError("refused")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(caller.call(down, idempotent=True))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller.call(down, idempotent=True))
+    assert invoked == [1]
+
+
+def test_resilient_caller_hedges_slow_calls() -> None:
+    """A call slower than the latency percentile gets a backup request."""
+    from fastapi_openai_mcp.mcp_client import ResilientCaller
+
+    caller = ResilientCaller(hedge=True, hedge_min_samples=3, hedge_percentile=95)
+    for _ in range(3):
+        caller.latencies.add(0.01)
+    started: List[int] = []
+
+    async def sometimes_slow() -> str:
+        started.append(1)
+        if len(started) == 1:
+            await asyncio.sleep(1.0)
+            return "slow"
+        return "fast"
+
+    assert asyncio.run(caller.call(sometimes_slow, idempotent=True)) == "fast"
+    assert caller.hedged == 1
+    assert caller.hedge_wins == 1
+
+
+def test_cancelled_probe_lets_the_next_call_probe() -> None:
+    """A half-open probe that is cancelled does not leave the circuit stuck."""
+    from fastapi_openai_mcp.mcp_client import CircuitBreaker, ResilientCaller
+
+    now = [0.0]
+    caller = ResilientCaller(
+        breaker=CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=lambda: now[0]), retries=0
+    )
+    caller.breaker.record_failure()
+    now[0] = 6.0
+
+    async def hang() -> str:
+        await asyncio.sleep(10)
+        return "late"
+
+    async def ok() -> str:
+        return "ok"
+
+    async def run() -> str:
+        probe = asyncio.ensure_future(caller.call(hang))
+        await asyncio.sleep(0)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        return await caller.call(ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert caller.breaker.state == "closed"
+
+
+def test_caller_deadline_does_not_trip_the_breaker() -> None:
+    """Timeouts caused by the caller's own deadline are not MCP failures."""
+    from fastapi_openai_mcp.deadline import DeadlineExceeded, deadline_scope
+    from fastapi_openai_mcp.mcp_client import CircuitBreaker, ResilientCaller
+
+    caller = ResilientCaller(breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60), retries=0)
+
+    async def slow() -> str:
+        await asyncio.sleep(0.03)
+        raise httpx.ReadTimeout("read timed out")
+
+    async def expired() -> str:
+        raise DeadlineExceeded("request deadline exceeded")
+
+    async def ok() -> str:
+        return "ok"
+
+    async def run() -> str:
+        for fn in (slow, slow, expired, expired):
+            with deadline_scope(0.01):
+                try:
+                    await caller.call(fn)
+                except (httpx.ReadTimeout, DeadlineExceeded):
+                    pass
+        return await caller.call(ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert caller.breaker.state == "closed"
+    assert caller.breaker.consecutive_failures == 0
+
+
+def test_cancelled_hedged_call_cancels_its_attempts() -> None:
+    """Cancelling a caller during the hedge delay does not orphan the primary attempt."""
+    from fastapi_openai_mcp.mcp_client import ResilientCaller
+
+    caller = ResilientCaller(hedge=True, hedge_min_samples=3, hedge_percentile=95)
+    for _ in range(3):
+        caller.latencies.add(0.5)
+    cancelled: List[int] = []
+
+    async def slow() -> str:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "slow"
+
+    async def run() -> None:
+        call = asyncio.ensure_future(caller.call(slow, idempotent=True))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+
+    asyncio.run(run())
+    assert caller.hedged == 0
@@ -0,0 +1,72 @@
+import os
+
+from fastapi_openai_mcp.metrics import MetricsRegistry, SharedMetrics, merge_expositions
+
+
+def test_registry_renders_prometheus_text() -> None:
+    """Counters, gauges and histograms render in the text exposition format."""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    in_flight = registry.gauge("in_flight", "In flight")
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+
+    requests.inc("/chat")
+    requests.inc("/chat", amount=2)
+    in_flight.inc()
+    in_flight.dec()
+    latency.observe("/chat", value=0.05)
+    latency.observe("/chat", value=0.5)
+    latency.observe("/chat", value=5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/chat"} 3' in lines
+    assert "in_flight 0" in lines
+    assert 'latency_seconds_bucket{route="/chat",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/chat",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/chat",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/chat"} 3' in lines
+    assert 'latency_seconds_sum{route="/chat"} 5.55' in lines
+
+
+def test_registry_reuses_metrics_by_name() -> None:
+    """Registering the same name twice returns the existing metric."""
+    registry = MetricsRegistry()
+    assert registry.counter("x_total", "X") is registry.counter("x_total", "X")
+
+
+def _worker_registry(requests: int, in_flight: int) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests", ("route",)).inc("/chat", amount=requests)
+    registry.gauge("in_flight", "In flight").set(value=in_flight)
+    registry.histogram("latency_seconds", "Latency", buckets=(1.0,)).observe(value=0.5)
+    return registry
+
+
+def test_merge_expositions_sums_workers() -> None:
+    """Counters and histograms add up over all workers; gauges over live ones."""
+    first = _worker_registry(3, 1).render()
+    second = _worker_registry(4, 2).render()
+    lines = merge_expositions([(first, True), (second, False)]).splitlines()
+    assert lines.count("# TYPE requests_total counter") == 1
+    assert 'requests_total{route="/chat"} 7' in lines
+    assert "in_flight 1" in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert "latency_seconds_count 2" in lines
+
+
+def test_shared_metrics_merges_snapshots(tmp_path) -> None:
+    """A scrape includes the snapshots other workers left in the shared directory."""
+    directory = str(tmp_path)
+    # A worker that has exited: its counters stay, its gauges are dropped
+    (tmp_path / "api-metrics-999999999.prom").write_text(_worker_registry(5, 4).render())
+    (tmp_path / "mcp-metrics-1.prom").write_text(_worker_registry(100, 100).render())
+
+    shared = SharedMetrics(_worker_registry(2, 1), directory, "api")
+    lines = shared.render().splitlines()
+    assert os.path.exists(shared.path)
+    assert 'requests_total{route="/chat"} 7' in lines
+    assert "in_flight 1" in lines
+
+    SharedMetrics.clear(directory, "api")
+    assert sorted(os.listdir(directory)) == ["mcp-metrics-1.prom"]
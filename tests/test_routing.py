@@ -0,0 +1,83 @@
+from fastapi_openai_mcp.routing import ModelRouter, parse_routing_rules
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_parse_routing_rules_skips_malformed() -> None:
+    rules = parse_routing_rules(
+        [
+            "answer:tool=get_server_time:gpt-4.1-mini",
+            "tools:min_chars=500:gpt-4.1",
+            "tools:*:ft:gpt-4.1-mini:org::abc",
+            "unknown:*:m",
+            "tools:min_chars=lots:m",
+            "answer:tool=:m",
+            "nonsense",
+        ]
+    )
+    assert [(r.stage, r.condition, r.value, r.model) for r in rules] == [
+        ("answer", "tool", "get_server_time", "gpt-4.1-mini"),
+        ("tools", "min_chars", "500", "gpt-4.1"),
+        ("tools", "*", "", "ft:gpt-4.1-mini:org::abc"),
+    ]
+
+
+def test_router_applies_first_matching_rule() -> None:
+    """Rules match on message length or called tools; otherwise stage defaults apply."""
+    router = ModelRouter(
+        "fast",
+        "big",
+        rules=parse_routing_rules(["tools:min_chars=20:big", "answer:tool=get_server_time:fast"]),
+    )
+    assert router.route("tools", "short") == "fast"
+    assert router.route("tools", "a much longer message than that") == "big"
+    assert router.route("answer", "hi", ["get_server_time"]) == "fast"
+    assert router.route("answer", "hi", ["echo"]) == "big"
+    assert router.routed == {"fast": 2, "big": 2}
+
+
+def test_router_falls_back_when_p95_is_high() -> None:
+    """A slow model is replaced by the fallback for the cooldown, then retried."""
+    clock = FakeClock()
+    router = ModelRouter(
+        "primary", "primary", fallback_model="backup",
+        p95_threshold=1.0, min_samples=5, cooldown=10.0, clock=clock,
+    )
+    for _ in range(4):
+        router.observe("primary", 2.0)
+    assert router.route("tools") == "primary"  # not enough samples yet
+
+    router.observe("primary", 2.0)
+    assert router.degraded() == ["primary"]
+    assert router.route("tools") == "backup"
+    assert router.route("answer") == "backup"
+
+    clock.now = 10.5
+    assert router.route("tools") == "primary"
+    assert router.stats()["switches"] == 1
+    assert router.fallbacks == 2
+
+
+def test_router_counts_fast_failures_as_slow() -> None:
+    """Failed completions are recorded as at least the error penalty."""
+    router = ModelRouter("m", "m", fallback_model="backup", p95_threshold=1.0, min_samples=3)
+    assert router.error_penalty == 2.0
+    for _ in range(3):
+        router.observe("m", 0.01, failed=True)
+    assert router.route("tools") == "backup"
+
+
+def test_router_ignores_fast_models_and_disabled_threshold() -> None:
+    router = ModelRouter("m", "m", fallback_model="backup", p95_threshold=1.0, min_samples=1)
+    router.observe("m", 0.2)
+    assert router.route("tools") == "m"
+
+    disabled = ModelRouter("m", "m", fallback_model="backup", min_samples=1)
+    disabled.observe("m", 100.0)
+    assert disabled.route("tools") == "m"
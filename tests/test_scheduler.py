@@ -0,0 +1,130 @@
+import asyncio
+from typing import List
+
+from fastapi_openai_mcp.scheduler import (
+    FairScheduler,
+    client_from_headers,
+    client_scope,
+    current_client,
+    parse_weights,
+)
+
+
+async def _dispatch_order(scheduler: FairScheduler, calls: List[tuple]) -> List[str]:
+    """Queue ``calls`` behind a held slot and return the order they get slots in."""
+    order: List[str] = []
+    await scheduler.acquire("holder")
+
+    async def call(tenant: str, priority: str) -> None:
+        counted = await scheduler.acquire(tenant, priority)
+        order.append(tenant)
+        scheduler.release(counted)
+
+    tasks = [asyncio.ensure_future(call(*args)) for args in calls]
+    await asyncio.sleep(0)
+    scheduler.release("holder")
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_weighted_tenants_share_slots_in_proportion() -> None:
+    """A tenant with weight 2 gets two slots for each one of a weight-1 tenant."""
+    scheduler = FairScheduler(max_concurrency=1, weights={"big": 2})
+    calls = [("big", "interactive")] * 6 + [("small", "interactive")] * 3
+
+    order = asyncio.run(_dispatch_order(scheduler, calls))
+    assert order[:6].count("big") == 4
+    assert order[:6].count("small") == 2
+    stats = scheduler.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["tenants"]["big"]["dispatched"] == 6
+    assert stats["tenants"]["big"]["weight"] == 2
+    assert stats["tenants"]["small"]["queued"] == 3
+    assert stats["tenants"]["small"]["wait_seconds_max"] >= 0
+
+
+def test_backlogged_tenant_does_not_delay_newcomer() -> None:
+    """A tenant arriving behind another's long queue is served next, not last."""
+    scheduler = FairScheduler(max_concurrency=1)
+    calls = [("flood", "interactive")] * 5 + [("late", "interactive")]
+
+    order = asyncio.run(_dispatch_order(scheduler, calls))
+    assert order.index("late") <= 1
+
+
+def test_interactive_calls_go_before_batch() -> None:
+    scheduler = FairScheduler(max_concurrency=1)
+    calls = [("offline", "batch")] * 3 + [("user", "interactive")] * 2
+
+    order = asyncio.run(_dispatch_order(scheduler, calls))
+    assert order == ["user", "user", "offline", "offline", "offline"]
+
+
+def test_cancelled_waiter_releases_its_place() -> None:
+    scheduler = FairScheduler(max_concurrency=1)
+
+    async def run() -> None:
+        await scheduler.acquire("a")
+        waiter = asyncio.ensure_future(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 1
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 0
+        scheduler.release("a")
+        assert scheduler.in_flight == 0
+        # The slot is free again for the next caller
+        await asyncio.wait_for(scheduler.acquire("c"), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_disabled_scheduler_never_waits() -> None:
+    scheduler = FairScheduler(max_concurrency=0)
+
+    async def run() -> None:
+        for _ in range(10):
+            await scheduler.acquire("a")
+        assert scheduler.in_flight == 10
+
+    asyncio.run(run())
+
+
+def test_tenants_beyond_limit_share_other_bucket() -> None:
+    scheduler = FairScheduler(max_concurrency=0, weights={"vip": 3}, max_tenants=2)
+
+    async def run() -> List[str]:
+        return [await scheduler.acquire(tenant) for tenant in ("a", "b", "c", "vip", "a")]
+
+    assert asyncio.run(run()) == ["a", "b", "other", "vip", "a"]
+
+
+def test_slot_uses_client_scope() -> None:
+    scheduler = FairScheduler(max_concurrency=2)
+
+    async def run() -> None:
+        with client_scope("acme", "batch"):
+            assert current_client() == ("acme", "batch")
+            async with scheduler.slot() as waited:
+                assert waited >= 0
+                assert scheduler.stats()["tenants"]["acme"]["in_flight"] == 1
+        assert current_client() == ("anonymous", "interactive")
+
+    asyncio.run(run())
+    assert scheduler.stats()["tenants"]["acme"]["in_flight"] == 0
+
+
+def test_client_from_headers() -> None:
+    assert client_from_headers({"X-Client-Id": "acme"}, "X-Client-Id", "interactive") == ("acme", "interactive")
+    assert client_from_headers({}, "X-Client-Id", "batch") == ("anonymous", "batch")
+    tenant, priority = client_from_headers(
+        {"authorization": "Bearer secret", "x-priority": "BATCH"}, "X-Client-Id", "interactive"
+    )
+    assert tenant.startswith("key:") and "secret" not in tenant
+    assert priority == "batch"
+    assert client_from_headers({"x-priority": "urgent"}, "X-Client-Id", "batch")[1] == "batch"
+
+
+def test_parse_weights() -> None:
+    assert parse_weights(["acme=4", "free=0.5", "bad=x", "zero=0", "noequals"]) == {"acme": 4.0, "free": 0.5}
@@ -0,0 +1,31 @@
+import pytest
+
+from fastapi_openai_mcp.serve import shared_state_env, worker_count
+
+
+def test_worker_count() -> None:
+    assert worker_count(None) == 1
+    assert worker_count("") == 1
+    assert worker_count("4") == 4
+    assert worker_count("0") == 1
+    assert worker_count("auto") >= 1
+    with pytest.raises(ValueError):
+        worker_count("many")
+
+
+def test_shared_state_env_for_several_workers() -> None:
+    """Caches and sessions move to the shared directory and admission limits are split."""
+    env = shared_state_env(4, "/dev/shm/x", {"ADMISSION_MAX_IN_FLIGHT": "10", "SESSION_BACKEND": "memory"})
+    assert env["SHARED_STATE_DIR"] == "/dev/shm/x"
+    assert env["ANSWER_CACHE_BACKEND"] == "sqlite"
+    assert env["ANSWER_CACHE_PATH"] == "/dev/shm/x/answer_cache.sqlite3"
+    # Explicit settings win
+    assert "SESSION_BACKEND" not in env
+    assert env["ADMISSION_MAX_IN_FLIGHT"] == "3"
+    assert env["ADMISSION_MAX_QUEUE"] == "32"
+    assert env["OPENAI_MAX_CONCURRENCY"] == "0"
+
+
+def test_shared_state_env_single_worker_and_unlimited() -> None:
+    assert shared_state_env(1, "/tmp/x", {}) == {}
+    assert shared_state_env(2, "/tmp/x", {"ADMISSION_MAX_IN_FLIGHT": "0"})["ADMISSION_MAX_IN_FLIGHT"] == "0"
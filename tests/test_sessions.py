@@ -0,0 +1,98 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from fastapi_openai_mcp.sessions import SessionStore, compact_message, create_session_backend
+
+
+def _tool_turn(question: str, result: str, answer: str) -> List[Dict[str, Any]]:
+    return [
+        {"role": "user", "content": question},
+        {
+            "role": "assistant",
+            "content": None,
+            "refusal": None,
+            "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": "get_server_time", "arguments": "{}"}}
+            ],
+        },
+        {"role": "tool", "tool_call_id": "call_1", "name": "get_server_time", "content": result},
+    ]
+
+
+def test_compact_message_truncates_tool_results() -> None:
+    """Stored tool results are cut to the configured size and extra fields dropped."""
+    turn = _tool_turn("time?", "x" * 50, "ok")
+    assert "refusal" not in compact_message(turn[1], 10)
+    assert compact_message(turn[2], 10)["content"] == "x" * 10 + " [truncated]"
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_session_history_round_trip(kind: str, tmp_path) -> None:
+    """Turns are stored per session and older tool exchanges are left out of the history."""
+    store = SessionStore(create_session_backend(kind, 10, str(tmp_path / "sessions.db")), keep_tool_turns=1)
+
+    async def run() -> List[Dict[str, Any]]:
+        await store.append("s1", _tool_turn("first?", "t1", "a1"), "answer one")
+        await store.append("s1", _tool_turn("second?", "t2", "a2"), "answer two")
+        assert await store.history("other") == []
+        return await store.history("s1")
+
+    history = asyncio.run(run())
+    assert [m["role"] for m in history] == ["user", "assistant", "user", "assistant", "tool", "assistant"]
+    assert history[0]["content"] == "first?"
+    assert history[1]["content"] == "answer one"
+    assert history[-1]["content"] == "answer two"
+    assert store.tool_exchanges_dropped == 1
+
+
+def test_session_history_fits_token_budget() -> None:
+    """The oldest turns are dropped so the history stays within the token budget."""
+    store = SessionStore(create_session_backend("memory", 10), max_tokens=60, max_turns=50)
+    long_answer = "word " * 40  # about 54 tokens with the question
+
+    async def run() -> List[Dict[str, Any]]:
+        for index in range(10):
+            await store.append("s", [{"role": "user", "content": f"q{index}"}], long_answer)
+        return await store.history("s")
+
+    history = asyncio.run(run())
+    assert [m["content"] for m in history] == ["q9", long_answer]
+    assert store.last_history_tokens <= 60
+    assert store.turns_trimmed == 9
+
+
+def test_session_store_keeps_max_turns() -> None:
+    """Only the latest ``max_turns`` turns are stored."""
+    store = SessionStore(create_session_backend("memory", 10), max_turns=2)
+
+    async def run() -> List[Any]:
+        for index in range(5):
+            await store.append("s", [{"role": "user", "content": f"q{index}"}], f"a{index}")
+        return await store.turns("s")
+
+    turns = asyncio.run(run())
+    assert [turn[0]["content"] for turn in turns] == ["q3", "q4"]
+
+
+def test_session_store_issues_unguessable_ids() -> None:
+    """Only IDs created by the store exist; each starts with an empty history."""
+    store = SessionStore(create_session_backend("memory", 10))
+
+    async def run() -> List[Any]:
+        first, second = await store.create(), await store.create()
+        return [first != second, await store.exists(first), await store.exists("default"), await store.turns(first)]
+
+    assert asyncio.run(run()) == [True, True, False, []]
+    assert store.stats()["sessions_created"] == 2
+
+
+def test_session_store_rejects_max_turns_below_one() -> None:
+    with pytest.raises(ValueError):
+        SessionStore(create_session_backend("memory", 10), max_turns=0)
+
+
+def test_unknown_session_backend() -> None:
+    with pytest.raises(ValueError):
+        create_session_backend("redis", 10)
@@ -24,11 +24,12 @@ async def test_tool_flow():
     assert mcp_api_key is not None, "MCP_API_KEY must be set in .env file"
     assert mcp_server_url is not None, "MCP_SERVER_URL must be set in .env file"
     
-    # Create a chat request
-    req = api_server.ChatRequest(message="What is the current server time?")
-    
-    # Call the chat endpoint directly - this will fail if OpenAI API key is invalid
-    result = await api_server.chat(req)
+    # Call the chat endpoint in-process - this will fail if OpenAI API key is invalid
+    transport = httpx.ASGITransport(app=api_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as api_client:
+        resp = await api_client.post("/chat", json={"message": "What is the current server time?"})
+    assert resp.status_code == 200, f"/chat returned {resp.status_code}: {resp.text}"
+    result = resp.json()
     
     # Assertions
     assert "answer" in result, "Result should contain 'answer' field"
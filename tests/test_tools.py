@@ -0,0 +1,141 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi_openai_mcp.tools import ToolCatalog, canonical_tools
+
+STATIC_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_server_time",
+            "description": "static",
+            "parameters": {"type": "object", "properties": {}, "required": []},
+        },
+    }
+]
+
+MANIFEST = {
+    "tools": [
+        {"name": "get_server_time", "description": "Get the time", "endpoint": "/tools/get_server_time"},
+        {
+            "name": "echo",
+            "description": "Echo text",
+            "parameters": {"type": "object", "properties": {"text": {"type": "string"}}},
+            "endpoint": "/tools/echo",
+            "cache_ttl": 5,
+        },
+    ]
+}
+
+
+async def _static_time(arguments: Dict[str, Any]) -> str:
+    return "[MCP Server Time] static"
+
+
+def _remote(name: str) -> Any:
+    async def handler(arguments: Dict[str, Any]) -> str:
+        return f"{name}:{arguments.get('text')}"
+
+    return handler
+
+
+def test_catalog_static_when_discovery_disabled() -> None:
+    """Without discovery the built-in tools are served and nothing is fetched."""
+
+    async def fetch(etag: Optional[str]) -> Tuple[int, Optional[str], Optional[Dict[str, Any]]]:
+        raise AssertionError("should not fetch")
+
+    catalog = ToolCatalog(STATIC_TOOLS, {"get_server_time": _static_time}, fetch, _remote)
+    tools = asyncio.run(catalog.get_tools())
+    assert tools is STATIC_TOOLS
+    assert catalog.handler("get_server_time") is _static_time
+    assert catalog.handler("echo") is None
+
+
+def test_catalog_discovery_ttl_and_etag() -> None:
+    """The manifest is cached for the TTL and revalidated with its ETag."""
+    seen: List[Optional[str]] = []
+
+    async def fetch(etag: Optional[str]) -> Tuple[int, Optional[str], Optional[Dict[str, Any]]]:
+        seen.append(etag)
+        if etag == '"v1"':
+            return 304, etag, None
+        return 200, '"v1"', MANIFEST
+
+    catalog = ToolCatalog(
+        STATIC_TOOLS, {"get_server_time": _static_time}, fetch, _remote, ttl=60, enabled=True
+    )
+
+    async def run() -> None:
+        tools = await catalog.get_tools()
+        assert [t["function"]["name"] for t in tools] == ["echo", "get_server_time"]
+        await catalog.get_tools()
+        assert seen == [None]
+        catalog._expires_at = 0.0
+        await catalog.get_tools()
+        assert seen == [None, '"v1"']
+        assert catalog.handler("get_server_time") is _static_time
+        assert await catalog.handler("echo")({"text": "hi"}) == "echo:hi"
+        assert catalog.metadata("echo")["cache_ttl"] == 5
+
+    asyncio.run(run())
+    assert catalog.refreshes == 1
+    assert catalog.revalidations == 1
+
+
+def test_catalog_keeps_tools_when_fetch_fails() -> None:
+    """Manifest errors fall back to the last known tools."""
+
+    async def fetch(etag: Optional[str]) -> Tuple[int, Optional[str], Optional[Dict[str, Any]]]:
+        raise RuntimeError("mcp down")
+
+    catalog = ToolCatalog(
+        STATIC_TOOLS, {"get_server_time": _static_time}, fetch, _remote, enabled=True
+    )
+    assert asyncio.run(catalog.get_tools()) is STATIC_TOOLS
+    assert catalog.fetch_errors == 1
+
+
+def test_catalog_keeps_tools_when_manifest_is_malformed() -> None:
+    """A malformed manifest keeps the last good tools, or the built-in ones."""
+    manifests: List[Any] = [
+        {"tools": [{"description": "no name"}]},
+        MANIFEST,
+        {"tools": "echo"},
+        ["not", "a", "manifest"],
+    ]
+
+    async def fetch(etag: Optional[str]) -> Tuple[int, Optional[str], Optional[Dict[str, Any]]]:
+        return 200, f'"v{len(manifests)}"', manifests.pop(0)
+
+    catalog = ToolCatalog(
+        STATIC_TOOLS, {"get_server_time": _static_time}, fetch, _remote, enabled=True
+    )
+
+    async def run() -> List[List[Dict[str, Any]]]:
+        seen = []
+        for _ in range(4):
+            catalog._expires_at = 0.0
+            seen.append(await catalog.get_tools())
+        return seen
+
+    static, good, *malformed = asyncio.run(run())
+    assert static is STATIC_TOOLS
+    assert [tool["function"]["name"] for tool in good] == ["echo", "get_server_time"]
+    assert all(tools is good for tools in malformed)
+    assert catalog.handler("echo") is not None
+    assert catalog.stats()["etag"] == '"v3"'
+    assert catalog.fetch_errors == 3
+    assert catalog.refreshes == 1
+
+
+def test_canonical_tools_are_byte_stable() -> None:
+    """Tool order and key order do not change the serialized manifest."""
+    a = {"type": "function", "function": {"name": "a", "parameters": {"type": "object", "properties": {}}}}
+    b = {"function": {"parameters": {"properties": {}, "type": "object"}, "name": "b"}, "type": "function"}
+    b_reordered = {"type": "function", "function": {"name": "b", "parameters": {"type": "object", "properties": {}}}}
+    first = json.dumps(canonical_tools([b, a]))
+    second = json.dumps(canonical_tools([a, b_reordered]))
+    assert first == second
+    assert [tool["function"]["name"] for tool in json.loads(first)] == ["a", "b"]
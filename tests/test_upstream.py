@@ -0,0 +1,135 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from fastapi_openai_mcp.upstream import RateLimitPacer, build_openai_client, parse_duration, retry_after
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _pacer(**kwargs) -> tuple:
+    clock = FakeClock()
+    return RateLimitPacer(clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+def _headers(remaining_requests: int, remaining_tokens: int = 10000, reset: str = "2s") -> Dict[str, str]:
+    return {
+        "x-ratelimit-limit-requests": "100",
+        "x-ratelimit-remaining-requests": str(remaining_requests),
+        "x-ratelimit-reset-requests": reset,
+        "x-ratelimit-limit-tokens": "10000",
+        "x-ratelimit-remaining-tokens": str(remaining_tokens),
+        "x-ratelimit-reset-tokens": reset,
+    }
+
+
+def test_parse_duration() -> None:
+    assert parse_duration("1s") == 1.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1h2m3.5s") == 3723.5
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+
+def test_retry_after_prefers_milliseconds() -> None:
+    assert retry_after({"retry-after-ms": "250", "retry-after": "1"}) == 0.25
+    assert retry_after({"retry-after": "3"}) == 3.0
+    assert retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert retry_after({}) is None
+
+
+def test_pacer_waits_for_reset_when_budget_is_nearly_spent() -> None:
+    """Calls go out freely until the budget reaches the headroom, then wait for the reset."""
+    pacer, clock = _pacer(headroom=0.05)
+
+    async def run() -> None:
+        pacer.observe(200, _headers(remaining_requests=8))
+        # Three calls fit above the 5-request reserve, the fourth waits
+        for _ in range(3):
+            assert await pacer.wait(10) == 0.0
+        assert await pacer.wait(10) == pytest.approx(2.0)
+
+    asyncio.run(run())
+    assert clock.sleeps == [pytest.approx(2.0)]
+    stats = pacer.stats()
+    assert stats["paced"] == 1
+    # After the reset the full limit is assumed, minus the call just sent
+    assert stats["requests"]["remaining"] == 99
+
+
+def test_pacer_counts_tokens_against_the_budget() -> None:
+    pacer, _ = _pacer(headroom=0.0)
+    pacer.observe(200, _headers(remaining_requests=50, remaining_tokens=1000, reset="500ms"))
+    assert pacer.delay(900) == 0.0
+    assert pacer.delay(1500) == pytest.approx(0.5)
+
+
+def test_rate_limit_blocks_all_new_calls() -> None:
+    """A 429 pauses every caller for retry-after, or an exponential backoff without it."""
+    pacer, clock = _pacer(backoff_base=1.0, backoff_max=3.0)
+
+    pacer.observe(429, {"retry-after-ms": "1500"})
+    assert pacer.delay(1) == pytest.approx(1.5)
+    assert pacer.delay(1) == pytest.approx(1.5)
+
+    async def run() -> List[float]:
+        return list(await asyncio.gather(*(pacer.wait(1) for _ in range(3))))
+
+    waits = asyncio.run(run())
+    assert waits[0] == pytest.approx(1.5)
+    assert pacer.delay(1) == 0.0
+
+    pacer.observe(429, {})
+    assert pacer.delay(1) == pytest.approx(2.0)
+    clock.now += 2.0
+    pacer.observe(429, {})
+    assert pacer.delay(1) == pytest.approx(3.0)  # capped at backoff_max
+    clock.now += 3.0
+    pacer.observe(200, {})
+    pacer.observe(429, {})
+    assert pacer.delay(1) == pytest.approx(1.0)
+    assert pacer.stats()["rate_limited"] == 4
+
+
+def test_wait_is_bounded_by_budget() -> None:
+    pacer, clock = _pacer()
+    pacer.observe(429, {"retry-after": "10"})
+
+    assert asyncio.run(pacer.wait(1, budget=0.5)) == pytest.approx(0.5)
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_disabled_pacer_ignores_headers() -> None:
+    pacer, _ = _pacer(enabled=False)
+    pacer.observe(429, {"retry-after": "10"})
+    assert pacer.delay(1) == 0.0
+    assert pacer.stats()["rate_limited"] == 0
+
+
+def test_build_openai_client_configures_transport(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_POOL_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("OPENAI_CONNECT_TIMEOUT", "2.5")
+    monkeypatch.setenv("OPENAI_MAX_RETRIES", "4")
+    pacer = RateLimitPacer()
+
+    client = build_openai_client(pacer)
+    assert client.max_retries == 0
+    assert client._client.event_hooks["response"] == [pacer.on_response]
+    assert client.timeout.connect == 2.5
+
+    assert build_openai_client(RateLimitPacer(enabled=False)).max_retries == 4